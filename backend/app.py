@@ -1,12 +1,64 @@
+import logging
 import os
-from flask import Flask, send_from_directory
+from flask import Flask, g, request, send_from_directory
 from routes import api
 from config import Config
+from modules.registry import registry
+from modules.database import db_session, engine
+from modules.migrations import upgrade
+from modules.tracing import SamplingProfiler, end_trace, metrics, start_trace
+
+logger = logging.getLogger(__name__)
+request_seconds = metrics.histogram("http_request_duration_seconds", "Time from request start until the response is closed.")
+
+def install_tracing(app):
+    # A trace per request: spans from every stage it runs, a Server-Timing header, and
+    # on close the request histogram, the slow-request log and an optional profile.
+    @app.before_request
+    def begin_trace():
+        g.trace = start_trace(request.endpoint or "unknown")
+        g.profiler = None
+        if Config.PROFILE_TOKEN and request.headers.get('X-Profile') == Config.PROFILE_TOKEN:
+            g.profiler = SamplingProfiler(Config.PROFILE_INTERVAL_MS)
+            g.profiler.start()
+
+    @app.after_request
+    def add_timing_headers(response):
+        trace, profiler = g.get('trace'), g.get('profiler')
+        if trace is None:
+            return response
+        # For streamed responses this covers the work done before the first byte.
+        response.headers['Server-Timing'] = trace.server_timing()
+        response.headers['X-Trace-Id'] = trace.trace_id
+        if profiler is not None:
+            response.headers['X-Profile-Id'] = trace.trace_id
+        method, status = request.method, response.status_code
+        response.call_on_close(lambda: finish_trace(trace, profiler, method, status))
+        return response
+
+def finish_trace(trace, profiler, method, status):
+    end_trace()
+    elapsed_ms = trace.elapsed_ms()
+    request_seconds.observe(elapsed_ms / 1000, endpoint=trace.name, method=method, status=status)
+    if profiler is not None:
+        profiler.stop()
+        os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(Config.PROFILE_DIR, f"{trace.trace_id}.folded"), "w") as f:
+            f.write(profiler.folded())
+    if Config.TRACE_SLOW_MS and elapsed_ms >= Config.TRACE_SLOW_MS:
+        breakdown = ", ".join(f"{name}={ms:.0f}ms" for name, ms in trace.totals().items())
+        logger.warning("Slow request %s %s took %.0fms: %s", trace.trace_id, trace.name, elapsed_ms, breakdown)
 
 def create_app():
     app = Flask(__name__, static_folder=None)
     app.config.from_object(Config)
     app.register_blueprint(api, url_prefix='/')
+    install_tracing(app)
+
+    @app.teardown_appcontext
+    def remove_db_session(exception=None):
+        # Each request gets its own database session, returned to the pool when it ends.
+        db_session.remove()
 
     @app.route('/')
     def index():
@@ -16,9 +68,20 @@ def create_app():
     def serve_static(path):
         return send_from_directory('../frontend', path)
 
+    if Config.PRELOAD_MODELS:
+        # Under gunicorn with preload_app this runs once in the master, and the loaded
+        # weights are shared copy-on-write with every forked worker.
+        registry.preload(fork_safe_only=True)
+    elif Config.TTS_PREWARM:
+        # With preloading, gunicorn.conf.py starts this in each worker after the fork instead.
+        registry.warm_up_in_background(["tts_cache"])
+
     return app
 
 app = create_app()
 
 if __name__ == "__main__":
+    upgrade(engine)
+    if Config.WARMUP_MODELS:
+        registry.warm_up_in_background()
     app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,155 @@
+"""Summary loading and cohort aggregates: JSON text columns vs structured child tables.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_analysis_storage --conversations 50000
+
+Both layouts hold the same synthetic analysis results. "json" stores them the old
+way (JSON text decoded with the standard library and aggregated in Python);
+"structured" uses the grammar/pronunciation child tables, orjson (when installed)
+for pattern analysis, and the SQL helpers in modules.aggregates. Its summary is
+loaded as column tuples (modules.models.session_turns); loading the same rows as
+ORM objects with their selectin-loaded children is reported for comparison.
+"""
+import argparse
+from collections import Counter
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from modules import aggregates
+from modules.database import create_db_engine
+from modules.models import Base, Conversation, orjson, session_turns
+
+TURNS_PER_SESSION = 20
+USERS = 500
+PHONEMES = ["AA", "AE", "AH", "DH", "IH", "IY", "L", "R", "S", "TH", "V", "W", "Z"]
+RULES = [("HE_VERB_AGR", "GRAMMAR"), ("EN_A_VS_AN", "MISC"), ("MORFOLOGIK_RULE_EN_US", "TYPOS"),
+         ("NON3PRS_VERB", "GRAMMAR"), ("DT_DT", "GRAMMAR")]
+
+
+def synthetic_analysis(rng, i):
+    grammar = []
+    for _ in range(rng.randint(0, 2)):
+        rule_id, category = rng.choice(RULES)
+        grammar.append({"original_sentence": f"utterance {i}", "error_word": "go", "suggestion": "went",
+                        "explanation": "This seems like a verb form issue.", "rule_id": rule_id,
+                        "category": category})
+    pron = []
+    for _ in range(rng.randint(0, 3)):
+        correct = rng.sample(PHONEMES, 4)
+        user = list(correct)
+        position = rng.randrange(4)
+        user[position] = rng.choice(PHONEMES)
+        pron.append({"word": f"word{rng.randrange(300)}", "user_phonemes": user, "correct_phonemes": correct,
+                     "user_ipa": user, "correct_ipa": correct, "difference_note": "Try again.",
+                     "alignment": [{"op": "substitution", "position": position,
+                                    "user_phoneme": user[position], "correct_phoneme": correct[position]}]})
+    pattern = {"category": "statement", "filler_count": rng.randint(0, 3)}
+    return grammar, pron, pattern
+
+
+def fill(Session, layout, count):
+    rng = random.Random(0)
+    db = Session()
+    for i in range(count):
+        grammar, pron, pattern = synthetic_analysis(rng, i)
+        convo = Conversation(user_text=f"utterance {i}", system_response="Tell me more.",
+                             session_id=f"session-{i // TURNS_PER_SESSION}", user_id=f"user-{i % USERS}",
+                             turn_index=i % TURNS_PER_SESSION)
+        if layout == "json":
+            convo.grammar_errors = json.dumps(grammar)
+            convo.pronunciation_errors = json.dumps(pron)
+            convo.pattern_analysis = json.dumps(pattern)
+        else:
+            convo.set_grammar_errors(grammar)
+            convo.set_pronunciation_errors(pron)
+            convo.set_pattern_analysis(pattern)
+        db.add(convo)
+        if i % 5000 == 4999:
+            db.commit()
+            db.expunge_all()
+    db.commit()
+    db.close()
+
+
+def session_rows(db, session_id):
+    return (db.query(Conversation).filter(Conversation.session_id == session_id)
+            .order_by(Conversation.turn_index, Conversation.id).yield_per(100))
+
+
+def summary_json(db, session_id):
+    for c in session_rows(db, session_id):
+        json.loads(c.grammar_errors), json.loads(c.pronunciation_errors), json.loads(c.pattern_analysis)
+
+
+def summary_orm(db, session_id):
+    for c in session_rows(db, session_id):
+        c.get_grammar_errors(), c.get_pronunciation_errors(), c.get_pattern_analysis()
+
+
+def summary_structured(db, session_id):
+    for _ in session_turns(db, session_id):
+        pass
+
+
+def cohort_json(db, user_ids):
+    missed, rules = Counter(), Counter()
+    rows = (db.query(Conversation.grammar_errors, Conversation.pronunciation_errors)
+            .filter(Conversation.user_id.in_(user_ids)))
+    for grammar, pron in rows:
+        for err in json.loads(pron):
+            missed.update(op["correct_phoneme"] for op in err["alignment"] if op["op"] != "insertion")
+        rules.update((err["rule_id"], err["category"]) for err in json.loads(grammar))
+    return missed.most_common(10), rules.most_common(10)
+
+
+def cohort_structured(db, user_ids):
+    return (aggregates.most_missed_phonemes(db, user_ids=user_ids),
+            aggregates.most_common_grammar_rules(db, user_ids=user_ids))
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=50000)
+    parser.add_argument("--cohort", type=int, default=50, help="number of users in the aggregate cohort")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"orjson: {'yes' if orjson is not None else 'not installed (stdlib json)'}")
+    session_id = f"session-{args.conversations // TURNS_PER_SESSION - 1}"
+    user_ids = [f"user-{u}" for u in range(args.cohort)]
+    with tempfile.TemporaryDirectory() as directory:
+        for layout, summary, cohort in (("json", summary_json, cohort_json),
+                                        ("structured", summary_structured, cohort_structured)):
+            engine = create_db_engine(f"sqlite:///{os.path.join(directory, layout + '.db')}")
+            Base.metadata.create_all(engine)
+            Session = sessionmaker(bind=engine)
+            fill(Session, layout, args.conversations)
+            db = Session()
+            summary_ms = timed(lambda: (summary(db, session_id), db.expunge_all()), args.runs)
+            cohort_ms = timed(lambda: cohort(db, user_ids), args.runs)
+            print(f"{layout:>10}: session summary {summary_ms:7.2f} ms   cohort aggregates {cohort_ms:8.1f} ms")
+            if layout == "structured":
+                orm_ms = timed(lambda: (summary_orm(db, session_id), db.expunge_all()), args.runs)
+                print(f"{'':>10}  session summary through ORM objects {orm_ms:7.2f} ms")
+            db.close()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
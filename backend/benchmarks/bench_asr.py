@@ -0,0 +1,103 @@
+"""Real-time factor (processing time / audio duration) of the ASR engines.
+
+Run from the backend directory (needs ffmpeg):
+
+    python -m benchmarks.bench_asr --engines fake sphinx
+    python -m benchmarks.bench_asr --engines sphinx --audio recordings/*.webm
+
+By default the fixtures are the speech-like synthetic utterances of
+bench_preprocess (voiced harmonics under a syllable-rate envelope, with pauses
+and a noise floor), 2 to 20 seconds long and encoded with ffmpeg into webm/opus
+uploads, so no audio files need to be committed. They are not real speech:
+engines that give up early on audio they cannot recognize finish faster on them
+than on a real recording. Pass --audio with recordings of real speech (any format
+ffmpeg reads) for representative numbers. Each fixture is measured as a whole
+upload and as a chunked upload fed in 250 ms pieces.
+"""
+import argparse
+import statistics
+import subprocess
+import time
+
+import numpy as np
+
+from benchmarks.bench_preprocess import synthesize
+from modules.asr_engines import build_engine
+from modules.audio_decoder import SAMPLE_RATE, SAMPLE_WIDTH, DecoderPool
+from modules.speech_recognition import SpeechRecognizer
+
+DURATIONS = [2, 5, 10, 20]
+BURST_SECONDS = 1.1
+PAUSE_SECONDS = 0.4
+
+
+def encode_webm(pcm):
+    # Encodes 16 kHz PCM like a browser MediaRecorder upload.
+    return subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1",
+         "-i", "pipe:0", "-c:a", "libopus", "-f", "webm", "pipe:1"],
+        input=pcm, stdout=subprocess.PIPE, check=True,
+    ).stdout
+
+
+def make_fixture(seconds, rng):
+    # (duration in seconds, webm bytes): speech-like bursts and pauses filling about `seconds`,
+    # with a little silence at both ends.
+    lead, trail = 0.3, 0.5
+    bursts = [(BURST_SECONDS, PAUSE_SECONDS)] * max(1, int((seconds - lead - trail) // (BURST_SECONDS + PAUSE_SECONDS)))
+    pcm = synthesize(lead, bursts, trail, rng)
+    return len(pcm) / (SAMPLE_RATE * SAMPLE_WIDTH), encode_webm(pcm)
+
+
+def load_recordings(paths):
+    # (duration in seconds, file bytes) per recording.
+    decoder = DecoderPool(workers=1)
+    fixtures = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        fixtures.append((len(decoder.decode(data)) / (SAMPLE_RATE * SAMPLE_WIDTH), data))
+    return fixtures
+
+
+class Upload:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+def chunks(data, seconds, chunk_seconds=0.25):
+    size = max(1, int(len(data) * chunk_seconds / seconds))
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", nargs="+", default=["fake"])
+    parser.add_argument("--audio", nargs="+", help="recordings of real speech to use instead of synthetic fixtures")
+    args = parser.parse_args()
+    if args.audio:
+        fixtures = load_recordings(args.audio)
+    else:
+        rng = np.random.default_rng(0)
+        fixtures = [make_fixture(seconds, rng) for seconds in DURATIONS]
+
+    for name in args.engines:
+        recognizer = SpeechRecognizer(engines=[build_engine(name)])
+        whole, chunked = [], []
+        for seconds, data in fixtures:
+            start = time.perf_counter()
+            recognizer.recognize(Upload(data))
+            whole.append((time.perf_counter() - start) / seconds)
+            start = time.perf_counter()
+            recognizer.recognize_chunks(chunks(data, seconds))
+            chunked.append((time.perf_counter() - start) / seconds)
+        print(f"{name:>8}: RTF whole upload={statistics.mean(whole):.3f}  chunked={statistics.mean(chunked):.3f}  "
+              f"breakers={recognizer.engines.status()}")
+
+
+if __name__ == "__main__":
+    main()
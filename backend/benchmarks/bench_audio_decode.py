@@ -0,0 +1,88 @@
+"""Per-request decode latency and CPU for concurrent uploads.
+
+Run from the backend directory (needs ffmpeg; PyAV optional):
+
+    python -m benchmarks.bench_audio_decode --concurrency 50 --seconds 5
+
+Compares the previous temp-file path (write .webm, ffmpeg to .wav, read it
+back) with DecoderPool using ffmpeg pipes and, if installed, PyAV. Only the
+decode step is measured; recognition itself is network-bound and unchanged.
+"""
+import argparse
+import os
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+
+from modules.audio_decoder import DecoderPool, av
+
+
+def make_fixture(seconds):
+    # A webm/opus upload like the browser's MediaRecorder produces.
+    return subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "lavfi",
+         "-i", f"sine=frequency=440:duration={seconds}:sample_rate=48000",
+         "-c:a", "libopus", "-f", "webm", "pipe:1"],
+        stdout=subprocess.PIPE, check=True,
+    ).stdout
+
+
+def temp_file_decode(data):
+    # Previous behaviour of SpeechRecognizer.recognize.
+    with tempfile.NamedTemporaryFile(suffix=".webm", delete=False) as tmp_webm:
+        tmp_webm.write(data)
+        tmp_webm_path = tmp_webm.name
+    tmp_wav = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+    tmp_wav_path = tmp_wav.name
+    tmp_wav.close()
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", tmp_webm_path, "-ar", "16000", "-ac", "1", tmp_wav_path],
+                   check=True)
+    with sr.AudioFile(tmp_wav_path) as source:
+        audio = sr.Recognizer().record(source)
+    os.remove(tmp_webm_path)
+    os.remove(tmp_wav_path)
+    return audio.frame_data
+
+
+def cpu_seconds():
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return sum(u.ru_utime + u.ru_stime for u in usage)
+
+
+def run(name, decode, data, concurrency, requests):
+    def timed(_):
+        start = time.perf_counter()
+        decode(data)
+        return (time.perf_counter() - start) * 1000
+
+    cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(timed, range(requests)))
+    wall, cpu = time.perf_counter() - wall_start, cpu_seconds() - cpu_start
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"{name:>10}: p50={statistics.median(latencies):7.1f} ms  p95={p95:7.1f} ms  "
+          f"cpu/request={1000 * cpu / requests:6.1f} ms  throughput={requests / wall:6.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    data = make_fixture(args.seconds)
+
+    run("temp files", temp_file_decode, data, args.concurrency, args.requests)
+    run("ffmpeg pipe", DecoderPool(args.workers, backend="ffmpeg").decode, data, args.concurrency, args.requests)
+    if av is not None:
+        run("pyav", DecoderPool(args.workers, backend="pyav").decode, data, args.concurrency, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Concurrent conversation inserts: commit per row vs WAL vs write-behind batching.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_db_writes --threads 8 --rows 200
+
+Each mode writes into a fresh SQLite file in a temporary directory:
+  rollback-journal  default SQLite settings, one commit per row (the old behaviour)
+  wal               WAL + tuned pragmas, one commit per row on a per-thread session
+  write-behind      WAL + tuned pragmas, rows queued and committed in batches
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from benchmarks.bench_analysis_storage import synthetic_analysis
+from modules.database import WriteBehindQueue, create_db_engine
+from modules.models import Base, Conversation
+
+
+def make_row(rng, thread_id, i):
+    # Analysis results shaped like the real ones, so each turn also writes its child rows.
+    grammar, pron, pattern = synthetic_analysis(rng, i)
+    convo = Conversation(user_text=f"thread {thread_id} says hello number {i}",
+                         system_response="That is interesting, tell me more.",
+                         session_id=f"thread-{thread_id}", turn_index=i)
+    convo.set_grammar_errors(grammar)
+    convo.set_pronunciation_errors(pron)
+    convo.set_pattern_analysis(pattern)
+    return convo
+
+
+def run_mode(mode, directory, threads, rows):
+    engine = create_db_engine(f"sqlite:///{os.path.join(directory, mode + '.db')}",
+                              sqlite_pragmas=(mode != "rollback-journal"))
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    sessions = scoped_session(factory)
+    write_queue = WriteBehindQueue(factory) if mode == "write-behind" else None
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(thread_id):
+        rng = random.Random(thread_id)
+        local = []
+        for i in range(rows):
+            start = time.perf_counter()
+            if write_queue is not None:
+                write_queue.enqueue(make_row(rng, thread_id, i))
+            else:
+                sessions.add(make_row(rng, thread_id, i))
+                sessions.commit()
+            local.append((time.perf_counter() - start) * 1000)
+        sessions.remove()
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    if write_queue is not None:
+        write_queue.flush()
+    elapsed = time.perf_counter() - start
+
+    session = factory()
+    count = session.query(Conversation).count()
+    session.close()
+    engine.dispose()
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, max(0, int(len(latencies) * 0.99) - 1))]
+    print(f"{mode:>16}: {count / elapsed:8.0f} rows/s  "
+          f"request p50={statistics.median(latencies):6.2f} ms  p99={p99:6.2f} ms  rows={count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=200, help="rows written per thread")
+    args = parser.parse_args()
+    if args.threads < 1 or args.rows < 1:
+        parser.error("--threads and --rows must be at least 1")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("rollback-journal", "wal", "write-behind"):
+            run_mode(mode, directory, args.threads, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Reply latency with the dialogue policy versus always generating with BlenderBot.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_dialogue_policy --sessions 20
+
+Each simulated session opens with small talk, asks about a grammar topic, then
+chats; sessions share their opening turns, as real practice sessions tend to. Every
+session is replayed twice: once with every turn sent to ConversationManager
+(the old path) and once through DialoguePolicy. The script reports the share of
+turns per reply path, the mean latency per path and the overall mean latency.
+"""
+import argparse
+import time
+
+from modules.conversation_manager import ConversationManager
+from modules.dialogue_policies import DialoguePolicy
+from modules.intent_classifier import IntentClassifier
+
+SCRIPT = [
+    "Hello!",
+    "How are you today?",
+    "I would like to practice speaking.",
+    "What are adjectives?",
+    "Can you explain the tenses?",
+    "I went to the park yesterday with my friends.",
+    "My favourite food is pasta with tomato sauce.",
+]
+
+
+def replay(respond, sessions, classifier):
+    latencies = []
+    for idx in range(sessions):
+        for turn, text in enumerate(SCRIPT):
+            # The first turns repeat across sessions; later ones vary a little.
+            if turn >= 5:
+                text = f"{text} (session {idx % 4})"
+            intent = classifier.predict(text)
+            start = time.perf_counter()
+            respond(intent, text, f"bench-{idx}")
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args()
+
+    manager = ConversationManager(max_batch_size=1, max_wait_ms=0)
+    manager.handle_input("general", "Hello!", "warmup")
+    manager.reset_session("warmup")
+    classifier = IntentClassifier()
+
+    baseline = replay(lambda intent, text, sid: manager.handle_input("general", text, sid),
+                      args.sessions, classifier)
+    for idx in range(args.sessions):
+        manager.reset_session(f"bench-{idx}")
+    manager.encoder_cache.clear()
+
+    policy = DialoguePolicy(manager)
+    with_policy = replay(lambda intent, text, sid: policy.respond(intent, [], text, sid),
+                         args.sessions, classifier)
+
+    stats = policy.stats()
+    print(f"{'path':>10} {'share':>7} {'avg ms':>9}")
+    for path, entry in stats["paths"].items():
+        avg = f"{entry['avg_ms']:9.1f}" if entry["avg_ms"] is not None else f"{'-':>9}"
+        print(f"{path:>10} {entry['share']:7.1%} {avg}")
+    print(f"turns served without the model: {stats['without_model']:.1%}")
+    print(f"mean reply latency: always neural {sum(baseline) / len(baseline):8.1f} ms, "
+          f"with policy {sum(with_policy) / len(with_policy):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
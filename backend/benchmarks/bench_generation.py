@@ -0,0 +1,68 @@
+"""Throughput of ConversationManager.generate_response under concurrent sessions.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_generation --sessions 1 8 32 --turns 3
+
+Each concurrency level is measured twice: with micro-batching disabled
+(max batch size 1) and with the configured batch size / wait time.
+"""
+import argparse
+import threading
+import time
+
+from config import Config
+from modules.conversation_manager import ConversationManager
+
+UTTERANCES = [
+    "Hello, how are you today?",
+    "I went to the park yesterday with my friends.",
+    "What kind of music do you like?",
+    "I am learning English because I want to travel.",
+    "Can you recommend a good book?",
+    "My favourite food is pasta with tomato sauce.",
+]
+
+
+def run_level(manager, sessions, turns):
+    def worker(idx):
+        session_id = f"bench-{sessions}-{idx}"
+        for turn in range(turns):
+            manager.handle_input("general", UTTERANCES[(idx + turn) % len(UTTERANCES)], session_id)
+        manager.reset_session(session_id)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return sessions * turns / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--max-batch-size", type=int, default=Config.GENERATION_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=Config.GENERATION_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    manager = ConversationManager(max_batch_size=1, max_wait_ms=0)
+    # Warm up so the first measured level does not pay for lazy initialization.
+    manager.handle_input("general", "Hello!", "warmup")
+
+    print(f"{'sessions':>8} {'unbatched req/s':>16} {'batched req/s':>14} {'speedup':>8}")
+    for sessions in args.sessions:
+        manager.scheduler.max_batch_size = 1
+        manager.scheduler.max_wait = 0.0
+        baseline = run_level(manager, sessions, args.turns)
+        manager.scheduler.max_batch_size = args.max_batch_size
+        manager.scheduler.max_wait = args.max_wait_ms / 1000.0
+        batched = run_level(manager, sessions, args.turns)
+        print(f"{sessions:>8} {baseline:>16.2f} {batched:>14.2f} {batched / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Grammar checking throughput for 1k learner sentences.
+
+Run from the backend directory (set LANGUAGETOOL_URL to use a shared server):
+
+    python -m benchmarks.bench_grammar --sentences 1000
+
+Reports one request per sentence without the cache (the previous behaviour),
+batched requests, and a repeat pass that is served from the result cache.
+"""
+import argparse
+import random
+import time
+
+from modules.grammar_checker import GrammarChecker
+
+SUBJECTS = ["I", "He", "She", "My friend", "We", "They", "My teacher", "The children"]
+VERBS = ["go", "goes", "went", "is going", "have went", "has gone", "are go", "was going"]
+PLACES = ["to school", "to the market", "at home", "to a cinema", "in the park", "to university", "on a holiday"]
+TAILS = ["yesterday", "every day", "last week", "tomorrow", "since two years", "because it rain", ""]
+
+
+def learner_sentences(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        " ".join(filter(None, [rng.choice(SUBJECTS), rng.choice(VERBS), rng.choice(PLACES), rng.choice(TAILS)])) + "."
+        for _ in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sentences", type=int, default=1000)
+    args = parser.parse_args()
+    sentences = learner_sentences(args.sentences)
+
+    checker = GrammarChecker()
+    checker.tool.check("Warm up the server.")
+
+    start = time.perf_counter()
+    for text in sentences:
+        checker.errors_from_matches(text, checker.tool.check(text))
+    per_sentence = time.perf_counter() - start
+    print(f"one request per sentence : {args.sentences / per_sentence:8.1f} sentences/s")
+
+    checker.cache.clear()
+    start = time.perf_counter()
+    checker.check_batch(sentences)
+    batched = time.perf_counter() - start
+    print(f"batched check            : {args.sentences / batched:8.1f} sentences/s")
+
+    start = time.perf_counter()
+    for text in sentences:
+        checker.check(text)
+    cached = time.perf_counter() - start
+    print(f"repeat pass (cached)     : {args.sentences / cached:8.1f} sentences/s  {checker.cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
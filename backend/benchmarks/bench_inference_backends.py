@@ -0,0 +1,115 @@
+"""Latency, memory, throughput and reply parity of the response model backends.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_inference_backends --backends torch int8 onnx --num-beams 1
+
+Each backend is measured in a fresh process so RSS reflects only that backend.
+Parity is the share of prompts whose reply token ids match the fp32 torch reply
+exactly; the run exits non-zero if a backend drops below its minimum. By default
+ONNX must match fp32 on every prompt with greedy decoding, since it runs the same
+weights; int8 changes the weights and is only reported. --min-parity sets one
+minimum for all backends.
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+
+PROMPTS = [
+    "User: Hello, how are you today?\nSystem:",
+    "User: I like to play football with my friends on Sunday.\nSystem:",
+    "User: What is your favourite season?\nSystem:",
+    "User: I am learning English for my new job.\nSystem: That is great! What is the job?\nUser: I will be a tour guide.\nSystem:",
+    "User: Yesterday I cooked dinner for my family.\nSystem:",
+    "User: Do you know any good movies?\nSystem:",
+]
+
+# Default minimum parity per backend with greedy decoding (--num-beams 1).
+GREEDY_MIN_PARITY = {"onnx": 1.0}
+
+
+def current_rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def measure(backend_name, num_beams, repeats, queue):
+    from config import Config
+    from modules.conversation_manager import MODEL_NAME
+    from modules.inference_backends import load_backend
+    from transformers import AutoTokenizer
+
+    rss_before = current_rss_mb()
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    backend = load_backend(backend_name, MODEL_NAME, onnx_model_dir=Config.ONNX_MODEL_DIR)
+    rss_loaded = current_rss_mb()
+
+    replies = []
+    latencies = []
+    generated_tokens = 0
+    for repeat in range(repeats + 1):
+        for prompt in PROMPTS:
+            inputs = tokenizer([prompt], return_tensors="pt", truncation=True, max_length=100)
+            start = time.perf_counter()
+            hidden = backend.encode(inputs["input_ids"], inputs["attention_mask"])
+            reply_ids = backend.generate(hidden, inputs["attention_mask"], max_length=128, num_beams=num_beams)
+            elapsed = time.perf_counter() - start
+            if repeat == 0:
+                # First pass is warm-up; keep its replies for the parity check.
+                replies.append((list(reply_ids[0]), tokenizer.batch_decode(reply_ids, skip_special_tokens=True)[0]))
+                continue
+            latencies.append(elapsed)
+            generated_tokens += len(reply_ids[0])
+
+    queue.put({
+        "backend": backend_name,
+        "replies": replies,
+        "latency_ms": 1000 * sum(latencies) / len(latencies),
+        "tokens_per_sec": generated_tokens / sum(latencies),
+        "rss_mb": rss_loaded - rss_before,
+        "peak_rss_mb": current_rss_mb(),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--num-beams", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-parity", type=float, default=None,
+                        help="minimum parity for every backend (default: 1.0 for onnx when greedy, else none)")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for name in ["torch"] + [b for b in args.backends if b != "torch"]:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=measure, args=(name, args.num_beams, args.repeats, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+
+    reference = results[0]["replies"]
+    failed = False
+    print(f"{'backend':>8} {'latency ms':>11} {'tokens/s':>9} {'model RSS MB':>13} {'parity':>7}")
+    for r in results:
+        parity = sum(a[0] == b[0] for a, b in zip(reference, r["replies"])) / len(reference)
+        min_parity = args.min_parity
+        if min_parity is None:
+            min_parity = GREEDY_MIN_PARITY.get(r["backend"], 0.0) if args.num_beams == 1 else 0.0
+        failed |= parity < min_parity
+        print(f"{r['backend']:>8} {r['latency_ms']:>11.1f} {r['tokens_per_sec']:>9.1f} {r['rss_mb']:>13.0f} {parity:>7.0%}"
+              f"{'  below minimum ' + format(min_parity, '.0%') if parity < min_parity else ''}")
+        for (ref_ids, ref), (ids, reply) in zip(reference, r["replies"]):
+            if ref_ids != ids:
+                print(f"    fp32: {ref!r}\n    {r['backend']}: {reply!r}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
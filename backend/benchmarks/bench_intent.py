@@ -0,0 +1,115 @@
+"""Intent classification accuracy and latency: keyword rules versus the trained model.
+
+Run from the backend directory after `python -m modules.intent_training`:
+
+    python -m benchmarks.bench_intent --repeat 200
+
+The evaluation set below is not part of the training data; the script refuses to run
+if data/intent_seed.tsv gains one of its utterances. It includes utterances
+that only mention a goodbye ("I said bye to my friends"), which the old substring
+rules sent down the goodbye/summary path, and look-alike words ("maybe", "abyss").
+The script reports accuracy, goodbye false positives, model load time,
+single-utterance latency and batched throughput.
+"""
+import argparse
+import re
+import time
+
+from modules.intent_classifier import IntentClassifier
+from modules.intent_training import load_seed
+
+EVAL_SET = [
+    ("greeting", "Hello again, teacher!"),
+    ("greeting", "Hi everyone, glad to be here."),
+    ("greeting", "Good afternoon, it's nice to see you."),
+    ("greeting", "Hey there, can we start?"),
+    ("greeting", "Hello, my name is Maria."),
+    ("ask_health", "How are you feeling this morning?"),
+    ("ask_health", "How is your day going so far?"),
+    ("ask_health", "Hey, are you doing well?"),
+    ("ask_health", "How have you been lately?"),
+    ("ask_health", "Are you feeling okay?"),
+    ("goodbye", "Bye, have a good evening!"),
+    ("goodbye", "Alright, goodbye and thank you."),
+    ("goodbye", "See you next week."),
+    ("goodbye", "I have to go now, thanks."),
+    ("goodbye", "That's all for today, bye bye."),
+    ("goodbye", "I think we can finish the lesson here."),
+    ("general", "Maybe we could talk about music."),
+    ("general", "The Abyss is my favourite film."),
+    ("general", "My baby brother is learning to walk."),
+    ("general", "I bought a bike nearby."),
+    ("general", "By the way, I love cooking."),
+    ("general", "This is my first English lesson."),
+    ("general", "I think this weekend I will visit my aunt."),
+    ("general", "Which is the highest mountain?"),
+    ("general", "How do you spell necessary?"),
+    ("general", "I'm fine, thank you."),
+    ("general", "Yesterday we goed to the cinema."),
+    ("general", "What's your favourite sport?"),
+    ("general", "I said bye to my friends at the station."),
+    ("general", "Um, I like, uh, reading books."),
+    ("general", "We waved goodbye when the train left."),
+    ("general", "The goodbyes at the airport were sad."),
+]
+
+
+def normalize(text):
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+
+def training_overlap():
+    # Evaluation utterances that are also in the training data, ignoring case and punctuation.
+    seed = {normalize(text) for text in load_seed()[0]}
+    return [text for _, text in EVAL_SET if normalize(text) in seed]
+
+
+def substring_rules(text):
+    # IntentClassifier.predict before the trained model.
+    tl = text.lower().strip()
+    if "goodbye" in tl or "bye" in tl:
+        return "goodbye"
+    return "general"
+
+
+def report(name, predict):
+    predictions = [predict(text) for _, text in EVAL_SET]
+    correct = sum(p == label for p, (label, _) in zip(predictions, EVAL_SET))
+    false_goodbyes = sum(p == "goodbye" and label != "goodbye" for p, (label, _) in zip(predictions, EVAL_SET))
+    print(f"{name:16}: accuracy {correct / len(EVAL_SET):6.1%}, goodbye false positives {false_goodbyes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the evaluation set for latency")
+    args = parser.parse_args()
+    overlap = training_overlap()
+    if overlap:
+        raise SystemExit(f"Evaluation utterances also in data/intent_seed.tsv: {overlap}")
+
+    start = time.perf_counter()
+    classifier = IntentClassifier()
+    load_ms = (time.perf_counter() - start) * 1000
+    if classifier.weights is None:
+        raise SystemExit("No intent model; run python -m modules.intent_training first")
+    print(f"model load: {load_ms:.1f} ms ({len(classifier.labels)} intents, {classifier.n_features} hashed features)")
+
+    report("substring rules", substring_rules)
+    report("trained model", classifier.predict)
+
+    texts = [text for _, text in EVAL_SET]
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for text in texts:
+            classifier.predict(text)
+    single = (time.perf_counter() - start) / (args.repeat * len(texts))
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        classifier.predict_batch(texts)
+    batched = (time.perf_counter() - start) / (args.repeat * len(texts))
+    print(f"predict:       {single * 1e6:8.1f} us/utterance")
+    print(f"predict_batch: {batched * 1e6:8.1f} us/utterance (batches of {len(texts)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Sustained concurrent practice sessions against one or more running servers.
+
+Start the servers to compare, e.g. the dev server and the gunicorn configuration:
+
+    python app.py                                          # port 5000
+    GUNICORN_BIND=0.0.0.0:5001 gunicorn -c gunicorn.conf.py wsgi:app
+
+then run from the backend directory:
+
+    python -m benchmarks.bench_load --base-url http://127.0.0.1:5000 http://127.0.0.1:5001 \\
+        --sessions 8 16 32 --turns 5 --think-ms 500
+
+Every simulated session has its own cookie jar (so its own conversation history)
+and posts --turns utterances to /process_input with a pause between them. Optionally
+it finishes with "goodbye" to include the summary. For each server and concurrency
+level the harness reports completed turns per second, latency percentiles and errors.
+"""
+import argparse
+import http.cookiejar
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+UTTERANCES = [
+    "I go to the park yesterday with my friends.",
+    "What do you like to do on weekends?",
+    "I think the weather is very nice today.",
+    "She don't like coffee but she loves tea.",
+    "Can you recommend a good book to read?",
+    "Um, I was thinking about, like, learning to cook.",
+]
+
+
+def run_session(base_url, turns, think_ms, goodbye, results, lock, seed):
+    rng = random.Random(seed)
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    texts = [rng.choice(UTTERANCES) for _ in range(turns)] + (["Okay, goodbye!"] if goodbye else [])
+    for text in texts:
+        req = urllib.request.Request(f"{base_url}/process_input", data=json.dumps({"text": text}).encode(),
+                                     headers={"Content-Type": "application/json"})
+        start = time.perf_counter()
+        try:
+            with opener.open(req, timeout=300) as res:
+                res.read()
+            ok = True
+        except (urllib.error.URLError, OSError):
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            results.append((ok, elapsed))
+        time.sleep(think_ms / 1000.0 * rng.uniform(0.5, 1.5))
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def load(base_url, sessions, turns, think_ms, goodbye):
+    results, lock = [], threading.Lock()
+    threads = [threading.Thread(target=run_session, args=(base_url, turns, think_ms, goodbye, results, lock, i))
+               for i in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    latencies = sorted(ms for ok, ms in results if ok)
+    errors = sum(1 for ok, _ in results if not ok)
+    print(f"  {sessions:>4} sessions: {len(latencies) / wall:6.2f} turns/s  "
+          f"p50={percentile(latencies, 0.50):7.0f} ms  p95={percentile(latencies, 0.95):7.0f} ms  "
+          f"p99={percentile(latencies, 0.99):7.0f} ms  errors={errors}/{len(results)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", nargs="+", default=["http://127.0.0.1:5000"])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--turns", type=int, default=5, help="utterances per session")
+    parser.add_argument("--think-ms", type=float, default=500, help="mean pause between a session's turns")
+    parser.add_argument("--goodbye", action="store_true", help="end every session with a summary")
+    args = parser.parse_args()
+
+    for base_url in args.base_url:
+        print(base_url)
+        for sessions in args.sessions:
+            load(base_url, sessions, args.turns, args.think_ms, args.goodbye)
+
+
+if __name__ == "__main__":
+    main()
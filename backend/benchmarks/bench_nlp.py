@@ -0,0 +1,88 @@
+"""Utterance analysis throughput: separate spaCy passes versus one shared, trimmed pass.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_nlp --repeat 20
+
+The old path loads the full en_core_web_sm pipeline in PatternRecognizer and parses
+every utterance there, while NLU classifies the intent from the raw text and runs
+no entity extraction. The shared path parses each utterance once with only the
+configured components (NLP_COMPONENTS) and hands the Doc to intent classification,
+entity extraction and pattern recognition. The batch path does the same through
+nlp.pipe, as used for bulk reprocessing of stored conversations. Docs/sec is
+reported for each path.
+"""
+import argparse
+import time
+
+import spacy
+
+from modules.intent_classifier import IntentClassifier
+from modules.nlp import analyze_texts, load_nlp
+from modules.nlu import NLUProcessor
+from modules.pattern_recognizer import PatternRecognizer
+
+UTTERANCES = [
+    "Hello, how are you today?",
+    "Um, I went to London last summer with my sister.",
+    "Uh, I think that, like, the movie were really good.",
+    "Can you tell me how to pronounce the word thorough?",
+    "My friend John works at Google in New York.",
+    "I has been studying English for three years.",
+    "What did you do on Saturday?",
+    "Like, I don't know, maybe we could go to the park.",
+    "Yesterday I buyed a new phone for two hundred dollars.",
+    "Okay, thank you, goodbye!",
+]
+
+
+def docs_per_second(fn, texts, repeat):
+    fn(texts[:2])  # Warm-up outside the timed loop.
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(texts)
+    return len(texts) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the utterances")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+    texts = UTTERANCES * 10
+
+    full = spacy.load("en_core_web_sm")
+    old_recognizer = PatternRecognizer(full)
+    intents = IntentClassifier()
+
+    def old_path(batch):
+        for text in batch:
+            intents.predict(text)
+            old_recognizer.analyze_utterance(text)
+
+    nlp = load_nlp()
+    nlu = NLUProcessor(nlp)
+    recognizer = PatternRecognizer(nlp)
+
+    def shared_path(batch):
+        for text in batch:
+            doc = nlu.parse(text)
+            nlu.process_doc(doc)
+            recognizer.analyze_doc(doc)
+
+    def batch_path(batch):
+        for _ in analyze_texts(batch, nlu, recognizer, args.batch_size):
+            pass
+
+    print(f"full pipeline:   {', '.join(full.pipe_names)}")
+    print(f"shared pipeline: {', '.join(nlp.pipe_names) or '(tokenizer only)'}")
+    old = docs_per_second(old_path, texts, args.repeat)
+    for name, fn in (("old (full parse, no entities)", old_path),
+                     ("shared Doc, per utterance", shared_path),
+                     ("shared Doc, nlp.pipe batch", batch_path)):
+        rate = old if fn is old_path else docs_per_second(fn, texts, args.repeat)
+        print(f"{name:32}: {rate:8.0f} docs/s ({rate / old:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Phoneme-level analysis of word pairs: first-mismatch scan vs full alignment.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_phoneme_alignment --pairs 100000
+
+Pairs are reference pronunciations with a random substitution, insertion or
+deletion applied. The scan is the previous logic; it reports only the first
+differing position, so insertions and deletions shift every later phoneme and
+are reported as substitutions.
+"""
+import argparse
+import random
+import time
+
+from modules.phoneme_map import arpabet_to_ipa, convert_arpabet_to_ipa, align_phonemes
+
+SYMBOLS = list(arpabet_to_ipa)
+
+
+def make_pairs(n, seed=0):
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(n):
+        ref = [rng.choice(SYMBOLS) for _ in range(rng.randint(2, 9))]
+        user = list(ref)
+        edit = rng.choice(("substitution", "insertion", "deletion"))
+        pos = rng.randrange(len(ref))
+        if edit == "substitution":
+            user[pos] = rng.choice(SYMBOLS)
+        elif edit == "insertion":
+            user.insert(pos, rng.choice(SYMBOLS))
+        else:
+            del user[pos]
+        pairs.append((edit, user, ref))
+    return pairs
+
+
+def first_mismatch(user, ref):
+    for i in range(min(len(user), len(ref))):
+        if user[i] != ref[i]:
+            return ("substitution", i)
+    if len(user) < len(ref):
+        return ("deletion", len(user))
+    if len(user) > len(ref):
+        return ("insertion", len(ref))
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pairs", type=int, default=100000)
+    args = parser.parse_args()
+    pairs = make_pairs(args.pairs)
+
+    start = time.perf_counter()
+    scan_correct = 0
+    for edit, user, ref in pairs:
+        result = first_mismatch(user, ref)
+        convert_arpabet_to_ipa(user)
+        convert_arpabet_to_ipa(ref)
+        scan_correct += result is not None and result[0] == edit
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    align_correct = 0
+    for edit, user, ref in pairs:
+        ops = align_phonemes(user, ref)
+        convert_arpabet_to_ipa(user)
+        convert_arpabet_to_ipa(ref)
+        align_correct += len(ops) == 1 and ops[0]["op"] == edit or (not ops and user == ref)
+    align_time = time.perf_counter() - start
+
+    print(f"{'method':>16} {'pairs/s':>10} {'us/pair':>8} {'edit type correct':>18}")
+    print(f"{'first mismatch':>16} {args.pairs / scan_time:>10.0f} {1e6 * scan_time / args.pairs:>8.2f} {scan_correct / args.pairs:>18.1%}")
+    print(f"{'alignment':>16} {args.pairs / align_time:>10.0f} {1e6 * align_time / args.pairs:>8.2f} {align_correct / args.pairs:>18.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Audio preprocessing throughput and the ASR time it saves.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_preprocess --engine sphinx
+
+The fixture set is synthesized in memory: 16 kHz PCM utterances with leading and
+trailing silence, short and long pauses between speech-like bursts, and a low
+noise floor. The script reports audio seconds preprocessed per CPU second (with and
+without spectral-gating denoise). It also reports how much audio and ASR time is
+left after preprocessing, transcribing each fixture raw and preprocessed with the
+chosen engine.
+"""
+import argparse
+import time
+
+import numpy as np
+import speech_recognition as sr
+
+from modules.asr_engines import build_engine
+from modules.audio_decoder import SAMPLE_RATE, SAMPLE_WIDTH
+from modules.audio_processing import preprocess_audio
+
+# (leading silence, [(burst seconds, pause after)], trailing silence)
+FIXTURES = [
+    (0.8, [(0.9, 0.3), (1.2, 0.0)], 1.0),
+    (1.5, [(0.7, 0.25), (0.8, 2.0), (1.1, 0.0)], 1.5),
+    (0.5, [(1.0, 1.2), (0.6, 0.3), (0.9, 1.5), (1.3, 0.0)], 2.0),
+    (2.0, [(0.8, 0.2), (0.8, 0.2), (0.8, 3.0), (1.5, 0.0)], 0.5),
+]
+
+
+def synthesize(lead, bursts, trail, rng):
+    parts = [np.zeros(int(lead * SAMPLE_RATE))]
+    for seconds, pause in bursts:
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        pitch = rng.uniform(110, 220)
+        # Harmonics under a syllable-rate envelope, roughly like voiced speech.
+        voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+        parts.append(6000 * voiced * envelope / 2.3)
+        parts.append(np.zeros(int(pause * SAMPLE_RATE)))
+    parts.append(np.zeros(int(trail * SAMPLE_RATE)))
+    audio = np.concatenate(parts) + rng.normal(0, 80, sum(len(p) for p in parts))
+    return np.clip(audio, -32768, 32767).astype(np.int16).tobytes()
+
+
+def seconds_of(pcm):
+    return len(pcm) / (SAMPLE_RATE * SAMPLE_WIDTH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", default="sphinx", help="ASR engine to time (sphinx, google or fake)")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the fixtures for throughput")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    fixtures = [synthesize(lead, bursts, trail, rng) for lead, bursts, trail in FIXTURES]
+    audio_seconds = sum(seconds_of(pcm) for pcm in fixtures)
+
+    for denoise in (False, True):
+        start = time.process_time()
+        for _ in range(args.repeat):
+            for pcm in fixtures:
+                preprocess_audio(pcm, denoise=denoise)
+        cpu = time.process_time() - start
+        print(f"preprocess{' + denoise' if denoise else '':>10}: "
+              f"{audio_seconds * args.repeat / cpu:8.0f} audio s per CPU s")
+
+    engine = build_engine(args.engine, "")
+    raw_asr = processed_asr = processed_seconds = 0.0
+    for pcm in fixtures:
+        processed = preprocess_audio(pcm)
+        processed_seconds += seconds_of(processed)
+        for data, bucket in ((pcm, "raw"), (processed, "processed")):
+            start = time.perf_counter()
+            try:
+                engine.transcribe(sr.AudioData(data, SAMPLE_RATE, SAMPLE_WIDTH))
+            except sr.UnknownValueError:
+                pass
+            elapsed = time.perf_counter() - start
+            if bucket == "raw":
+                raw_asr += elapsed
+            else:
+                processed_asr += elapsed
+    print(f"audio sent to ASR: {audio_seconds:6.1f} s -> {processed_seconds:6.1f} s "
+          f"({100 * (1 - processed_seconds / audio_seconds):.0f}% less)")
+    print(f"{args.engine} ASR time: {raw_asr * 1000:8.0f} ms -> {processed_asr * 1000:8.0f} ms "
+          f"({100 * (1 - processed_asr / raw_asr) if raw_asr else 0:.0f}% saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Replay a long practice session and compare per-turn latency percentiles.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_prompt_cache --turns 40 --replays 3
+
+"rebuild" re-creates the dialogue string and re-tokenizes the whole window
+every turn (the previous implementation). "incremental" uses the per-session
+token cache and the encoder output cache in ConversationManager. Replaying the
+same session more than once shows encoder cache hits for repeated windows.
+"""
+import argparse
+import time
+
+import torch
+
+from modules.conversation_manager import ConversationManager, HISTORY_WINDOW
+
+SCRIPT = [
+    "Hi! I would like to practice my English today.",
+    "I work as a nurse in a big hospital in the city.",
+    "Yesterday I had a very long shift, I was so tired.",
+    "On weekends I like to go hiking in the mountains with my sister.",
+    "Do you have any tips for learning new vocabulary?",
+    "I usually read the news in English every morning.",
+    "Sometimes I watch movies without subtitles but it is difficult.",
+    "What do you think about learning languages with songs?",
+]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+
+def rebuild_turn(manager, history, user_text):
+    # Previous behaviour: rebuild the prompt string and tokenize the full window every turn.
+    history.append(("User", user_text))
+    dialogue = "".join(f"{speaker}: {text}\n" for speaker, text in history[-HISTORY_WINDOW:]) + "System:"
+    inputs = manager.tokenizer([dialogue], return_tensors="pt", truncation=True, max_length=100)
+    hidden = manager.backend.encode(inputs["input_ids"], inputs["attention_mask"])
+    reply_ids = manager.backend.generate(hidden, inputs["attention_mask"], max_length=128)
+    response = manager.tokenizer.batch_decode(reply_ids, skip_special_tokens=True)[0]
+    history.append(("System", response))
+
+
+def replay(manager, turns, replays, incremental):
+    latencies = []
+    for r in range(replays):
+        history = []
+        session_id = "replay"
+        manager.reset_session(session_id)
+        for turn in range(turns):
+            user_text = SCRIPT[turn % len(SCRIPT)]
+            start = time.perf_counter()
+            if incremental:
+                manager.handle_input("general", user_text, session_id)
+            else:
+                rebuild_turn(manager, history, user_text)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--replays", type=int, default=3)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    manager = ConversationManager(max_batch_size=1, max_wait_ms=0)
+    manager.handle_input("general", "Hello!", "warmup")
+
+    for name, incremental in (("rebuild", False), ("incremental", True)):
+        latencies = replay(manager, args.turns, args.replays, incremental)
+        print(f"{name:>12}: p50={percentile(latencies, 50):8.1f} ms  p95={percentile(latencies, 95):8.1f} ms")
+    print(f"encoder cache: {manager.encoder_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Pronunciation analysis throughput: per-word G2P vs the word cache and batch mode.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_pronunciation --utterances 2000
+
+The corpus mimics learner transcripts: a small set of frequent words ("I",
+"the", "you") with a long tail of rarer vocabulary, as seen in practice logs.
+"""
+import argparse
+import random
+import time
+
+import pronouncing
+
+from modules.phoneme_map import convert_arpabet_to_ipa
+from modules.pronunciation_analyzer import PronunciationAnalyzer
+
+TRANSCRIPTS = [
+    "I think the weather is very nice today",
+    "um I went to the supermarket and I bought some apples",
+    "you know I like to watch movies on the weekend",
+    "my brother is studying engineering at the university",
+    "I am not sure but I think it was last Tuesday",
+    "can you tell me how to get to the train station",
+    "I have been learning English for about three years",
+    "uh the most difficult thing is the pronunciation",
+    "yesterday I cooked spaghetti for my whole family",
+    "I would like to improve my vocabulary and my grammar",
+    "we usually go hiking in the mountains in autumn",
+    "do you think artificial intelligence will replace teachers",
+    "my favourite book is a novel about a lighthouse keeper",
+    "I cannot remember the name of the restaurant",
+    "the meeting was postponed because of the thunderstorm",
+]
+
+
+def corpus(n, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(TRANSCRIPTS) for _ in range(n)]
+
+
+def uncached(analyzer, texts):
+    # Previous behaviour: G2P and CMU lookup for every word of every utterance.
+    for text in texts:
+        for w in analyzer.clean_words(text):
+            user = analyzer.get_phonemes(w)
+            ref = pronouncing.phones_for_word(w)
+            if ref:
+                convert_arpabet_to_ipa(user)
+                convert_arpabet_to_ipa(ref[0].split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--utterances", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+    texts = corpus(args.utterances)
+
+    analyzer = PronunciationAnalyzer()
+    analyzer.get_phonemes("warmup")
+
+    start = time.perf_counter()
+    uncached(analyzer, texts)
+    baseline = time.perf_counter() - start
+    print(f"per-word G2P : {args.utterances / baseline:9.1f} utterances/s")
+
+    start = time.perf_counter()
+    for text in texts:
+        analyzer.analyze(text)
+    cached = time.perf_counter() - start
+    print(f"word cache   : {args.utterances / cached:9.1f} utterances/s  {analyzer.cache_stats()}")
+
+    analyzer.word_cache.clear()
+    start = time.perf_counter()
+    for i in range(0, len(texts), args.batch_size):
+        analyzer.analyze_batch(texts[i:i + args.batch_size])
+    batched = time.perf_counter() - start
+    print(f"batch mode   : {args.utterances / batched:9.1f} utterances/s  {analyzer.cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Goodbye latency: rebuilding the summary from stored rows vs the running summary.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_session_summary --turns 10 100 1000
+
+For each session length the summary is produced both ways: loading and decoding
+every stored turn and rendering it (the old goodbye path), and rendering the
+SessionSummary that was updated turn by turn. The per-turn update cost, paid
+while the session is running, is reported too.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_analysis_storage import synthetic_analysis
+from modules.database import create_db_engine
+from modules.models import Base, Conversation, session_turns
+from modules.session_summary import SessionSummary
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'summary.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        for turns in args.turns:
+            session_id = f"session-{turns}"
+            running = SessionSummary()
+            add_ms = []
+            db = Session()
+            for i in range(turns):
+                grammar, pron, pattern = synthetic_analysis(rng, i)
+                convo = Conversation(user_text=f"utterance {i}", system_response="Tell me more.",
+                                     session_id=session_id, turn_index=i)
+                convo.set_grammar_errors(grammar)
+                convo.set_pronunciation_errors(pron)
+                convo.set_pattern_analysis(pattern)
+                db.add(convo)
+                start = time.perf_counter()
+                running.add_turn(convo.user_text, grammar, pron, pattern)
+                add_ms.append((time.perf_counter() - start) * 1000)
+            db.commit()
+            db.close()
+
+            def rebuild():
+                db = Session()
+                SessionSummary.from_turns(session_turns(db, session_id)).render()
+                db.close()
+
+            print(f"{turns:>6} turns: rebuild at goodbye {timed(rebuild, args.runs):8.2f} ms   "
+                  f"running summary {timed(running.render, args.runs):6.3f} ms   "
+                  f"per-turn update {statistics.median(add_ms):6.3f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Time-to-first-request and per-worker memory for lazy vs preload-then-fork startup.
+
+Run from the backend directory (gunicorn must be installed):
+
+    python -m benchmarks.bench_startup --workers 2 --modes lazy preload
+
+For each mode a gunicorn server is started, a /process_input request is sent as
+soon as the port accepts connections, and the time until it answers is reported.
+RSS counts every page a worker maps; PSS splits shared pages between the
+processes sharing them, so it shows how much copy-on-write sharing saves.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+PORT = 5057
+
+
+def memory_kb(pid):
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if parts[0] in ("Rss:", "Pss:"):
+                    values[parts[0][:-1]] = int(parts[1])
+    except FileNotFoundError:
+        pass
+    return values
+
+
+def worker_pids(master_pid):
+    out = subprocess.run(["pgrep", "-P", str(master_pid)], capture_output=True, text=True).stdout
+    return [int(pid) for pid in out.split()]
+
+
+def first_request(deadline):
+    body = json.dumps({"text": "Hello, I want to practice English."}).encode()
+    while time.monotonic() < deadline:
+        try:
+            req = urllib.request.Request(f"http://127.0.0.1:{PORT}/process_input", data=body,
+                                         headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(req, timeout=600) as res:
+                res.read()
+                return True
+        except (ConnectionError, urllib.error.URLError):
+            time.sleep(0.2)
+    return False
+
+
+def run_mode(mode, workers, timeout):
+    env = dict(os.environ, GUNICORN_BIND=f"127.0.0.1:{PORT}", GUNICORN_WORKERS=str(workers),
+               PRELOAD_MODELS="1" if mode == "preload" else "0", WARMUP_MODELS="0")
+    start = time.monotonic()
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ok = first_request(start + timeout)
+        ttfr = time.monotonic() - start
+        # Load the models in every worker so the memory numbers are comparable.
+        for _ in range(workers * 2):
+            first_request(time.monotonic() + timeout)
+        workers_mem = [memory_kb(pid) for pid in worker_pids(server.pid)]
+        master_mem = memory_kb(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+    return ok, ttfr, master_mem, workers_mem
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--modes", nargs="+", default=["lazy", "preload"])
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        ok, ttfr, master_mem, workers_mem = run_mode(mode, args.workers, args.timeout)
+        status = "" if ok else " (no successful request)"
+        print(f"{mode}: time to first request {ttfr:.1f}s{status}")
+        print(f"  master  RSS {master_mem.get('Rss', 0) / 1024:8.0f} MB  PSS {master_mem.get('Pss', 0) / 1024:8.0f} MB")
+        for i, mem in enumerate(workers_mem):
+            print(f"  worker{i} RSS {mem.get('Rss', 0) / 1024:8.0f} MB  PSS {mem.get('Pss', 0) / 1024:8.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
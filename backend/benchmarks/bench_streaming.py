@@ -0,0 +1,75 @@
+"""Time to first token and total reply latency per decoding budget.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_streaming --repeat 3
+
+Each setting is a decoding budget as set through the GENERATION_* variables. Beam
+search only returns complete replies, so its first text arrives with the last; the
+greedy settings are also measured streamed (ConversationManager.stream_response),
+where the first words arrive after a single decoding step. Reply length in words is
+reported too, since smaller budgets produce shorter replies.
+"""
+import argparse
+import statistics
+import time
+
+from modules.conversation_manager import ConversationManager
+
+PROMPTS = [
+    "I went to the park yesterday with my friends.",
+    "What kind of music do you like?",
+    "I am learning English because I want to travel.",
+    "My favourite food is pasta with tomato sauce.",
+]
+
+SETTINGS = [
+    ("model default (10 beams)", {}),
+    ("4 beams, early stopping", {"num_beams": 4, "early_stopping": True}),
+    ("greedy", {"num_beams": 1}),
+    ("greedy, 32 new tokens", {"num_beams": 1, "max_new_tokens": 32}),
+    ("greedy, 0.5 s deadline", {"num_beams": 1, "max_time": 0.5}),
+]
+
+
+def measure(manager, prompt, streamed):
+    session_id = "bench-stream"
+    manager.reset_session(session_id)
+    manager.append_turn(session_id, "User", prompt)
+    # Prompts repeat across settings; the encoder cache would hide the encoder's share.
+    manager.encoder_cache.clear()
+    start = time.perf_counter()
+    if not streamed:
+        reply = manager.generate_response(session_id)
+        elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, elapsed, len(reply.split())
+    first = None
+    pieces = []
+    for piece in manager.stream_response(session_id):
+        if first is None:
+            first = (time.perf_counter() - start) * 1000
+        pieces.append(piece)
+    elapsed = (time.perf_counter() - start) * 1000
+    return first if first is not None else elapsed, elapsed, len("".join(pieces).split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the prompts per setting")
+    args = parser.parse_args()
+
+    manager = ConversationManager(max_batch_size=1, max_wait_ms=0, decoding={})
+    manager.handle_input("general", "Hello!", "warmup")
+
+    print(f"{'setting':<28} {'mode':<9} {'first text ms':>13} {'total ms':>9} {'words':>6}")
+    for name, decoding in SETTINGS:
+        manager.decoding = decoding
+        modes = [False, True] if decoding.get("num_beams") == 1 else [False]
+        for streamed in modes:
+            samples = [measure(manager, prompt, streamed) for _ in range(args.repeat) for prompt in PROMPTS]
+            first, total, words = (statistics.median(column) for column in zip(*samples))
+            print(f"{name:<28} {'streamed' if streamed else 'blocking':<9} {first:13.0f} {total:9.0f} {words:6.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Summary load latency as the conversations table grows (session index vs full scan).
+
+Run from the backend directory (10M rows take a few minutes and ~3 GB of disk):
+
+    python -m benchmarks.bench_summary_scaling --max-rows 10000000
+
+The table is filled in steps (10k, 100k, 1M, 10M) with rows spread over many
+sessions, and their grammar errors in the grammar_errors table, as
+`save_conversation` writes them. At each step one 20-turn session is summarized
+the way `/process_input` does on goodbye (`SessionSummaryStore` over
+`models.session_turns`), and, up to --legacy-max-rows, the old ORM
+`query(...).all()` scan is timed as well.
+"""
+import argparse
+import datetime
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from config import Config
+from modules.database import create_db_engine
+from modules.models import Base, Conversation, GrammarError, session_turns
+from modules.session_summary import SessionSummary
+
+TURNS_PER_SESSION = 20
+INSERT_CHUNK = 50000
+
+
+def fill(engine, start, stop):
+    now = datetime.datetime.utcnow()
+    with engine.begin() as conn:
+        for chunk_start in range(start, stop, INSERT_CHUNK):
+            chunk = range(chunk_start, min(chunk_start + INSERT_CHUNK, stop))
+            conn.execute(Conversation.__table__.insert(), [{
+                "id": i + 1,
+                "user_text": f"utterance {i}",
+                "system_response": "Tell me more.",
+                "pattern_analysis": '{"category": "statement", "filler_count": 0}',
+                "session_id": f"session-{i // TURNS_PER_SESSION}",
+                "turn_index": i % TURNS_PER_SESSION,
+                "created_at": now,
+            } for i in chunk])
+            conn.execute(GrammarError.__table__.insert(), [{
+                "conversation_id": i + 1,
+                "position": 0,
+                "original_sentence": f"utterance {i}",
+                "error_word": "go",
+                "suggestion": "went",
+                "rule_id": "PAST_TENSE",
+                "category": "GRAMMAR",
+            } for i in chunk])
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-rows", type=int, default=10000000)
+    parser.add_argument("--legacy-max-rows", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--yield-per", type=int, default=Config.SUMMARY_YIELD_PER)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'summary.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        filled = 0
+        size = 10000
+        while filled < args.max_rows:
+            size = min(size, args.max_rows)
+            fill(engine, filled, size)
+            filled = size
+            # The most recently written session, as on a real goodbye.
+            session_id = f"session-{filled // TURNS_PER_SESSION - 1}"
+            db = Session()
+            indexed = timed(lambda: SessionSummary.from_turns(session_turns(db, session_id, args.yield_per)),
+                            args.runs)
+            line = f"{filled:>10} rows: session summary {indexed:8.2f} ms"
+            if filled <= args.legacy_max_rows:
+                full = timed(lambda: SessionSummary.from_rows(db.query(Conversation).all()), args.runs)
+                line += f"   full scan {full:9.2f} ms"
+            print(line)
+            db.close()
+            size *= 10
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
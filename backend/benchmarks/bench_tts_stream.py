@@ -0,0 +1,57 @@
+"""Time to first audio byte: save-then-fetch vs the streaming TTS endpoint.
+
+Start the server, then run from the backend directory:
+
+    python -m benchmarks.bench_tts_stream --base-url http://127.0.0.1:5000 --runs 5
+
+Every run uses a fresh response text so neither flow is served from the TTS cache.
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.parse
+import urllib.request
+
+RESPONSE = ("That sounds like a lovely trip. I have never been to the mountains in winter. "
+            "What did you enjoy the most? Did you try skiing or snowboarding while you were there?")
+
+
+def first_byte(url, data=None, headers=None):
+    req = urllib.request.Request(url, data=data, headers=headers or {})
+    with urllib.request.urlopen(req) as res:
+        res.read(1)
+        elapsed = time.perf_counter()
+        res.read()
+    return elapsed
+
+
+def save_then_fetch(base_url, text):
+    start = time.perf_counter()
+    req = urllib.request.Request(f"{base_url}/get_audio_response",
+                                 data=json.dumps({"response_text": text}).encode(),
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req) as res:
+        audio_url = json.loads(res.read())["audio_url"]
+    return first_byte(base_url + audio_url) - start
+
+
+def streamed(base_url, text):
+    start = time.perf_counter()
+    return first_byte(f"{base_url}/stream_audio_response?text={urllib.parse.quote(text)}") - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    stamp = int(time.time())
+    for name, flow in (("save+fetch", save_then_fetch), ("streaming", streamed)):
+        ttfb = [flow(args.base_url, f"Run {i} of {name} at {stamp}: {RESPONSE}") * 1000 for i in range(args.runs)]
+        print(f"{name:>10}: time to first audio byte median={statistics.median(ttfb):7.0f} ms  max={max(ttfb):7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Test client and latency benchmark for the /voice_stream WebSocket.
+
+Start the server, then run from the backend directory with a recorded utterance:
+
+    python -m benchmarks.bench_voice_stream --audio sample.webm --runs 3
+
+The recording is sent in chunks at real-time pace, as MediaRecorder would, and
+the client prints every event it gets back (partial transcripts, filler hints, reply).
+After the last chunk it sends {"type": "end"}. With --server-endpointing it waits
+for the server's "end_of_speech" event instead, so the recording should end with
+silence. Latencies are measured from end of speech to the transcript, the reply
+text, the first reply audio byte and the end of the turn.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import time
+
+import simple_websocket
+
+MARKS = ("transcript", "reply", "first_audio", "done")
+
+
+def probe_duration(path):
+    output = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip())
+
+
+def run_turn(url, audio, duration, chunk_ms, server_endpointing, verbose):
+    ws = simple_websocket.Client(url)
+    try:
+        ws.send(json.dumps({"type": "start"}))
+        chunk_count = max(1, int(duration * 1000 / chunk_ms))
+        chunk_size = -(-len(audio) // chunk_count)
+        start = time.perf_counter()
+        end_of_speech = None
+        for i in range(0, len(audio), chunk_size):
+            ws.send(audio[i:i + chunk_size])
+            # Keep real-time pace, showing partial results as they arrive.
+            while True:
+                wait = start + (i // chunk_size + 1) * chunk_ms / 1000 - time.perf_counter()
+                message = ws.receive(timeout=max(0.0, wait))
+                if message is None:
+                    break
+                event = json.loads(message)
+                if verbose:
+                    print(f"  {time.perf_counter() - start:6.2f}s {event}")
+                if event["event"] == "end_of_speech":
+                    end_of_speech = time.perf_counter()
+            if end_of_speech is not None:
+                break
+        if not server_endpointing:
+            end_of_speech = time.perf_counter()
+            ws.send(json.dumps({"type": "end"}))
+
+        marks = {}
+        while "done" not in marks:
+            message = ws.receive(timeout=120)
+            if message is None:
+                raise RuntimeError("no reply from server")
+            now = (time.perf_counter() - (end_of_speech or start)) * 1000
+            if isinstance(message, bytes):
+                marks.setdefault("first_audio", now)
+                continue
+            event = json.loads(message)
+            if event["event"] == "end_of_speech":
+                end_of_speech = time.perf_counter()
+                continue
+            if verbose and event["event"] != "analysis":
+                print(f"  +{now:7.0f} ms {event}")
+            key = {"transcription": "transcript", "reply": "reply", "done": "done"}.get(event["event"])
+            if key:
+                marks[key] = now
+            if event["event"] == "error":
+                raise RuntimeError(event["message"])
+        return marks
+    finally:
+        ws.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://127.0.0.1:5000/voice_stream")
+    parser.add_argument("--audio", required=True, help="recorded utterance, e.g. webm/opus from MediaRecorder")
+    parser.add_argument("--duration", type=float, help="recording length in seconds (default: ffprobe)")
+    parser.add_argument("--chunk-ms", type=int, default=250)
+    parser.add_argument("--server-endpointing", action="store_true")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.audio, "rb") as f:
+        audio = f.read()
+    duration = args.duration or probe_duration(args.audio)
+    samples = []
+    for run in range(args.runs):
+        print(f"run {run + 1}:")
+        samples.append(run_turn(args.url, audio, duration, args.chunk_ms, args.server_endpointing, verbose=True))
+    print("end of speech to:  " + "   ".join(
+        f"{mark} {statistics.median(s[mark] for s in samples if mark in s):7.0f} ms"
+        for mark in MARKS if any(mark in s for s in samples)))
+
+
+if __name__ == "__main__":
+    main()
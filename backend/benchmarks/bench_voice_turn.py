@@ -0,0 +1,84 @@
+"""Per-turn wall clock: the four-request chain vs the single /voice_turn request.
+
+Start the server, then run from the backend directory with a short recording:
+
+    python -m benchmarks.bench_voice_turn --audio sample.webm --runs 5
+
+The old chain is /recognize_speech, /process_input, /get_audio_response and the
+audio download, one after another. /voice_turn gets the same upload and streams
+NDJSON events back. Both report time to the first reply audio byte and time until
+the turn is complete (all audio and analysis received). A server started with
+ASR_ENGINES=fake and TTS_ENGINE=silent measures the app itself without network services.
+"""
+import argparse
+import http.cookiejar
+import json
+import mimetypes
+import statistics
+import time
+import urllib.request
+
+
+def make_opener():
+    return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+
+def post(opener, url, data, content_type):
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": content_type})
+    with opener.open(req) as res:
+        return res.read()
+
+
+def chain(opener, base_url, audio, content_type):
+    start = time.perf_counter()
+    text = json.loads(post(opener, f"{base_url}/recognize_speech", audio, content_type))["transcription"]
+    reply = json.loads(post(opener, f"{base_url}/process_input", json.dumps({"text": text}).encode(),
+                            "application/json"))
+    audio_url = json.loads(post(opener, f"{base_url}/get_audio_response",
+                                json.dumps({"response_text": reply["response"]}).encode(),
+                                "application/json"))["audio_url"]
+    with opener.open(base_url + audio_url) as res:
+        res.read(1)
+        first_audio = time.perf_counter() - start
+        res.read()
+    return first_audio, time.perf_counter() - start
+
+
+def voice_turn(opener, base_url, audio, content_type):
+    start = time.perf_counter()
+    first_audio = None
+    req = urllib.request.Request(f"{base_url}/voice_turn", data=audio, headers={"Content-Type": content_type})
+    with opener.open(req) as res:
+        for line in res:
+            event = json.loads(line)
+            if event["event"] == "audio" and first_audio is None:
+                first_audio = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return first_audio if first_audio is not None else total, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--audio", required=True, help="recorded utterance (webm, ogg, wav, ...)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.audio, "rb") as f:
+        audio = f.read()
+    content_type = mimetypes.guess_type(args.audio)[0] or "application/octet-stream"
+    if not content_type.startswith("audio/"):
+        content_type = "application/octet-stream"
+
+    for name, flow in (("4-request chain", chain), ("/voice_turn", voice_turn)):
+        opener = make_opener()
+        flow(opener, args.base_url, audio, content_type)  # warm caches and models
+        samples = [flow(opener, args.base_url, audio, content_type) for _ in range(args.runs)]
+        first = [s[0] * 1000 for s in samples]
+        total = [s[1] * 1000 for s in samples]
+        print(f"{name:>16}: first audio byte median={statistics.median(first):7.0f} ms   "
+              f"turn complete median={statistics.median(total):7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,129 @@
 import os
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'changeme')
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///database.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Response generation: concurrent BlenderBot calls are grouped into one batch.
+    GENERATION_MAX_BATCH_SIZE = int(os.environ.get('GENERATION_MAX_BATCH_SIZE', 8))
+    GENERATION_MAX_WAIT_MS = float(os.environ.get('GENERATION_MAX_WAIT_MS', 10))
+    MAX_CONVERSATION_SESSIONS = int(os.environ.get('MAX_CONVERSATION_SESSIONS', 10000))
+    # Number of encoder outputs kept for reuse when the same prompt window is generated again.
+    ENCODER_CACHE_SIZE = int(os.environ.get('ENCODER_CACHE_SIZE', 64))
+    # Decoding budget for replies, traded against quality per deployment. Unset values keep the model's
+    # defaults (BlenderBot: 10 beams, up to 128 tokens). GENERATION_NUM_BEAMS=1 is greedy decoding, and
+    # GENERATION_MAX_TIME (seconds) cuts a reply short once the wall-clock budget is spent. Streamed
+    # replies (/stream_reply) are always greedy.
+    GENERATION_MAX_NEW_TOKENS = int(os.environ.get('GENERATION_MAX_NEW_TOKENS', 0)) or None
+    GENERATION_NUM_BEAMS = int(os.environ.get('GENERATION_NUM_BEAMS', 0)) or None
+    GENERATION_EARLY_STOPPING = {'1': True, '0': False}.get(os.environ.get('GENERATION_EARLY_STOPPING', ''))
+    GENERATION_MAX_TIME = float(os.environ.get('GENERATION_MAX_TIME', 0)) or None
+
+    # Inference backend for the response model: 'torch' (fp32), 'int8' (dynamic quantization) or 'onnx'.
+    INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch')
+    ONNX_MODEL_DIR = os.environ.get('ONNX_MODEL_DIR', 'onnx_models/blenderbot-400M-distill')
+    ONNX_NUM_BEAMS = int(os.environ.get('ONNX_NUM_BEAMS', 0)) or None  # None uses the model's default
+
+    # Model loading: preload fork-safe models at app creation (use with gunicorn preload_app) and/or
+    # run each model's warm-up hook in the background so the first request does not pay for it.
+    PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS', '0') == '1'
+    WARMUP_MODELS = os.environ.get('WARMUP_MODELS', '0') == '1'
+
+    # /process_input analysis fan-out: per-stage timeouts in seconds (stages run on the executors below).
+    ANALYSIS_STAGE_TIMEOUTS = {
+        'pattern': float(os.environ.get('ANALYSIS_TIMEOUT_PATTERN', 2)),
+        'grammar': float(os.environ.get('ANALYSIS_TIMEOUT_GRAMMAR', 5)),
+        'pronunciation': float(os.environ.get('ANALYSIS_TIMEOUT_PRONUNCIATION', 5)),
+        'response': float(os.environ.get('ANALYSIS_TIMEOUT_RESPONSE', 20)),
+    }
+
+    # Number of words whose G2P / CMU phonemes and IPA forms are memoized by PronunciationAnalyzer.
+    PRONUNCIATION_CACHE_SIZE = int(os.environ.get('PRONUNCIATION_CACHE_SIZE', 50000))
+
+    # Grammar checking: optional shared LanguageTool server (e.g. http://languagetool:8010), result cache
+    # bounds and the maximum request size for batched checks.
+    LANGUAGETOOL_URL = os.environ.get('LANGUAGETOOL_URL')
+    GRAMMAR_CACHE_SIZE = int(os.environ.get('GRAMMAR_CACHE_SIZE', 10000))
+    GRAMMAR_CACHE_TTL = float(os.environ.get('GRAMMAR_CACHE_TTL', 24 * 3600))
+    GRAMMAR_BATCH_MAX_CHARS = int(os.environ.get('GRAMMAR_BATCH_MAX_CHARS', 20000))
+
+    # Upload decoding: 'auto' decodes in-process with PyAV when installed, otherwise pipes through ffmpeg.
+    AUDIO_DECODER = os.environ.get('AUDIO_DECODER', 'auto')
+    AUDIO_DECODER_WORKERS = int(os.environ.get('AUDIO_DECODER_WORKERS', 4))
+
+    # Speech recognition engines, tried in order: 'google' (network), 'sphinx' (offline, needs
+    # pocketsphinx) and 'fake' (returns ASR_FAKE_TRANSCRIPT, for tests).
+    ASR_ENGINES = os.environ.get('ASR_ENGINES', 'google,sphinx')
+    ASR_TIMEOUT = float(os.environ.get('ASR_TIMEOUT', 10))
+    ASR_BREAKER_THRESHOLD = int(os.environ.get('ASR_BREAKER_THRESHOLD', 3))
+    ASR_BREAKER_RESET = float(os.environ.get('ASR_BREAKER_RESET', 30))
+    ASR_FAKE_TRANSCRIPT = os.environ.get('ASR_FAKE_TRANSCRIPT', '')
+    # Preprocessing before ASR: silence trimming, pauses of AUDIO_MAX_PAUSE_MS or more cut down to
+    # AUDIO_KEEP_PAUSE_MS, loudness normalized to AUDIO_TARGET_DBFS, optional spectral-gating denoise.
+    AUDIO_PREPROCESS = os.environ.get('AUDIO_PREPROCESS', '1') == '1'
+    AUDIO_DENOISE = os.environ.get('AUDIO_DENOISE', '0') == '1'
+    AUDIO_MAX_PAUSE_MS = int(os.environ.get('AUDIO_MAX_PAUSE_MS', 700))
+    AUDIO_KEEP_PAUSE_MS = int(os.environ.get('AUDIO_KEEP_PAUSE_MS', 200))
+    AUDIO_TARGET_DBFS = float(os.environ.get('AUDIO_TARGET_DBFS', -20))
+
+    # Text-to-speech: engine ('gtts', or 'silent' as an offline stand-in), content-addressed cache
+    # location and size, and whether phoneme example words are synthesized at startup.
+    TTS_ENGINE = os.environ.get('TTS_ENGINE', 'gtts')
+    TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', os.path.join(BASE_DIR, 'tmp', 'tts'))
+    TTS_CACHE_MAX_BYTES = int(os.environ.get('TTS_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+    TTS_PREWARM = os.environ.get('TTS_PREWARM', '1') == '1'
+    # Number of sentences synthesized ahead of the one being streamed by /stream_audio_response.
+    TTS_STREAM_LOOKAHEAD = int(os.environ.get('TTS_STREAM_LOOKAHEAD', 2))
+
+    # Database: connection pool, and optional write-behind batching of conversation inserts.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_WRITE_BEHIND = os.environ.get('DB_WRITE_BEHIND', '0') == '1'
+    DB_WRITE_BATCH_SIZE = int(os.environ.get('DB_WRITE_BATCH_SIZE', 50))
+    DB_WRITE_FLUSH_MS = float(os.environ.get('DB_WRITE_FLUSH_MS', 50))
+    # Rows fetched per round trip while a session summary is built.
+    SUMMARY_YIELD_PER = int(os.environ.get('SUMMARY_YIELD_PER', 100))
+
+    # Intent model (python -m modules.intent_training builds it). Predictions below the threshold
+    # count as "general"; confident greetings and health questions get a template reply instead of BlenderBot.
+    INTENT_MODEL_PATH = os.environ.get('INTENT_MODEL_PATH', os.path.join(BASE_DIR, 'data', 'intent_model.npz'))
+    INTENT_CONFIDENCE_THRESHOLD = float(os.environ.get('INTENT_CONFIDENCE_THRESHOLD', 0.6))
+
+    # Dialogue policy: replies of BlenderBot kept per exact prompt window (0 disables the cache).
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 2048))
+    RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 0)) or None  # seconds; None keeps entries
+
+    # Shared spaCy pipeline: one parse per utterance, with only these components loaded
+    # (filler matching and intent rules need just the tokenizer; "ner" feeds entity extraction).
+    SPACY_MODEL = os.environ.get('SPACY_MODEL', 'en_core_web_sm')
+    NLP_COMPONENTS = os.environ.get('NLP_COMPONENTS', 'ner')
+    NLP_BATCH_SIZE = int(os.environ.get('NLP_BATCH_SIZE', 64))
+
+    # Tracing: every request gets a Server-Timing header and feeds the /metrics histograms. Requests
+    # slower than TRACE_SLOW_MS are logged with their span breakdown (0 disables). A request sent with
+    # the header "X-Profile: <PROFILE_TOKEN>" is profiled by sampling stacks every PROFILE_INTERVAL_MS;
+    # the folded stacks are written to PROFILE_DIR (no token: profiling is off).
+    TRACE_SLOW_MS = float(os.environ.get('TRACE_SLOW_MS', 2000))
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(BASE_DIR, 'tmp', 'profiles'))
+
+    # Bounded executors for async views: I/O-bound calls (network services, waiting on the
+    # generation batch) and CPU-bound in-process model calls.
+    IO_EXECUTOR_WORKERS = int(os.environ.get('IO_EXECUTOR_WORKERS', 32))
+    CPU_EXECUTOR_WORKERS = int(os.environ.get('CPU_EXECUTOR_WORKERS', os.cpu_count() or 2))
+
+    # Live voice over WebSocket (/voice_stream): partial transcripts every WS_PARTIAL_INTERVAL_MS
+    # of new audio (0 disables), end of speech after WS_END_SILENCE_MS of silence (0: client decides).
+    WS_PARTIAL_INTERVAL_MS = int(os.environ.get('WS_PARTIAL_INTERVAL_MS', 1000))
+    # Partials transcribe only the last WS_PARTIAL_WINDOW_MS of audio (0: all of it), so their ASR
+    # cost does not grow with the utterance; the final transcript always covers everything.
+    WS_PARTIAL_WINDOW_MS = int(os.environ.get('WS_PARTIAL_WINDOW_MS', 5000))
+    WS_END_SILENCE_MS = int(os.environ.get('WS_END_SILENCE_MS', 800))
+    WS_MAX_UTTERANCE_MS = int(os.environ.get('WS_MAX_UTTERANCE_MS', 30000))
+    # Connections with no utterance in progress and no message for this long are closed.
+    WS_IDLE_TIMEOUT_S = float(os.environ.get('WS_IDLE_TIMEOUT_S', 30))
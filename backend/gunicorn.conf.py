@@ -0,0 +1,46 @@
+# Gunicorn settings. Run from the backend directory with:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# With PRELOAD_MODELS=1 the app (and every fork-safe model) is imported once in the
+# master and workers are forked afterwards, so model weights are shared copy-on-write
+# instead of being loaded again by each worker.
+#
+# Each worker holds its own copy of the models that are not preloaded, so there are few
+# workers and many threads: request threads mostly wait on network services and on the
+# shared generation batch, while CPU-bound model calls are capped by CPU_EXECUTOR_WORKERS.
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+# Recycle workers now and then to bound slow memory growth; jitter keeps them from restarting together.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 200))
+# Heartbeat files on tmpfs: a disk-backed /tmp in containers can stall workers into timeouts.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+preload_app = os.environ.get("PRELOAD_MODELS", "0") == "1"
+
+
+def on_starting(server):
+    # Create and migrate the schema once, in the master, before any worker can touch it.
+    from modules.database import engine
+    from modules.migrations import upgrade
+    upgrade(engine)
+
+
+def post_worker_init(worker):
+    # Split the cores between workers so torch intra-op threads do not oversubscribe the CPU.
+    import torch
+    torch.set_num_threads(int(os.environ.get("TORCH_NUM_THREADS", max(1, multiprocessing.cpu_count() // workers))))
+
+    # Warm-up runs inference, so it happens in each worker once the app is loaded, never in the master.
+    from modules.registry import registry
+    if os.environ.get("WARMUP_MODELS", "0") == "1":
+        registry.warm_up_in_background()
+    elif preload_app and os.environ.get("TTS_PREWARM", "1") == "1":
+        registry.warm_up_in_background(["tts_cache"])
@@ -0,0 +1,55 @@
+from sqlalchemy import func
+
+from modules.models import Conversation, GrammarError, PhonemeMismatch, PronunciationError
+
+# Aggregate statistics over the structured error tables. Each helper takes a SQLAlchemy
+# session and can be narrowed to a cohort of users and/or a set of practice sessions.
+# Rows stored as legacy JSON are not counted until backfilled (python -m modules.migrations --backfill).
+
+def _scope(query, user_ids=None, session_ids=None, since=None):
+    if user_ids is not None:
+        query = query.filter(Conversation.user_id.in_(list(user_ids)))
+    if session_ids is not None:
+        query = query.filter(Conversation.session_id.in_(list(session_ids)))
+    if since is not None:
+        query = query.filter(Conversation.created_at >= since)
+    return query
+
+def _needs_conversation(user_ids, session_ids, since):
+    return user_ids is not None or session_ids is not None or since is not None
+
+def most_missed_phonemes(db, limit=10, user_ids=None, session_ids=None, since=None):
+    # Expected phonemes most often substituted or omitted: [(phoneme, count), ...]
+    count = func.count(PhonemeMismatch.id)
+    query = (db.query(PhonemeMismatch.correct_phoneme, count)
+             .filter(PhonemeMismatch.op != "insertion"))
+    if _needs_conversation(user_ids, session_ids, since):
+        query = _scope(query.join(PronunciationError).join(Conversation), user_ids, session_ids, since)
+    return [tuple(row) for row in query.group_by(PhonemeMismatch.correct_phoneme).order_by(count.desc()).limit(limit)]
+
+def most_common_substitutions(db, limit=10, user_ids=None, session_ids=None, since=None):
+    # Most frequent (expected, actual) phoneme confusions: [(correct, user, count), ...]
+    count = func.count(PhonemeMismatch.id)
+    query = (db.query(PhonemeMismatch.correct_phoneme, PhonemeMismatch.user_phoneme, count)
+             .filter(PhonemeMismatch.op == "substitution"))
+    if _needs_conversation(user_ids, session_ids, since):
+        query = _scope(query.join(PronunciationError).join(Conversation), user_ids, session_ids, since)
+    query = query.group_by(PhonemeMismatch.correct_phoneme, PhonemeMismatch.user_phoneme)
+    return [tuple(row) for row in query.order_by(count.desc()).limit(limit)]
+
+def most_mispronounced_words(db, limit=10, user_ids=None, session_ids=None, since=None):
+    # [(word, count), ...]
+    count = func.count(PronunciationError.id)
+    query = db.query(PronunciationError.word, count)
+    if _needs_conversation(user_ids, session_ids, since):
+        query = _scope(query.join(Conversation), user_ids, session_ids, since)
+    return [tuple(row) for row in query.group_by(PronunciationError.word).order_by(count.desc()).limit(limit)]
+
+def most_common_grammar_rules(db, limit=10, user_ids=None, session_ids=None, since=None):
+    # [(rule_id, category, count), ...]
+    count = func.count(GrammarError.id)
+    query = db.query(GrammarError.rule_id, GrammarError.category, count)
+    if _needs_conversation(user_ids, session_ids, since):
+        query = _scope(query.join(Conversation), user_ids, session_ids, since)
+    query = query.group_by(GrammarError.rule_id, GrammarError.category)
+    return [tuple(row) for row in query.order_by(count.desc()).limit(limit)]
@@ -0,0 +1,132 @@
+from collections import OrderedDict
+import asyncio
+import contextvars
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import logging
+import time
+
+from modules.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineRun:
+    """The in-flight stages of one utterance. Results are collected with `result(name)` or `results()`."""
+
+    def __init__(self, pipeline, context, futures, started_at):
+        self.pipeline = pipeline
+        self.context = context
+        self.futures = futures
+        self.started_at = started_at
+        self.timings = {}  # stage name -> milliseconds until the result (or fallback) was available
+        self.status = {}   # stage name -> "ok", "timeout", "error" or "skipped"
+        self._results = {}
+
+    def result(self, name):
+        if name in self._results:
+            return self._results[name]
+        stage = self.pipeline.stages[name]
+        future = self.futures.get(name)
+        if future is None:
+            value, status = stage["fallback"](self.context), "skipped"
+        else:
+            # Timeouts are measured from when the utterance was submitted, not from when we started waiting.
+            remaining = None
+            if stage["timeout"] is not None:
+                remaining = max(0.0, stage["timeout"] - (time.perf_counter() - self.started_at))
+            try:
+                value, duration, finished_at = future.result(timeout=remaining)
+                # A result that arrived after the deadline is rejected, even if it is here by now.
+                if stage["timeout"] is not None and finished_at - self.started_at > stage["timeout"]:
+                    raise FutureTimeoutError()
+                status = "ok"
+                self.timings[name] = duration
+            except FutureTimeoutError:
+                logger.warning("Stage %s timed out after %.1fs, using fallback", name, stage["timeout"])
+                value, status = stage["fallback"](self.context), "timeout"
+            except Exception:
+                logger.exception("Stage %s failed, using fallback", name)
+                value, status = stage["fallback"](self.context), "error"
+        self.timings.setdefault(name, (time.perf_counter() - self.started_at) * 1000)
+        self.status[name] = status
+        self._results[name] = value
+        return value
+
+    def ready(self, name):
+        # True once result(name) would return without waiting (finished, skipped or past its deadline).
+        future = self.futures.get(name)
+        if name in self._results or future is None or future.done():
+            return True
+        timeout = self.pipeline.stages[name]["timeout"]
+        return timeout is not None and time.perf_counter() - self.started_at >= timeout
+
+    def results(self):
+        return {name: self.result(name) for name in self.pipeline.stages}
+
+    async def wait(self):
+        # Awaits each stage up to its own deadline without blocking a thread; a stage that
+        # misses it gets its fallback right then, exactly as with `results()`.
+        await asyncio.gather(*(self._wait_stage(name, future) for name, future in self.futures.items()))
+        return self.results()
+
+    async def _wait_stage(self, name, future):
+        if not future.done():
+            timeout = self.pipeline.stages[name]["timeout"]
+            remaining = None
+            if timeout is not None:
+                remaining = max(0.0, timeout - (time.perf_counter() - self.started_at))
+            try:
+                # Shielded: the stage keeps running in its thread, only the wait is abandoned.
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), remaining)
+            except Exception:
+                pass  # result() applies the fallback and logs the timeout or error.
+        self.result(name)
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started_at) * 1000
+
+
+class AnalysisPipeline:
+    """Runs independent analysis stages for an utterance concurrently on bounded thread pools.
+
+    Each stage is a function of a shared context dict (user_text, intent, session_id, ...).
+    A stage that is slower than its timeout, or raises, is replaced by its fallback value,
+    so one slow analyser degrades the response instead of holding it up.
+    """
+
+    def __init__(self, executor):
+        # Shared pool (e.g. io_executor) for stages added without an executor of their own.
+        self.executor = executor
+        self.stages = OrderedDict()
+
+    def add_stage(self, name, fn, timeout=None, fallback=None, executor=None):
+        # `executor` runs this stage instead of the pipeline's default (e.g. the bounded CPU pool).
+        self.stages[name] = {
+            "fn": fn,
+            "timeout": timeout,
+            "fallback": fallback or (lambda context: None),
+            "executor": executor or self.executor,
+        }
+
+    def submit(self, context, skip=()):
+        started_at = time.perf_counter()
+        # Each stage runs in a copy of the caller's context, so its span lands in the request's trace.
+        futures = {
+            name: stage["executor"].submit(contextvars.copy_context().run, self._timed, name, stage["fn"], context)
+            for name, stage in self.stages.items()
+            if name not in skip
+        }
+        return PipelineRun(self, context, futures, started_at)
+
+    def run(self, context, skip=()):
+        run = self.submit(context, skip=skip)
+        run.results()
+        return run
+
+    @staticmethod
+    def _timed(name, fn, context):
+        start = time.perf_counter()
+        with span(name):
+            value = fn(context)
+        finished_at = time.perf_counter()
+        return value, (finished_at - start) * 1000, finished_at
@@ -0,0 +1,155 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import hashlib
+import logging
+import threading
+import time
+
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+
+class GoogleEngine:
+    """Google Web Speech API through SpeechRecognition (network)."""
+
+    name = "google"
+
+    def __init__(self, timeout=None):
+        self.recognizer = sr.Recognizer()
+        # Ends the HTTP request itself, so a timed-out call does not keep an executor thread busy.
+        self.recognizer.operation_timeout = timeout
+
+    def transcribe(self, audio):
+        return self.recognizer.recognize_google(audio)
+
+
+class SphinxEngine:
+    """CMU PocketSphinx through SpeechRecognition; runs fully offline (needs `pocketsphinx`)."""
+
+    name = "sphinx"
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio):
+        return self.recognizer.recognize_sphinx(audio)
+
+
+class FakeEngine:
+    """Deterministic stand-in for tests and benchmarks.
+
+    Returns the transcript registered for the exact PCM bytes (by SHA-1), or `default`.
+    An optional delay simulates engine latency.
+    """
+
+    name = "fake"
+
+    def __init__(self, transcripts=None, default="", delay=0.0):
+        self.transcripts = dict(transcripts or {})
+        self.default = default
+        self.delay = delay
+
+    @staticmethod
+    def key(pcm):
+        return hashlib.sha1(pcm).hexdigest()
+
+    def add(self, pcm, transcript):
+        self.transcripts[self.key(pcm)] = transcript
+
+    def transcribe(self, audio):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.transcripts.get(self.key(audio.get_raw_data()), self.default)
+
+
+class CircuitBreaker:
+    """Stops calling an engine after repeated failures, then lets one trial call through after a cool-down."""
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        # Half-open admits a single trial caller; the rest are turned away until it reports back.
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "open" or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.trial_in_flight = False
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                # A failed trial call in the half-open state re-opens the breaker for another cool-down.
+                self.opened_at = time.monotonic()
+
+
+class EngineChain:
+    """Tries engines in order with a per-engine timeout and circuit breaker, falling back on failure."""
+
+    def __init__(self, engines, timeout=10.0, failure_threshold=3, reset_timeout=30.0):
+        self.engines = list(engines)
+        self.timeout = timeout
+        self.breakers = {e.name: CircuitBreaker(failure_threshold, reset_timeout) for e in self.engines}
+        self.executor = ThreadPoolExecutor(max_workers=max(4, 2 * len(self.engines)), thread_name_prefix="asr")
+
+    def transcribe(self, audio):
+        for engine in self.engines:
+            breaker = self.breakers[engine.name]
+            if not breaker.allow():
+                continue
+            future = self.executor.submit(engine.transcribe, audio)
+            try:
+                text = future.result(timeout=self.timeout)
+            except sr.UnknownValueError:
+                # The engine worked but heard no speech; that is an answer, not a failure.
+                breaker.record_success()
+                return ""
+            except FutureTimeoutError:
+                logger.warning("ASR engine %s timed out after %.1fs", engine.name, self.timeout)
+                breaker.record_failure()
+                continue
+            except Exception as e:
+                logger.warning("ASR engine %s failed: %s", engine.name, e)
+                breaker.record_failure()
+                continue
+            breaker.record_success()
+            return text
+        logger.error("No ASR engine produced a transcript")
+        return ""
+
+    def status(self):
+        return {name: breaker.state for name, breaker in self.breakers.items()}
+
+
+def build_engine(name, fake_transcript="", timeout=None):
+    if name == "google":
+        return GoogleEngine(timeout)
+    if name == "sphinx":
+        return SphinxEngine()
+    if name == "fake":
+        return FakeEngine(default=fake_transcript)
+    raise ValueError(f"Unknown ASR engine: {name}")
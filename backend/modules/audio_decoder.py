@@ -0,0 +1,144 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+import subprocess
+import threading
+
+from modules.tracing import span
+
+try:
+    import av
+except ImportError:  # PyAV is optional; without it every upload is piped through ffmpeg.
+    av = None
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # bytes per sample, signed 16-bit little-endian
+
+
+class DecoderPool:
+    """Decodes uploaded audio (webm/opus, ogg, wav, ...) to 16 kHz mono PCM entirely in memory.
+
+    With PyAV installed the upload is decoded in-process by the pool threads. Otherwise
+    the bytes are piped through ffmpeg's stdin/stdout, which still avoids temp files but
+    costs a process spawn per upload. The pool size bounds how many decodes run at once,
+    and separately how many streaming ffmpeg processes exist; `open_stream` waits for one
+    to finish when all are taken.
+    """
+
+    def __init__(self, workers=4, backend="auto"):
+        if backend == "auto":
+            backend = "pyav" if av is not None else "ffmpeg"
+        if backend == "pyav" and av is None:
+            raise RuntimeError("The pyav audio decoder requires the 'av' package")
+        self.backend = backend
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio-decoder")
+        self.stream_slots = threading.BoundedSemaphore(workers)
+
+    def decode(self, data):
+        # Returns raw PCM bytes (s16le, mono, 16 kHz).
+        decode = self._decode_pyav if self.backend == "pyav" else self._decode_ffmpeg
+        with span("audio_decode"):
+            return self.executor.submit(decode, data).result()
+
+    def open_stream(self):
+        # Starts an incremental decode for an upload that arrives in chunks.
+        self.stream_slots.acquire()
+        try:
+            return StreamingDecode(on_close=self.stream_slots.release)
+        except Exception:
+            self.stream_slots.release()
+            raise
+
+    def _decode_ffmpeg(self, data):
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "pipe:1"],
+            input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+        )
+        return result.stdout
+
+    def _decode_pyav(self, data):
+        pcm = bytearray()
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+        with av.open(io.BytesIO(data)) as container:
+            for frame in container.decode(audio=0):
+                for out in _as_list(resampler.resample(frame)):
+                    pcm += out.to_ndarray().tobytes()
+        # Flush samples still buffered in the resampler.
+        for out in _as_list(resampler.resample(None)):
+            pcm += out.to_ndarray().tobytes()
+        return bytes(pcm)
+
+
+def _as_list(frames):
+    # PyAV < 9 returns a single frame (or None) from resample(), newer versions a list.
+    if frames is None:
+        return []
+    return frames if isinstance(frames, list) else [frames]
+
+
+class StreamingDecode:
+    """Incremental decode of an upload that arrives in chunks.
+
+    Chunks are written to a long-running ffmpeg's stdin as they arrive, and a reader
+    thread collects PCM from its stdout, so decoding overlaps with the upload and the
+    PCM decoded so far is available through `pcm()` before the upload ends.
+    `on_close` is called once, when the decode is finished or aborted.
+    """
+
+    def __init__(self, on_close=None):
+        self.process = subprocess.Popen(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error",
+             # Start producing output as soon as possible instead of probing seconds of input.
+             "-fflags", "nobuffer", "-probesize", "32768", "-analyzeduration", "0",
+             "-i", "pipe:0", "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self._pcm = bytearray()
+        self._lock = threading.Lock()
+        self._on_close = on_close
+        self._reader = threading.Thread(target=self._read, name="audio-stream-reader", daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        fd = self.process.stdout.fileno()
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            with self._lock:
+                self._pcm += chunk
+
+    def feed(self, chunk):
+        self.process.stdin.write(chunk)
+        self.process.stdin.flush()
+
+    def pcm(self):
+        # PCM decoded so far, trimmed to whole samples.
+        with self._lock:
+            return bytes(self._pcm[:len(self._pcm) - len(self._pcm) % SAMPLE_WIDTH])
+
+    def finish(self):
+        # Signals end of input and returns the complete PCM. The span is the decode time left after the upload.
+        try:
+            with span("audio_decode"):
+                self.process.stdin.close()
+                self._reader.join()
+                self.process.wait()
+        finally:
+            self._close()
+        return self.pcm()
+
+    def abort(self):
+        try:
+            self.process.kill()
+            self._reader.join()
+            self.process.wait()
+        finally:
+            self._close()
+
+    def _close(self):
+        with self._lock:
+            on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close()
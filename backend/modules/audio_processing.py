@@ -1,3 +1,175 @@
-def preprocess_audio(audio_data):
-    # Stub: In a real scenario, process audio (e.g., noise reduction)
-    return audio_data
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from config import Config
+from modules.audio_decoder import SAMPLE_RATE
+
+FRAME_MS = 30  # Analysis frame length for speech detection
+SILENCE_RMS = 500  # int16 RMS below which a frame counts as silence
+NOISE_FLOOR_FACTOR = 3.0  # Speech must be this much louder than the quietest frames
+ZCR_MIN, ZCR_MAX = 0.1, 0.5  # Zero-crossing rate of unvoiced consonants (s, f, th)
+SPEECH_PAD_MS = 150  # Audio kept around detected speech so word edges are not clipped
+MAX_GAIN = 10.0  # Loudness normalization never amplifies by more than this
+PEAK_LIMIT = 32000
+STFT_SIZE = 512
+STFT_HOP = 256
+
+
+def to_samples(pcm, sample_rate=SAMPLE_RATE, channels=1):
+    # s16le PCM as an int16 array at SAMPLE_RATE, mono. 16 kHz mono input is a view, not a copy.
+    samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // 2)
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    if sample_rate != SAMPLE_RATE and len(samples):
+        # Linear interpolation is enough for speech bound for ASR.
+        duration = len(samples) / sample_rate
+        target = np.arange(int(duration * SAMPLE_RATE)) * (sample_rate / SAMPLE_RATE)
+        samples = np.interp(target, np.arange(len(samples)), samples)
+    if samples.dtype != np.int16:
+        samples = np.clip(np.rint(samples), -32768, 32767).astype(np.int16)
+    return samples
+
+
+def frames_of(samples, frame):
+    # Non-overlapping frames as a strided view (a trailing partial frame is ignored).
+    count = len(samples) // frame
+    return as_strided(samples, shape=(count, frame), strides=(samples.strides[0] * frame, samples.strides[0]),
+                      writeable=False)
+
+
+def frame_rms(pcm, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS):
+    # RMS energy of consecutive frames of s16le mono PCM.
+    samples = pcm if isinstance(pcm, np.ndarray) else to_samples(pcm)
+    frames = frames_of(samples, int(sample_rate * frame_ms / 1000))
+    if len(frames) == 0:
+        return np.zeros(0)
+    frames = frames.astype(np.float32)
+    return np.sqrt(np.einsum("ij,ij->i", frames, frames) / frames.shape[1])
+
+
+def voiced_frames(samples, frame_ms=FRAME_MS):
+    # Energy/zero-crossing VAD: a frame is speech if it is clearly above both the absolute
+    # silence level and the recording's own noise floor, or if it is quieter but hisses
+    # like an unvoiced consonant.
+    frame = int(SAMPLE_RATE * frame_ms / 1000)
+    frames = frames_of(samples, frame)
+    if len(frames) == 0:
+        return np.zeros(0, dtype=bool)
+    rms = frame_rms(samples, frame_ms=frame_ms)
+    noise_floor = np.percentile(rms, 10)
+    threshold = max(SILENCE_RMS, noise_floor * NOISE_FLOOR_FACTOR)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame
+    unvoiced = (rms >= threshold / 2) & (zcr >= ZCR_MIN) & (zcr <= ZCR_MAX)
+    return (rms >= threshold) | unvoiced
+
+
+def speech_segments(samples, max_pause_ms=700, frame_ms=FRAME_MS, pad_ms=SPEECH_PAD_MS):
+    # (start, end) sample ranges of speech, split wherever a pause lasts max_pause_ms or more.
+    voiced = voiced_frames(samples, frame_ms)
+    if not voiced.any():
+        return []
+    frame = int(SAMPLE_RATE * frame_ms / 1000)
+    # Runs of voiced frames, then runs closer together than max_pause_ms are merged.
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    gaps = (starts[1:] - ends[:-1]) * frame_ms
+    split = np.flatnonzero(gaps >= max_pause_ms)
+    seg_starts = np.concatenate(([starts[0]], starts[split + 1]))
+    seg_ends = np.concatenate((ends[split], [ends[-1]]))
+    pad = int(SAMPLE_RATE * pad_ms / 1000)
+    return [(max(0, s * frame - pad), min(len(samples), e * frame + pad)) for s, e in zip(seg_starts, seg_ends)]
+
+
+def normalize_loudness(samples, target_dbfs=-20.0):
+    # Gain that brings speech to target_dbfs RMS, limited by MAX_GAIN and by the peak.
+    if not len(samples):
+        return 1.0
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float32))))
+    if rms == 0:
+        return 1.0
+    gain = min(MAX_GAIN, 32768 * 10 ** (target_dbfs / 20) / rms)
+    peak = int(np.max(np.abs(samples.astype(np.int32))))
+    return min(gain, PEAK_LIMIT / peak) if peak else gain
+
+
+def spectral_gate(samples, noise_samples, threshold=1.5):
+    # Denoise by zeroing STFT bins that are not clearly above the noise spectrum.
+    window = np.hanning(STFT_SIZE).astype(np.float32)
+    if len(samples) < STFT_SIZE:
+        return samples.astype(np.float32)
+    padded = np.concatenate((samples.astype(np.float32), np.zeros(STFT_SIZE, dtype=np.float32)))
+    count = (len(samples) - STFT_SIZE) // STFT_HOP + 2
+    frames = as_strided(padded, shape=(count, STFT_SIZE),
+                        strides=(padded.strides[0] * STFT_HOP, padded.strides[0]), writeable=False)
+    spectrum = np.fft.rfft(frames * window, axis=1)
+    if len(noise_samples) >= STFT_SIZE:
+        noise_frames = frames_of(noise_samples.astype(np.float32), STFT_SIZE)
+        noise = np.abs(np.fft.rfft(noise_frames * window, axis=1)).mean(axis=0)
+    else:
+        # No pause to learn from: use the quietest tenth of the frames.
+        magnitude = np.abs(spectrum)
+        quietest = np.argsort(magnitude.sum(axis=1))[:max(1, count // 10)]
+        noise = magnitude[quietest].mean(axis=0)
+    spectrum *= np.abs(spectrum) > noise * threshold
+    restored = np.fft.irfft(spectrum, n=STFT_SIZE, axis=1) * window
+    # Overlap-add, normalized by the summed squared window.
+    out = np.zeros(len(padded), dtype=np.float32)
+    norm = np.zeros(len(padded), dtype=np.float32)
+    for i in range(count):
+        start = i * STFT_HOP
+        out[start:start + STFT_SIZE] += restored[i]
+        norm[start:start + STFT_SIZE] += window * window
+    return out[:len(samples)] / np.maximum(norm[:len(samples)], 1e-3)
+
+
+def preprocess_audio(audio_data, sample_rate=SAMPLE_RATE, channels=1, denoise=None, max_pause_ms=None,
+                     keep_pause_ms=None, target_dbfs=None):
+    """Prepares PCM for ASR: 16 kHz mono, silence trimmed, long pauses shortened, loudness normalized.
+
+    Takes and returns s16le PCM bytes. Returns b"" when no speech is found, so the
+    caller can skip ASR altogether. Pauses of `max_pause_ms` or more are cut down
+    to `keep_pause_ms`. With `denoise`, stationary background noise is removed by
+    spectral gating, with the noise learned from the non-speech parts.
+    """
+    if not Config.AUDIO_PREPROCESS:
+        return audio_data
+    denoise = Config.AUDIO_DENOISE if denoise is None else denoise
+    max_pause_ms = Config.AUDIO_MAX_PAUSE_MS if max_pause_ms is None else max_pause_ms
+    keep_pause_ms = Config.AUDIO_KEEP_PAUSE_MS if keep_pause_ms is None else keep_pause_ms
+    target_dbfs = Config.AUDIO_TARGET_DBFS if target_dbfs is None else target_dbfs
+
+    samples = to_samples(audio_data, sample_rate, channels)
+    segments = speech_segments(samples, max_pause_ms)
+    if not segments:
+        return b""
+
+    if denoise:
+        mask = np.ones(len(samples), dtype=bool)
+        for start, end in segments:
+            mask[start:end] = False
+        working = spectral_gate(samples, samples[mask])
+    else:
+        working = samples
+
+    # Speech segments separated by short pauses, assembled into one float buffer.
+    gap = int(SAMPLE_RATE * keep_pause_ms / 1000)
+    total = sum(end - start for start, end in segments) + gap * (len(segments) - 1)
+    out = np.zeros(total, dtype=np.float32)
+    pos = 0
+    for start, end in segments:
+        out[pos:pos + end - start] = working[start:end]
+        pos += end - start + gap
+
+    out *= normalize_loudness(out, target_dbfs)
+    np.clip(out, -32768, 32767, out=out)
+    return np.rint(out, out=out).astype(np.int16).tobytes()
+
+
+def trailing_silence_ms(pcm, sample_rate=SAMPLE_RATE, threshold=SILENCE_RMS, frame_ms=FRAME_MS):
+    # Length of the silence at the end of the PCM in ms, or None while no speech has been heard yet.
+    voiced = frame_rms(pcm, sample_rate, frame_ms) >= threshold
+    if not voiced.any():
+        return None
+    last_voiced = len(voiced) - 1 - int(np.argmax(voiced[::-1]))
+    return (len(voiced) - 1 - last_voiced) * frame_ms
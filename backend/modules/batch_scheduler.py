@@ -0,0 +1,77 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class BatchScheduler:
+    """Collects concurrent requests for a few milliseconds and runs them as one batch.
+
+    `batch_fn` receives a list of items and must return a list of results in the
+    same order. Each caller of `submit` blocks until its own result is ready.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=10):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+    def submit(self, item, timeout=None):
+        # Queue the item and wait for the batch it ends up in to finish.
+        return self.submit_async(item).result(timeout=timeout)
+
+    def submit_async(self, item):
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future))
+        return future
+
+    def _ensure_worker(self):
+        # The worker thread does not survive a fork, so (re)start it lazily per process.
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+            self._worker.start()
+
+    def _collect_batch(self):
+        # Block for the first request, then wait up to max_wait for more to arrive.
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Requests cancelled while they were queued are left out of the batch.
+            batch = [(item, future) for item, future in self._collect_batch()
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                results = self.batch_fn(items)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
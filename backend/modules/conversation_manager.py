@@ -1,128 +1,232 @@
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+from transformers import AutoTokenizer, TextIteratorStreamer
+from collections import OrderedDict
+import logging
+import threading
 import torch
 
-class ConversationManager:
+from config import Config
+from modules.batch_scheduler import BatchScheduler
+from modules.cache import LRUCache
+from modules.inference_backends import load_backend
+from modules.session_summary import SessionSummary
+from modules.tracing import span
+
+MODEL_NAME = "facebook/blenderbot-400M-distill"
+DEFAULT_SESSION = "default"
+HISTORY_WINDOW = 6  # Number of most recent turns used as context for the model.
+MAX_INPUT_TOKENS = 100  # Model input budget, including special tokens.
+
+logger = logging.getLogger(__name__)
+
+class ReplyClaim:
+    """Decides which of a model reply and the fallback that replaced it goes into the history.
+
+    The first `claim()` wins. Once the fallback has claimed the turn, a generation still
+    queued in the batch scheduler is cancelled, and a reply that arrives late is dropped.
+    """
+
     def __init__(self):
-        # Loads the tokenizer and model for generating system responses.
-        self.tokenizer = AutoTokenizer.from_pretrained("facebook/blenderbot-400M-distill")
-        self.model = AutoModelForSeq2SeqLM.from_pretrained("facebook/blenderbot-400M-distill")
-        self.history = []  # List to maintain the history of the conversation as (speaker, text) tuples.
+        self.pending = None  # the generation's future, once it is queued
+        self.claimed = False
+        self._lock = threading.Lock()
+
+    def claim(self):
+        with self._lock:
+            if self.claimed:
+                return False
+            self.claimed = True
+        if self.pending is not None:
+            self.pending.cancel()
+        return True
+
+
+def decoding_budget():
+    # Generation arguments from Config; unset ones are left to the model's defaults.
+    budget = {
+        "max_new_tokens": Config.GENERATION_MAX_NEW_TOKENS,
+        "num_beams": Config.GENERATION_NUM_BEAMS,
+        "early_stopping": Config.GENERATION_EARLY_STOPPING,
+        "max_time": Config.GENERATION_MAX_TIME,
+    }
+    return {name: value for name, value in budget.items() if value is not None}
 
-    def handle_input(self, intent, user_text):
+class ConversationManager:
+    def __init__(self, max_batch_size=None, max_wait_ms=None, max_sessions=None, encoder_cache_size=None,
+                 backend=None, decoding=None):
+        # Loads the tokenizer and the inference backend (torch, int8 or onnx) for generating system responses.
+        self.tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        self.backend = load_backend(
+            backend or Config.INFERENCE_BACKEND,
+            MODEL_NAME,
+            onnx_model_dir=Config.ONNX_MODEL_DIR,
+            onnx_num_beams=Config.ONNX_NUM_BEAMS,
+        )
+        # Decoding arguments (max_new_tokens, num_beams, early_stopping, max_time) for every reply.
+        self.decoding = decoding_budget() if decoding is None else dict(decoding)
+        # Conversation history per session as (speaker, text, token_ids) tuples, least recently used first.
+        # Each turn is tokenized once when it is added, so building a prompt never re-tokenizes old turns.
+        self.histories = OrderedDict()
+        self.max_sessions = max_sessions or Config.MAX_CONVERSATION_SESSIONS
+        self.history_lock = threading.Lock()
+        self.prompt_suffix_ids = self.tokenizer("System:", add_special_tokens=False).input_ids
+        # Encoder outputs keyed by the exact input ids, reused when the same window is seen again.
+        self.encoder_cache = LRUCache(
+            maxsize=Config.ENCODER_CACHE_SIZE if encoder_cache_size is None else encoder_cache_size
+        )
+        # Concurrent generate_response calls are grouped into one batched model.generate.
+        self.scheduler = BatchScheduler(
+            self._generate_batch,
+            max_batch_size=max_batch_size or Config.GENERATION_MAX_BATCH_SIZE,
+            max_wait_ms=Config.GENERATION_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms,
+        )
+
+    def get_history(self, session_id=DEFAULT_SESSION):
+        # Returns a copy of the recent turns for the session.
+        with self.history_lock:
+            return list(self.histories.get(session_id, []))
+
+    def append_turn(self, session_id, speaker, text):
+        # Tokenize only the new turn, exactly as it appears in the dialogue prompt.
+        token_ids = self.tokenizer(f"{speaker}: {text}\n", add_special_tokens=False).input_ids
+        with self.history_lock:
+            history = self.histories.pop(session_id, [])
+            history.append((speaker, text, token_ids))
+            # Only the last HISTORY_WINDOW turns are ever used to build the prompt.
+            del history[:-HISTORY_WINDOW]
+            self.histories[session_id] = history
+            # Forget the least recently active sessions once the store is full.
+            while len(self.histories) > self.max_sessions:
+                self.histories.popitem(last=False)
+
+    def reset_session(self, session_id=DEFAULT_SESSION):
+        with self.history_lock:
+            self.histories.pop(session_id, None)
+
+    def handle_input(self, intent, user_text, session_id=DEFAULT_SESSION):
         # Handles user input based on the detected intent.
         if intent == "goodbye":
             # If the intent is 'goodbye', return None to indicate that a summary should be generated externally.
             return None  # Caller will handle summary logic
         # Append the user's input to the conversation history.
-        self.history.append(("User", user_text))
+        self.append_turn(session_id, "User", user_text)
         # Generate and return the system's response.
-        return self.generate_response()
-
-    def generate_response(self):
-        # Constructs a dialogue prompt from the last few turns to maintain context.
-        dialogue = ""
-        for speaker, text in self.history[-6:]:
-            dialogue += f"{speaker}: {text}\n"
-        dialogue += "System:"
-
-        # Tokenize the dialogue input for the model, ensuring it doesn't exceed the maximum length.
-        inputs = self.tokenizer([dialogue], return_tensors="pt", truncation=True, max_length=100)
-        # Generate a response using the pre-trained model.
-        reply_ids = self.model.generate(**inputs, max_length=128)
-        # Decode the generated tokens into a human-readable string.
-        response = self.tokenizer.batch_decode(reply_ids, skip_special_tokens=True)[0]
+        return self.generate_response(session_id)
+
+    def build_input_ids(self, session_id=DEFAULT_SESSION):
+        # Assembles the "Speaker: text\n ... System:" prompt from the cached token ids of the last few turns.
+        ids = []
+        for _, _, token_ids in self.get_history(session_id)[-HISTORY_WINDOW:]:
+            ids.extend(token_ids)
+        ids.extend(self.prompt_suffix_ids)
+        # Keep the most recent tokens when the window is over budget, so the "System:" cue is never cut off.
+        budget = MAX_INPUT_TOKENS - self.tokenizer.num_special_tokens_to_add()
+        return self.tokenizer.build_inputs_with_special_tokens(ids[-budget:])
+
+    def generate_response(self, session_id=DEFAULT_SESSION, input_ids=None, claim=None):
+        # Waits for the batch scheduler to run this prompt together with any other pending ones.
+        # `input_ids` is the session's prompt when the caller has already built it. With a
+        # ReplyClaim, the reply only enters the history if no fallback answered the turn first.
+        if input_ids is None:
+            input_ids = self.build_input_ids(session_id)
+        with span("generation"):
+            future = self.scheduler.submit_async(input_ids)
+            if claim is not None:
+                claim.pending = future
+            response = future.result()
         # Append the system's response to the conversation history.
-        self.history.append(("System", response))
+        if claim is None or claim.claim():
+            self.append_turn(session_id, "System", response)
         return response
 
+    def decoding_for(self, streamed=False):
+        # Decoding arguments of batched replies, or of streamed ones (greedy, same budget).
+        if not streamed:
+            return dict(self.decoding)
+        decoding = {name: value for name, value in self.decoding.items() if name != "early_stopping"}
+        decoding["num_beams"] = 1
+        return decoding
+
+    def stream_response(self, session_id=DEFAULT_SESSION, input_ids=None, outcome=None):
+        """Yields the reply text in pieces (about a word each) while it is being decoded.
+
+        The prompt is decoded on its own and greedily, outside the batch scheduler, with
+        the same max_new_tokens/max_time budget. The full reply is added to the history
+        once the last piece has been produced. If an `outcome` dict is given, its
+        "complete" entry then says whether the reply ended with the end-of-sequence token,
+        i.e. was neither cut short by the budget nor ended by a generation error.
+        """
+        if input_ids is None:
+            input_ids = self.build_input_ids(session_id)
+        ids = torch.tensor([input_ids], dtype=torch.long)
+        attention_mask = torch.ones_like(ids)
+        encoder_hidden_states = self._encode([input_ids], ids, attention_mask)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        decoding = self.decoding_for(streamed=True)
+        result = {}
+        thread = threading.Thread(
+            target=self._generate_streaming,
+            args=(encoder_hidden_states, attention_mask, streamer, decoding, result),
+            name="generation-stream",
+            daemon=True,
+        )
+        pieces = []
+        # Until the last piece: includes time the consumer spends between pieces.
+        with span("generation"):
+            thread.start()
+            for piece in streamer:
+                if piece:
+                    pieces.append(piece)
+                    yield piece
+            thread.join()
+        self.append_turn(session_id, "System", "".join(pieces).strip())
+        if outcome is not None:
+            reply_ids = result.get("reply_ids")
+            outcome["complete"] = bool(reply_ids) and reply_ids[-1] == self.tokenizer.eos_token_id
+
+    def _generate_streaming(self, encoder_hidden_states, attention_mask, streamer, decoding, result):
+        try:
+            result["reply_ids"] = self.backend.generate(encoder_hidden_states, attention_mask, max_length=128,
+                                                        streamer=streamer, **decoding)[0]
+        except Exception:
+            logger.exception("Streaming generation failed")
+            # Unblock the consumer; the reply ends with whatever was decoded so far.
+            streamer.end()
+
+    def _generate_batch(self, batch_ids):
+        # Right-pad all prompts in the batch to the longest one.
+        max_len = max(len(ids) for ids in batch_ids)
+        input_ids = torch.full((len(batch_ids), max_len), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch_ids), max_len), dtype=torch.long)
+        for i, ids in enumerate(batch_ids):
+            input_ids[i, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[i, :len(ids)] = 1
+
+        # Generate responses for the whole batch from the (partly cached) encoder outputs.
+        encoder_hidden_states = self._encode(batch_ids, input_ids, attention_mask)
+        reply_ids = self.backend.generate(encoder_hidden_states, attention_mask, max_length=128, **self.decoding)
+        # Decode the generated tokens into human-readable strings, one per prompt.
+        return self.tokenizer.batch_decode(reply_ids, skip_special_tokens=True)
+
+    def _encode(self, batch_ids, input_ids, attention_mask):
+        # Looks up each prompt in the encoder cache and runs the encoder once over the misses.
+        # With right padding the states at real positions do not depend on the padding, so
+        # unpadded states can be cached per prompt and re-padded into any batch.
+        keys = [tuple(ids) for ids in batch_ids]
+        states = [self.encoder_cache.get(key) for key in keys]
+        missing = [i for i, state in enumerate(states) if state is None]
+        if missing:
+            sub_len = max(len(batch_ids[i]) for i in missing)
+            hidden = self.backend.encode(input_ids[missing, :sub_len], attention_mask[missing, :sub_len])
+            for row, i in enumerate(missing):
+                states[i] = hidden[row, :len(batch_ids[i])].clone()
+                self.encoder_cache.put(keys[i], states[i])
+
+        padded = states[0].new_zeros((len(batch_ids), input_ids.shape[1], states[0].shape[-1]))
+        for i, state in enumerate(states):
+            padded[i, :state.shape[0]] = state
+        return padded
+
     def generate_summary(self, convos):
-        # Generates an HTML-formatted summary of the entire conversation session, including grammar and pronunciation analysis.
-        summary_parts = ["<h2>Detailed Summary of Your Session:</h2>"]
-
-        grammar_any = False  # Flag to track if any grammar issues were detected.
-        pron_any = False     # Flag to track if any pronunciation issues were detected.
-
-        for c in convos:
-            ge = c.get_grammar_errors()
-            pe = c.get_pronunciation_errors()
-            pa = c.get_pattern_analysis()
-
-            if ge or pe or pa:
-                # Add the user's utterance if there are any related analyses.
-                summary_parts.append(f"<h4>Your utterance: '{c.user_text}'</h4>")
-
-            if pa:
-                # Include pattern analysis details such as filler words and category.
-                filler_count = pa.get("filler_count", 0)
-                category = pa.get("category", "statement")
-                if filler_count > 0:
-                    summary_parts.append(f"<p>This was categorized as a {category} and contained {filler_count} filler words.</p>")
-                else:
-                    summary_parts.append(f"<p>This was categorized as a {category} with no filler words detected.</p>")
-
-            # Process grammar errors, if any.
-            for err in ge:
-                grammar_any = True
-                original = err["original_sentence"]
-                error_word = err["error_word"]
-                suggestion = err["suggestion"]
-                explanation = err["explanation"]
-                summary_parts.append(
-                    f"<p><strong>Grammar Issue:</strong> In '{original}', '{error_word}' should be '{suggestion}'. {explanation}</p>"
-                )
-
-            # Process pronunciation errors, if any.
-            for err in pe:
-                pron_any = True
-                w = err["word"]
-                user_ph = " ".join(err['user_phonemes'])
-                correct_ph = " ".join(err['correct_phonemes'])
-                user_ipa = " ".join(err['user_ipa'])
-                correct_ipa = " ".join(err['correct_ipa'])
-                diff_note = err["difference_note"]
-
-                # Identify the index where phonemes mismatch to highlight it.
-                mismatchIndex = -1
-                for i in range(min(len(err['user_phonemes']), len(err['correct_phonemes']))):
-                    if err['user_phonemes'][i] != err['correct_phonemes'][i]:
-                        mismatchIndex = i
-                        break
-
-                # Build HTML for correct phonemes with a button to hear the phoneme.
-                correctPhHTML = ""
-                for i, ph in enumerate(err['correct_phonemes']):
-                    if i == mismatchIndex:
-                        correctPhHTML += f'<span style="color:red;">{ph}</span> <button class="btn btn-sm btn-info" onclick="playPhoneme(\'{ph}\')">Hear</button> '
-                    else:
-                        correctPhHTML += ph + " "
-
-                # Build HTML for correct IPA with highlighted mismatched phoneme.
-                correctIpaHTML = ""
-                for i, ph in enumerate(err['correct_ipa']):
-                    if i == mismatchIndex:
-                        correctIpaHTML += f'<span style="color:red;">{ph}</span> '
-                    else:
-                        correctIpaHTML += ph + " "
-
-                summary_parts.append(
-                    f"<div class='card card-body bg-light mb-3'>"
-                    f"<strong>Pronunciation Issue:</strong> The word '{w}' was mispronounced.<br>"
-                    f"You said (ARPAbet): [{user_ph}]<br>"
-                    f"You said (IPA): [{user_ipa}]<br>"
-                    f"Try (ARPAbet): [{correctPhHTML}]<br>"
-                    f"Try (IPA): [{correctIpaHTML}]<br>"
-                    f"{diff_note}"
-                    f"</div>"
-                )
-
-        # Add messages if no grammar or pronunciation issues were detected.
-        if not grammar_any:
-            summary_parts.append("<p>No significant grammar issues detected.</p>")
-        if not pron_any:
-            summary_parts.append("<p>No significant pronunciation issues detected.</p>")
-
-        # Closing message for the summary.
-        summary_parts.append("<p>Thank you for practicing! Goodbye.</p>")
-
-        # Combine all parts into a single HTML string.
-        return "\n".join(summary_parts)
+        # Generates an HTML-formatted summary of the given conversation rows, including grammar and pronunciation analysis.
+        # The live app keeps a running summary per session instead (modules/session_summary.py).
+        return SessionSummary.from_rows(convos).render()
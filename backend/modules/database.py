@@ -1,8 +1,162 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from modules.models import Base
-
-engine = create_engine('sqlite:///database.db', echo=False)
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-db_session = Session()
+import logging
+import os
+import queue
+import threading
+import time
+
+from flask import has_app_context
+from flask.globals import app_ctx
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from config import Config
+from modules.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Applied to every new SQLite connection: WAL lets readers run alongside the single writer,
+# and synchronous=NORMAL is durable in WAL mode while syncing far less often.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+def create_db_engine(uri, sqlite_pragmas=True):
+    if uri.startswith("sqlite"):
+        # In-memory databases live in a single connection, so they keep SQLAlchemy's default pool.
+        pool_args = {} if ":memory:" in uri or uri == "sqlite://" else {
+            "pool_size": Config.DB_POOL_SIZE,
+            "max_overflow": Config.DB_MAX_OVERFLOW,
+        }
+        engine = create_engine(
+            uri,
+            echo=False,
+            connect_args={"check_same_thread": False, "timeout": 30},
+            **pool_args
+        )
+        if sqlite_pragmas:
+            @event.listens_for(engine, "connect")
+            def _set_sqlite_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                for pragma in SQLITE_PRAGMAS:
+                    cursor.execute(pragma)
+                cursor.close()
+        return engine
+    return create_engine(
+        uri,
+        echo=False,
+        pool_size=Config.DB_POOL_SIZE,
+        max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=Config.DB_POOL_RECYCLE,
+    )
+
+# The schema is created and migrated by modules.migrations.upgrade, not on import.
+engine = create_db_engine(Config.SQLALCHEMY_DATABASE_URI)
+
+Session = sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def session_scope():
+    # Async views run on an asgiref thread while teardown runs on the request thread, so a
+    # per-thread scope would leak their sessions. Both share the app context, which gets one
+    # session that app.py removes when the request ends; code outside a request gets one per thread.
+    if has_app_context():
+        return app_ctx._get_current_object()
+    return threading.get_ident()
+
+
+db_session = scoped_session(Session, scopefunc=session_scope)
+
+
+class WriteBehindQueue:
+    """Batches inserts from many requests into grouped transactions on a background thread."""
+
+    def __init__(self, session_factory, batch_size=50, flush_interval=0.05):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+    def enqueue(self, obj):
+        self._ensure_worker()
+        self._queue.put(obj)
+
+    def flush(self, timeout=None):
+        # Blocks until everything enqueued before this call has been committed.
+        done = threading.Event()
+        self._ensure_worker()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _ensure_worker(self):
+        # The writer thread does not survive a fork, so (re)start it lazily per process.
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+            self._worker.start()
+
+    def _collect(self):
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(items) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            objects = [item for item in items if not isinstance(item, threading.Event)]
+            if objects:
+                session = self.session_factory()
+                try:
+                    # Batches are shared by requests, so this only feeds the stage histogram.
+                    with span("db_batch_commit"):
+                        session.add_all(objects)
+                        session.commit()
+                except Exception:
+                    logger.exception("Write-behind batch of %d rows failed", len(objects))
+                    session.rollback()
+                finally:
+                    session.close()
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+
+write_queue = WriteBehindQueue(Session, batch_size=Config.DB_WRITE_BATCH_SIZE,
+                               flush_interval=Config.DB_WRITE_FLUSH_MS / 1000.0)
+
+def save_conversation(convo):
+    # Queued for a grouped commit when write-behind is enabled, otherwise committed right away.
+    if Config.DB_WRITE_BEHIND:
+        write_queue.enqueue(convo)
+    else:
+        with span("db_write"):
+            db_session.add(convo)
+            db_session.commit()
+
+def flush_writes():
+    # Makes queued rows visible to queries, e.g. before building a summary.
+    if Config.DB_WRITE_BEHIND:
+        with span("db_flush"):
+            write_queue.flush()
@@ -1 +1,168 @@
-# Placeholder for more complex logic
+import re
+import threading
+import time
+
+from config import Config
+from modules.cache import LRUCache
+from modules.response_generator import ResponseGenerator
+from modules.topics import topics_content
+from modules.tracing import metrics
+
+# Intents answered from ResponseGenerator templates. The classifier only reports them above
+# INTENT_CONFIDENCE_THRESHOLD; anything less sure is "general" and goes on to the later paths.
+TEMPLATE_INTENTS = ("greeting", "ask_health")
+# Words that make a mention of a grammar topic a request for an explanation.
+EXPLAIN_CUES = {"what", "explain", "tell", "teach", "how", "help", "mean", "means", "understand", "learn"}
+PATHS = ("template", "topic", "cache", "neural")
+replies_total = metrics.counter("dialogue_replies_total", "Replies by dialogue policy path.")
+
+
+def topic_patterns(topics):
+    # Topic key -> regex for its name, singular or plural ("sentence_structure" -> "sentence structures?").
+    patterns = {}
+    for key in topics:
+        name = key.replace("_", " ")
+        stem = name[:-1] if name.endswith("s") else name
+        patterns[key] = re.compile(r"\b" + re.escape(stem) + r"s?\b")
+    return patterns
+
+
+class DialoguePolicy:
+    """Chooses how each turn is answered, cheapest first.
+
+    - template: confident greetings and health questions (ResponseGenerator).
+    - topic: questions about a grammar topic get its explanation from topics_content.
+    - cache: a prompt window that was answered before gets the same reply. The key is the
+      exact model input plus the decoding mode and budget, so a hit returns what BlenderBot
+      would have generated for this request. Streamed replies are only cached when they
+      ended on their own (not cut short by max_time or max_new_tokens, nor by an error).
+    - neural: BlenderBot through ConversationManager.
+
+    Every path keeps the exchange in the session history, and the path and its latency are
+    counted so `stats()` shows the share of turns served without the model.
+    """
+
+    def __init__(self, conversation_manager, response_generator=None, topics=None, cache_size=None, cache_ttl=None):
+        self.manager = conversation_manager
+        self.templates = response_generator or ResponseGenerator()
+        self.topics = topics_content if topics is None else topics
+        self.topic_patterns = topic_patterns(self.topics)
+        self.cache = LRUCache(
+            maxsize=Config.RESPONSE_CACHE_SIZE if cache_size is None else cache_size,
+            ttl=Config.RESPONSE_CACHE_TTL if cache_ttl is None else cache_ttl,
+        )
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(PATHS, 0)
+        self._total_ms = dict.fromkeys(PATHS, 0.0)
+
+    def respond(self, intent, entities, user_text, session_id, claim=None):
+        # Returns (reply, path). With a ReplyClaim, the reply only enters the history if it wins the claim.
+        start = time.perf_counter()
+        result = self._respond_without_model(intent, entities, user_text, session_id, claim)
+        if result is None:
+            reply, input_ids, key = self._cached_reply(session_id, user_text, streamed=False, claim=claim)
+            if reply is not None:
+                result = reply, "cache"
+            else:
+                reply = self.manager.generate_response(session_id, input_ids, claim=claim)
+                self.cache.put(key, reply)
+                result = reply, "neural"
+        self._record(result[1], (time.perf_counter() - start) * 1000)
+        return result
+
+    def respond_stream(self, intent, entities, user_text, session_id):
+        """Like `respond`, but returns (path, pieces) where pieces is an iterator of reply text.
+
+        Generated replies arrive piece by piece as they are decoded; every other path
+        yields its whole reply at once. The path is known before any text is produced.
+        """
+        start = time.perf_counter()
+        result = self._respond_without_model(intent, entities, user_text, session_id)
+        if result is None:
+            reply, input_ids, key = self._cached_reply(session_id, user_text, streamed=True)
+            if reply is None:
+                return "neural", self._stream_generated(session_id, input_ids, key, start)
+            result = reply, "cache"
+        self._record(result[1], (time.perf_counter() - start) * 1000)
+        return result[1], iter([result[0]])
+
+    def _stream_generated(self, session_id, input_ids, key, start):
+        pieces = []
+        outcome = {}
+        for piece in self.manager.stream_response(session_id, input_ids, outcome=outcome):
+            pieces.append(piece)
+            yield piece
+        if outcome.get("complete"):
+            self.cache.put(key, "".join(pieces).strip())
+        self._record("neural", (time.perf_counter() - start) * 1000)
+
+    def _respond_without_model(self, intent, entities, user_text, session_id, claim=None):
+        # (reply, path) from a template or topic explanation, or None if neither applies.
+        if intent in TEMPLATE_INTENTS:
+            reply, path = self.templates.generate(intent, entities, user_text), "template"
+        else:
+            topic = self.match_topic(user_text)
+            if topic is None:
+                return None
+            reply, path = self.topics[topic], "topic"
+        # Keep the exchange in the history so later model replies have the context.
+        self.manager.append_turn(session_id, "User", user_text)
+        self._append_reply(session_id, reply, claim)
+        return reply, path
+
+    def _cached_reply(self, session_id, user_text, streamed, claim=None):
+        # Adds the user turn and looks its prompt window up in the cache: (reply or None, prompt ids, key).
+        self.manager.append_turn(session_id, "User", user_text)
+        input_ids = self.manager.build_input_ids(session_id)
+        decoding = tuple(sorted(self.manager.decoding_for(streamed).items()))
+        key = ("streamed" if streamed else "batched", decoding, tuple(input_ids))
+        reply = self.cache.get(key)
+        if reply is not None:
+            self._append_reply(session_id, reply, claim)
+        return reply, input_ids, key
+
+    def _append_reply(self, session_id, reply, claim):
+        if claim is None or claim.claim():
+            self.manager.append_turn(session_id, "System", reply)
+
+    def match_topic(self, user_text):
+        # The topic a question is about, or None. A bare mention ("I like adjectives") does not count.
+        text = user_text.lower()
+        words = set(re.findall(r"[a-z']+", text))
+        if not (words & EXPLAIN_CUES or text.rstrip().endswith("?")):
+            return None
+        for key, pattern in self.topic_patterns.items():
+            if pattern.search(text):
+                return key
+        return None
+
+    def _record(self, path, elapsed_ms):
+        replies_total.inc(path=path)
+        with self._lock:
+            self._counts[path] += 1
+            self._total_ms[path] += elapsed_ms
+
+    def stats(self):
+        # Turns and mean latency per path, and the share answered without running the model.
+        with self._lock:
+            counts = dict(self._counts)
+            total_ms = dict(self._total_ms)
+        turns = sum(counts.values())
+        return {
+            "turns": turns,
+            "without_model": (turns - counts["neural"]) / turns if turns else 0.0,
+            "paths": {
+                path: {
+                    "turns": counts[path],
+                    "share": counts[path] / turns if turns else 0.0,
+                    "avg_ms": total_ms[path] / counts[path] if counts[path] else None,
+                }
+                for path in PATHS
+            },
+            "cache": self.cache.stats(),
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._counts = dict.fromkeys(PATHS, 0)
+            self._total_ms = dict.fromkeys(PATHS, 0.0)
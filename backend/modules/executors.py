@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+
+from config import Config
+
+
+class BoundedExecutor:
+    """A fixed-size thread pool that async views can await.
+
+    The pool is created lazily and again in every process, since its threads do
+    not survive a fork. `submit` and `run` copy the caller's context, so request-scoped
+    context variables (e.g. the request's trace) are visible to the function in the pool thread.
+    """
+
+    def __init__(self, max_workers, name):
+        self.max_workers = max(1, int(max_workers))
+        self.name = name
+        self._lock = threading.Lock()
+        self._pool_instance = None
+        self._pool_pid = None
+
+    def _pool(self):
+        if self._pool_instance is not None and self._pool_pid == os.getpid():
+            return self._pool_instance
+        with self._lock:
+            if self._pool_instance is None or self._pool_pid != os.getpid():
+                self._pool_instance = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+                self._pool_pid = os.getpid()
+            return self._pool_instance
+
+    def submit(self, fn, *args, **kwargs):
+        return self._pool().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        return await loop.run_in_executor(self._pool(), call)
+
+
+# Network-bound work (LanguageTool, Google ASR, gTTS, waiting on the generation batch):
+# threads mostly sleep, so the pool can be large.
+io_executor = BoundedExecutor(Config.IO_EXECUTOR_WORKERS, "io-bound")
+# In-process model calls (spaCy, g2p): no more threads than cores, so requests queue
+# instead of oversubscribing the CPU.
+cpu_executor = BoundedExecutor(Config.CPU_EXECUTOR_WORKERS, "cpu-bound")
@@ -1,15 +1,104 @@
+import hashlib
 import language_tool_python
 
+from config import Config
+from modules.cache import LRUCache
+
+PARAGRAPH_SEPARATOR = "\n\n"
+# Rules that compare a sentence with its neighbours (repeated sentence starts, repeated words,
+# unpaired quotes). In a joined batch the neighbours are other users' texts, so their matches
+# would depend on what the text was batched with; they are ignored in every check.
+CONTEXT_RULES = {
+    "ENGLISH_WORD_REPEAT_BEGINNING_RULE",
+    "PARAGRAPH_REPEAT_BEGINNING_RULE",
+    "STYLE_REPEATED_WORD_RULE_EN",
+    "EN_UNPAIRED_BRACKETS",
+    "EN_UNPAIRED_QUOTES",
+}
+CONTEXT_RULE_PREFIXES = ("EN_REPEATEDWORDS_",)
+
+def is_context_rule(rule_id):
+    return rule_id in CONTEXT_RULES or (rule_id or "").startswith(CONTEXT_RULE_PREFIXES)
+
+def normalize_text(text):
+    # Collapse runs of whitespace so trivially different transcripts share a cache entry.
+    return " ".join(text.split())
+
 class GrammarChecker:
-    def __init__(self):
-        self.tool = language_tool_python.LanguageTool('en-US')
+    def __init__(self, server_url=None):
+        server_url = server_url or Config.LANGUAGETOOL_URL
+        if server_url:
+            # Talk to one LanguageTool server shared by all workers on the host.
+            self.tool = language_tool_python.LanguageTool('en-US', remote_server=server_url)
+        else:
+            self.tool = language_tool_python.LanguageTool('en-US')
+        # Results keyed by a hash of the normalized text.
+        self.cache = LRUCache(maxsize=Config.GRAMMAR_CACHE_SIZE, ttl=Config.GRAMMAR_CACHE_TTL)
+
+    def cache_key(self, text):
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
     def check(self, text):
-        matches = self.tool.check(text)
+        return self.check_batch([text])[0]
+
+    def check_batch(self, texts):
+        # Checks many sentences, sending all uncached ones to LanguageTool in as few requests as possible.
+        texts = [normalize_text(t) for t in texts]
+        results = {}
+        pending = []
+        for text in dict.fromkeys(texts):
+            cached = self.cache.get(self.cache_key(text))
+            if cached is None:
+                pending.append(text)
+            else:
+                results[text] = cached
+
+        for chunk in self._chunks(pending):
+            for text, errors in zip(chunk, self._check_joined(chunk)):
+                self.cache.put(self.cache_key(text), errors)
+                results[text] = errors
+
+        # Hand out copies so callers cannot modify cached results.
+        return [[dict(e) for e in results[text]] for text in texts]
+
+    def _chunks(self, texts):
+        # Groups sentences so a single request stays under the configured size.
+        chunk, size = [], 0
+        for text in texts:
+            if chunk and size + len(text) > Config.GRAMMAR_BATCH_MAX_CHARS:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(text)
+            size += len(text) + len(PARAGRAPH_SEPARATOR)
+        if chunk:
+            yield chunk
+
+    def _check_joined(self, texts):
+        # Sentences are sent as separate paragraphs of one document, and each match is
+        # mapped back to its sentence by offset.
+        matches = self.tool.check(PARAGRAPH_SEPARATOR.join(texts))
+        per_text = [[] for _ in texts]
+        starts = []
+        pos = 0
+        for text in texts:
+            starts.append(pos)
+            pos += len(text) + len(PARAGRAPH_SEPARATOR)
+        idx = 0
+        for m in sorted(matches, key=lambda m: m.offset):
+            while idx + 1 < len(texts) and m.offset >= starts[idx + 1]:
+                idx += 1
+            # Matches reaching into the separator or the next sentence belong to no single text.
+            if m.offset + m.errorLength <= starts[idx] + len(texts[idx]):
+                per_text[idx].append(m)
+        return [self.errors_from_matches(text, ms, base) for text, ms, base in zip(texts, per_text, starts)]
+
+    def errors_from_matches(self, text, matches, base=0):
         errors = []
         for m in matches:
             # Filter out trivial corrections like capitalization of first letter of sentence
-            if self.is_trivial_correction(text, m):
+            if self.is_trivial_correction(text, m, base):
+                continue
+            if is_context_rule(m.ruleId):
                 continue
 
             # Choose a suggestion that changes the meaning (verb form, missing article, etc.)
@@ -17,17 +106,22 @@ class GrammarChecker:
                 suggestion = m.replacements[0]
                 # Explanation: Construct a verbal explanation
                 explanation = self.construct_explanation(text, m, suggestion)
+                offset = m.offset - base
                 errors.append({
                     "original_sentence": text,
-                    "error_word": text[m.offset:m.offset+m.errorLength],
+                    "error_word": text[offset:offset+m.errorLength],
                     "suggestion": suggestion,
-                    "explanation": explanation
+                    "explanation": explanation,
+                    # LanguageTool rule and category, kept for per-rule statistics
+                    "rule_id": m.ruleId,
+                    "category": m.category
                 })
         return errors
 
-    def is_trivial_correction(self, text, match):
+    def is_trivial_correction(self, text, match, base=0):
         # Ignore corrections that only add punctuation at the end or only change capitalization at start
-        original_error = text[match.offset:match.offset+match.errorLength]
+        offset = match.offset - base
+        original_error = text[offset:offset+match.errorLength]
         if original_error.istitle() != match.replacements[0].istitle() and match.ruleId in ["UPPERCASE_SENTENCE_START"]:
             return True
         if match.replacements and all(r.lower() == original_error.lower() for r in match.replacements):
@@ -0,0 +1,280 @@
+import os
+import time
+
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoModelForSeq2SeqLM
+from transformers.modeling_outputs import BaseModelOutput
+
+
+class TorchBackend:
+    """Eager fp32 PyTorch inference (the original behaviour)."""
+
+    name = "torch"
+
+    def __init__(self, model_name):
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        self.model.eval()
+        self.config = self.model.config
+
+    def encode(self, input_ids, attention_mask):
+        # Returns the encoder's last hidden state as a [batch, seq, dim] tensor.
+        with torch.no_grad():
+            return self.model.get_encoder()(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    def generate(self, encoder_hidden_states, attention_mask, max_length=128, num_beams=None, max_new_tokens=None,
+                 early_stopping=None, max_time=None, streamer=None):
+        # Decodes replies from precomputed encoder states; returns one list of token ids per row.
+        # max_new_tokens replaces max_length when given; max_time is a wall-clock limit in seconds.
+        # A transformers streamer receives the tokens as they are decoded (one row, greedy only).
+        kwargs = {"max_new_tokens": max_new_tokens} if max_new_tokens else {"max_length": max_length}
+        if num_beams is not None:
+            kwargs["num_beams"] = num_beams
+        if early_stopping is not None:
+            kwargs["early_stopping"] = early_stopping
+        if max_time is not None:
+            kwargs["max_time"] = max_time
+        if streamer is not None:
+            kwargs["streamer"] = streamer
+        with torch.no_grad():
+            reply_ids = self.model.generate(
+                encoder_outputs=BaseModelOutput(last_hidden_state=encoder_hidden_states),
+                attention_mask=attention_mask,
+                **kwargs,
+            )
+        return reply_ids.tolist()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """PyTorch inference with Linear layers dynamically quantized to int8."""
+
+    name = "int8"
+
+    def __init__(self, model_name):
+        super().__init__(model_name)
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class _EncoderForExport(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.get_encoder()
+
+    def forward(self, input_ids, attention_mask):
+        return self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+
+class _DecoderForExport(torch.nn.Module):
+    # Runs the decoder over the whole prefix and returns the logits of the last position only.
+    def __init__(self, model):
+        super().__init__()
+        self.decoder = model.get_decoder()
+        self.lm_head = model.lm_head
+        self.final_logits_bias = model.final_logits_bias
+
+    def forward(self, decoder_input_ids, encoder_hidden_states, encoder_attention_mask):
+        hidden = self.decoder(
+            input_ids=decoder_input_ids,
+            encoder_hidden_states=encoder_hidden_states,
+            encoder_attention_mask=encoder_attention_mask,
+            use_cache=False,
+        ).last_hidden_state
+        return self.lm_head(hidden[:, -1]) + self.final_logits_bias
+
+
+def export_onnx(model_name, output_dir):
+    # Exports the encoder and a last-token decoder graph for OnnxBackend.
+    os.makedirs(output_dir, exist_ok=True)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    model.eval()
+    input_ids = torch.ones((1, 8), dtype=torch.long)
+    attention_mask = torch.ones((1, 8), dtype=torch.long)
+    with torch.no_grad():
+        torch.onnx.export(
+            _EncoderForExport(model),
+            (input_ids, attention_mask),
+            os.path.join(output_dir, "encoder.onnx"),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": {0: "batch", 1: "seq"}, "attention_mask": {0: "batch", 1: "seq"},
+                          "last_hidden_state": {0: "batch", 1: "seq"}},
+            opset_version=14,
+        )
+        hidden = model.get_encoder()(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+        decoder_input_ids = torch.ones((1, 3), dtype=torch.long)
+        torch.onnx.export(
+            _DecoderForExport(model),
+            (decoder_input_ids, hidden, attention_mask),
+            os.path.join(output_dir, "decoder.onnx"),
+            input_names=["decoder_input_ids", "encoder_hidden_states", "encoder_attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={"decoder_input_ids": {0: "batch", 1: "tgt"},
+                          "encoder_hidden_states": {0: "batch", 1: "seq"},
+                          "encoder_attention_mask": {0: "batch", 1: "seq"},
+                          "logits": {0: "batch"}},
+            opset_version=14,
+        )
+
+
+def _log_softmax(logits):
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    return logits - np.log(np.exp(logits).sum(axis=-1, keepdims=True))
+
+
+def _banned_ngram_tokens(tokens, ngram_size):
+    # Tokens that would repeat an n-gram already present in the sequence.
+    if ngram_size <= 0 or len(tokens) < ngram_size:
+        return []
+    prefix = tuple(tokens[len(tokens) - ngram_size + 1:])
+    banned = []
+    for i in range(len(tokens) - ngram_size + 1):
+        if tuple(tokens[i:i + ngram_size - 1]) == prefix:
+            banned.append(tokens[i + ngram_size - 1])
+    return banned
+
+
+class OnnxBackend:
+    """ONNX Runtime graphs for encoder and decoder with a numpy greedy/beam decoding loop.
+
+    The graphs are exported on first use into `model_dir` if they are not there yet.
+    The decoder graph has no key/value cache, so each step re-runs the decoder on the
+    full prefix; replies are short enough that the ORT kernels still win on CPU.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name, model_dir, num_beams=None):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("INFERENCE_BACKEND=onnx requires the 'onnxruntime' package") from None
+
+        if not (os.path.exists(os.path.join(model_dir, "encoder.onnx"))
+                and os.path.exists(os.path.join(model_dir, "decoder.onnx"))):
+            export_onnx(model_name, model_dir)
+        self.config = AutoConfig.from_pretrained(model_name)
+        self.num_beams = num_beams
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = torch.get_num_threads()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        providers = ["CPUExecutionProvider"]
+        self.encoder = ort.InferenceSession(os.path.join(model_dir, "encoder.onnx"), options, providers=providers)
+        self.decoder = ort.InferenceSession(os.path.join(model_dir, "decoder.onnx"), options, providers=providers)
+
+    def encode(self, input_ids, attention_mask):
+        hidden = self.encoder.run(None, {
+            "input_ids": input_ids.numpy().astype(np.int64),
+            "attention_mask": attention_mask.numpy().astype(np.int64),
+        })[0]
+        return torch.from_numpy(hidden)
+
+    def _step(self, decoder_input_ids, hidden, mask):
+        return self.decoder.run(None, {
+            "decoder_input_ids": decoder_input_ids,
+            "encoder_hidden_states": hidden,
+            "encoder_attention_mask": mask,
+        })[0]
+
+    def generate(self, encoder_hidden_states, attention_mask, max_length=128, num_beams=None, max_new_tokens=None,
+                 early_stopping=None, max_time=None, streamer=None):
+        # Same budget arguments as TorchBackend.generate.
+        hidden = encoder_hidden_states.numpy().astype(np.float32)
+        mask = attention_mask.numpy().astype(np.int64)
+        if max_new_tokens:
+            max_length = max_new_tokens + 1  # The decoder start token counts towards max_length.
+        deadline = time.perf_counter() + max_time if max_time is not None else None
+        num_beams = num_beams or self.num_beams or self.config.num_beams or 1
+        if early_stopping is None:
+            early_stopping = self.config.early_stopping
+        if num_beams == 1 or streamer is not None:
+            return self._greedy(hidden, mask, max_length, deadline, streamer)
+        return [self._beam_search(hidden[i:i + 1], mask[i:i + 1], max_length, num_beams, early_stopping, deadline)
+                for i in range(hidden.shape[0])]
+
+    def _greedy(self, hidden, mask, max_length, deadline=None, streamer=None):
+        cfg = self.config
+        batch = hidden.shape[0]
+        sequences = np.full((batch, 1), cfg.decoder_start_token_id, dtype=np.int64)
+        done = np.zeros(batch, dtype=bool)
+        if streamer is not None:
+            streamer.put(torch.from_numpy(sequences))
+        while sequences.shape[1] < max_length and not done.all():
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            logp = _log_softmax(self._step(sequences, hidden, mask))
+            if sequences.shape[1] < (cfg.min_length or 0):
+                logp[:, cfg.eos_token_id] = -np.inf
+            for row in range(batch):
+                for token in _banned_ngram_tokens(sequences[row].tolist(), cfg.no_repeat_ngram_size or 0):
+                    logp[row, token] = -np.inf
+            next_tokens = logp.argmax(axis=-1)
+            next_tokens[done] = cfg.pad_token_id
+            sequences = np.concatenate([sequences, next_tokens[:, None]], axis=1)
+            done |= next_tokens == cfg.eos_token_id
+            if streamer is not None:
+                streamer.put(torch.from_numpy(next_tokens))
+        if streamer is not None:
+            streamer.end()
+        return sequences.tolist()
+
+    def _beam_search(self, hidden, mask, max_length, num_beams, early_stopping=False, deadline=None):
+        # Mirrors transformers' beam search: length-penalised finished hypotheses, min_length
+        # and no_repeat_ngram_size from the model config. With early_stopping the search ends
+        # as soon as num_beams hypotheses are finished, otherwise when none can improve.
+        cfg = self.config
+        length_penalty = cfg.length_penalty if cfg.length_penalty is not None else 1.0
+        beams = [(0.0, [cfg.decoder_start_token_id])]
+        finished = []
+        while len(beams[0][1]) < max_length:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            cur_len = len(beams[0][1])
+            sequences = np.array([tokens for _, tokens in beams], dtype=np.int64)
+            logp = _log_softmax(self._step(
+                sequences, np.repeat(hidden, len(beams), axis=0), np.repeat(mask, len(beams), axis=0)
+            ))
+            if cur_len < (cfg.min_length or 0):
+                logp[:, cfg.eos_token_id] = -np.inf
+            for row, (_, tokens) in enumerate(beams):
+                for token in _banned_ngram_tokens(tokens, cfg.no_repeat_ngram_size or 0):
+                    logp[row, token] = -np.inf
+            scores = (np.array([score for score, _ in beams])[:, None] + logp).ravel()
+            top = np.argpartition(-scores, 2 * num_beams)[:2 * num_beams]
+            top = top[np.argsort(-scores[top])]
+
+            next_beams = []
+            for idx in top:
+                row, token = divmod(int(idx), logp.shape[1])
+                score = float(scores[idx])
+                if token == cfg.eos_token_id:
+                    hyp = beams[row][1]
+                    finished.append((score / (len(hyp) ** length_penalty), hyp + [token]))
+                else:
+                    next_beams.append((score, beams[row][1] + [token]))
+                if len(next_beams) == num_beams:
+                    break
+            beams = next_beams
+
+            if len(finished) >= num_beams:
+                finished.sort(key=lambda f: f[0], reverse=True)
+                finished = finished[:num_beams]
+                if early_stopping is True:
+                    break
+                best_running = beams[0][0] / ((cur_len + 1) ** length_penalty)
+                if finished[-1][0] >= best_running:
+                    break
+
+        if not finished:
+            finished = [(score / (len(tokens) ** length_penalty), tokens) for score, tokens in beams]
+        return max(finished, key=lambda f: f[0])[1]
+
+
+def load_backend(name, model_name, onnx_model_dir=None, onnx_num_beams=None):
+    # Builds the inference backend selected by Config.INFERENCE_BACKEND.
+    if name == "torch":
+        return TorchBackend(model_name)
+    if name == "int8":
+        return QuantizedTorchBackend(model_name)
+    if name == "onnx":
+        return OnnxBackend(model_name, onnx_model_dir, num_beams=onnx_num_beams)
+    raise ValueError(f"Unknown inference backend: {name}")
@@ -1,6 +1,107 @@
+import logging
+import os
+import re
+import zlib
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9']+|[?!]")
+FALLBACK_INTENT = "general"
+
+
+def ngram_features(text):
+    # Word unigrams and bigrams of the lowercased text, each counted once.
+    tokens = TOKEN_RE.findall(text.lower())
+    features = {"w:" + token for token in tokens}
+    features.update("b:" + a + " " + b for a, b in zip(tokens, tokens[1:]))
+    return features
+
+
+def hash_features(texts, n_features):
+    """Hashed n-gram features of a batch, as flat (doc, column, value) arrays.
+
+    Each document is a binary bag of n-grams scaled to unit length, so a linear model
+    scores it as the sum of its columns' weights over sqrt(n). The same arrays build
+    the sparse training matrix in modules/intent_training.py.
+    """
+    doc_ids, columns, values = [], [], []
+    for i, text in enumerate(texts):
+        hashed = {zlib.crc32(f.encode("utf-8")) % n_features for f in ngram_features(text)}
+        if hashed:
+            doc_ids.extend([i] * len(hashed))
+            columns.extend(hashed)
+            values.extend([1.0 / np.sqrt(len(hashed))] * len(hashed))
+    return (np.asarray(doc_ids, dtype=np.int64), np.asarray(columns, dtype=np.int64),
+            np.asarray(values, dtype=np.float32))
+
+
+def rule_intent(text):
+    # Used when no trained model is available; matches whole words only.
+    words = set(TOKEN_RE.findall(text.lower()))
+    if words & {"goodbye", "bye"}:
+        return "goodbye"
+    return FALLBACK_INTENT
+
+
 class IntentClassifier:
+    """Linear intent model over hashed word n-grams, loaded from a small .npz artifact.
+
+    Predictions below `threshold` confidence fall back to "general", so only clear
+    greetings, goodbyes etc. take the cheap template path or end the session.
+    Without an artifact (see `python -m modules.intent_training`), whole-word rules
+    are used instead.
+    """
+
+    def __init__(self, model_path=None, threshold=None):
+        self.threshold = Config.INTENT_CONFIDENCE_THRESHOLD if threshold is None else threshold
+        model_path = model_path or Config.INTENT_MODEL_PATH
+        self.weights = None
+        if os.path.exists(model_path):
+            self.load(model_path)
+        else:
+            logger.warning("Intent model %s not found; using keyword rules", model_path)
+
+    def load(self, model_path):
+        with np.load(model_path, allow_pickle=False) as data:
+            self.n_features = int(data["n_features"])
+            self.labels = [str(label) for label in data["labels"]]
+            # Only the columns that carry weight are stored; expand them into a dense lookup table.
+            self.weights = np.zeros((self.n_features, len(self.labels)), dtype=np.float32)
+            self.weights[data["columns"]] = data["weights"]
+            self.bias = data["bias"].astype(np.float32)
+
+    def predict_proba(self, texts):
+        # Class probabilities, one row per text, in the order of self.labels.
+        doc_ids, columns, values = hash_features(texts, self.n_features)
+        scores = np.tile(self.bias, (len(texts), 1))
+        np.add.at(scores, doc_ids, self.weights[columns] * values[:, None])
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict_batch(self, texts):
+        # (intent, confidence) per text.
+        if self.weights is None:
+            return [(rule_intent(text), 1.0) for text in texts]
+        if not texts:
+            return []
+        proba = self.predict_proba(texts)
+        best = proba.argmax(axis=1)
+        results = []
+        for label_index, confidence in zip(best, proba[np.arange(len(texts)), best]):
+            intent = self.labels[label_index] if confidence >= self.threshold else FALLBACK_INTENT
+            results.append((intent, float(confidence)))
+        return results
+
+    def predict_with_confidence(self, text):
+        return self.predict_batch([text])[0]
+
     def predict(self, text):
-        tl = text.lower().strip()
-        if "goodbye" in tl or "bye" in tl:
-            return "goodbye"
-        return "general"
+        return self.predict_with_confidence(text)[0]
+
+    def predict_doc(self, doc):
+        return self.predict_with_confidence(doc.text)
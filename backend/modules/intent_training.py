@@ -0,0 +1,85 @@
+"""Trains the intent model used by IntentClassifier.
+
+Run from the backend directory (the Dockerfile does this at build time):
+
+    python -m modules.intent_training
+
+Reads tab-separated `<intent>\\t<utterance>` lines from data/intent_seed.tsv, fits a
+logistic regression on the hashed n-gram features of modules/intent_classifier.py and
+writes the weights to INTENT_MODEL_PATH. scikit-learn is only needed here, not at
+serving time.
+"""
+import argparse
+import logging
+import os
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.linear_model import LogisticRegression
+
+from config import BASE_DIR, Config
+from modules.intent_classifier import hash_features
+
+N_FEATURES = 2 ** 16
+SEED_PATH = os.path.join(BASE_DIR, "data", "intent_seed.tsv")
+
+logger = logging.getLogger(__name__)
+
+
+def load_seed(path=SEED_PATH):
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            label, text = line.split("\t", 1)
+            labels.append(label)
+            texts.append(text)
+    return texts, labels
+
+
+def feature_matrix(texts, n_features=N_FEATURES):
+    doc_ids, columns, values = hash_features(texts, n_features)
+    return csr_matrix((values, (doc_ids, columns)), shape=(len(texts), n_features))
+
+
+def train(texts, labels, n_features=N_FEATURES, c=10.0):
+    model = LogisticRegression(C=c, max_iter=2000)
+    model.fit(feature_matrix(texts, n_features), labels)
+    return model
+
+
+def save(model, path, n_features=N_FEATURES):
+    # Only columns with a non-zero weight are stored, which keeps the artifact a few KB.
+    weights = model.coef_.T.astype(np.float32)
+    columns = np.flatnonzero(np.abs(weights).sum(axis=1))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(
+        path,
+        n_features=np.int64(n_features),
+        labels=np.array(model.classes_, dtype=str),
+        columns=columns,
+        weights=weights[columns],
+        bias=model.intercept_.astype(np.float32),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", default=SEED_PATH, help="training data (.tsv)")
+    parser.add_argument("--output", default=Config.INTENT_MODEL_PATH)
+    parser.add_argument("-C", type=float, default=10.0, help="inverse regularization strength")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    texts, labels = load_seed(args.seed)
+    model = train(texts, labels, c=args.C)
+    save(model, args.output)
+    accuracy = model.score(feature_matrix(texts), labels)
+    logger.info("Trained on %d utterances (%s), training accuracy %.3f -> %s (%d bytes)",
+                len(texts), ", ".join(model.classes_), accuracy, args.output, os.path.getsize(args.output))
+
+
+if __name__ == "__main__":
+    main()
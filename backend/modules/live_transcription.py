@@ -0,0 +1,90 @@
+import logging
+import time
+
+from modules.audio_decoder import SAMPLE_RATE, SAMPLE_WIDTH
+from modules.audio_processing import trailing_silence_ms
+
+logger = logging.getLogger(__name__)
+
+
+class LiveUtterance:
+    """One utterance whose audio arrives in chunks while the user is still speaking.
+
+    Chunks are decoded as they arrive. Every `partial_interval_ms` of new audio, the
+    last `partial_window_ms` of audio (all of it if 0) is transcribed in the background
+    on the recognizer's partial engines, and the partial transcript goes through
+    `analyze` (e.g. filler detection). The window keeps the cost of each partial
+    constant however long the utterance gets; events say whether they cover only a
+    tail. `poll()` hands out the finished partial results without blocking.
+    `speech_ended()` reports `end_silence_ms` of trailing silence after speech, so the
+    turn can be finalized without waiting for the client.
+    """
+
+    def __init__(self, recognizer, executor, analyze=None, partial_interval_ms=1000, end_silence_ms=800,
+                 partial_window_ms=0):
+        self.recognizer = recognizer
+        self.executor = executor
+        self.analyze = analyze
+        self.partial_bytes = int(SAMPLE_RATE * SAMPLE_WIDTH * partial_interval_ms / 1000)
+        # Whole samples, so the window never starts in the middle of one.
+        self.window_bytes = SAMPLE_RATE * partial_window_ms // 1000 * SAMPLE_WIDTH
+        self.end_silence_ms = end_silence_ms
+        self.stream = recognizer.open_stream()
+        self.started_at = time.perf_counter()
+        self._partial = None
+        self._partial_pcm_size = 0
+        self._last_partial_text = None
+        self._heard_speech = False
+
+    def feed(self, chunk):
+        self.stream.feed(chunk)
+
+    def duration_ms(self):
+        return len(self.stream.pcm()) * 1000 // (SAMPLE_RATE * SAMPLE_WIDTH)
+
+    def poll(self):
+        # Partial results that are ready, as event dicts; schedules the next partial when due.
+        events = []
+        if self._partial is not None and self._partial.done():
+            try:
+                text, analysis, tail = self._partial.result()
+                if text and text != self._last_partial_text:
+                    self._last_partial_text = text
+                    events.append({"event": "partial", "text": text, "pattern_analysis": analysis, "tail": tail})
+            except Exception:
+                logger.exception("Partial transcription failed")
+            self._partial = None
+        if self.partial_bytes and self._partial is None:
+            pcm = self.stream.pcm()
+            if len(pcm) - self._partial_pcm_size >= self.partial_bytes:
+                self._partial_pcm_size = len(pcm)
+                tail = bool(self.window_bytes) and len(pcm) > self.window_bytes
+                if tail:
+                    pcm = pcm[-self.window_bytes:]
+                self._partial = self.executor.submit(self._transcribe_partial, pcm, tail)
+        return events
+
+    def _transcribe_partial(self, pcm, tail):
+        text = (self.recognizer.transcribe_pcm(pcm, partial=True) or "").strip()
+        analysis = self.analyze(text) if text and self.analyze else None
+        return text, analysis, tail
+
+    def speech_ended(self):
+        if not self.end_silence_ms:
+            return False
+        # Only a tail window is inspected on each call; polls are frequent enough for the
+        # windows to overlap, so speech anywhere in the utterance is noticed.
+        window = SAMPLE_RATE * SAMPLE_WIDTH * self.end_silence_ms * 2 // 1000
+        silence = trailing_silence_ms(self.stream.pcm()[-window:])
+        if silence is None:
+            # No speech in the window: the user has been silent for the whole window.
+            return self._heard_speech
+        self._heard_speech = True
+        return silence >= self.end_silence_ms
+
+    def finish(self):
+        # Final transcript of the whole utterance (blocks until decoding and recognition are done).
+        return (self.stream.finish() or "").strip()
+
+    def abort(self):
+        self.stream.abort()
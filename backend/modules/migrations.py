@@ -0,0 +1,92 @@
+import logging
+
+import argparse
+
+from sqlalchemy import inspect, or_, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from modules.models import Base, Conversation
+
+logger = logging.getLogger(__name__)
+
+# Columns added to `conversations` after the first release, as (name, SQL type).
+# Rows stored before a column existed keep NULL in it; legacy rows have no session
+# and therefore never show up in a session summary.
+CONVERSATION_COLUMNS = (
+    ("session_id", "VARCHAR(64)"),
+    ("user_id", "VARCHAR(64)"),
+    ("turn_index", "INTEGER"),
+    ("created_at", "DATETIME"),
+)
+
+def already_applied(error):
+    # True for the errors of adding a column or index that another process has just added.
+    message = str(error.orig).lower()
+    return "duplicate column" in message or "duplicate key name" in message or "already exists" in message
+
+def migrate(engine):
+    # Brings an existing database (e.g. an old database.db) up to the current schema.
+    # Safe to run on every start: only missing columns and indexes are created. Each change
+    # has its own transaction, so one that was applied concurrently does not undo the rest.
+    table = Conversation.__tablename__
+    existing = {column["name"] for column in inspect(engine).get_columns(table)}
+    for name, sql_type in CONVERSATION_COLUMNS:
+        if name not in existing:
+            logger.info("Adding column %s.%s", table, name)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}"))
+            except DBAPIError as e:
+                if not already_applied(e):
+                    raise
+    for index in Conversation.__table__.indexes:
+        try:
+            with engine.begin() as conn:
+                index.create(conn, checkfirst=True)
+        except DBAPIError as e:
+            if not already_applied(e):
+                raise
+
+def upgrade(engine):
+    # Creates missing tables and migrates existing ones. Run once per deployment, before the
+    # workers start: gunicorn.conf.py does it in on_starting, `python app.py` before serving.
+    Base.metadata.create_all(engine)
+    migrate(engine)
+    # Drop the connections used here so none is inherited across a fork.
+    engine.dispose()
+
+def backfill(engine, batch_size=1000):
+    # Moves errors stored as JSON text into the grammar/pronunciation child tables,
+    # so aggregate queries cover old rows too. Rows are converted in batches by id.
+    converted = 0
+    last_id = 0
+    while True:
+        with Session(engine) as db:
+            batch = (db.query(Conversation)
+                     .filter(Conversation.id > last_id)
+                     .filter(or_(Conversation.grammar_errors.isnot(None),
+                                 Conversation.pronunciation_errors.isnot(None)))
+                     .order_by(Conversation.id)
+                     .limit(batch_size)
+                     .all())
+            if not batch:
+                return converted
+            for convo in batch:
+                convo.set_grammar_errors(convo.get_grammar_errors())
+                convo.set_pronunciation_errors(convo.get_pronunciation_errors())
+            db.commit()
+            converted += len(batch)
+            last_id = batch[-1].id
+            logger.info("Backfilled %d conversations", converted)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upgrade the conversation database schema.")
+    parser.add_argument("--backfill", action="store_true",
+                        help="also move JSON-encoded errors of old rows into the child tables")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    from modules.database import engine
+    upgrade(engine)
+    if args.backfill:
+        backfill(engine)
@@ -1,32 +1,222 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.orm import relationship
+from datetime import datetime
 import json
 
+from modules.phoneme_map import align_phonemes
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library is used without it.
+    orjson = None
+
 Base = declarative_base()
 
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value)
+
+def loads(text):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def split_phonemes(text):
+    return text.split() if text else []
+
 class Conversation(Base):
     __tablename__ = 'conversations'
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_text = Column(String)
     system_response = Column(String)
-    grammar_errors = Column(Text)  # JSON list
-    pronunciation_errors = Column(Text)  # JSON list
+    # Rows stored before the child tables existed keep their errors here as JSON;
+    # new rows leave these NULL and use grammar_error_rows / pronunciation_error_rows.
+    grammar_errors = Column(Text)  # JSON list (legacy)
+    pronunciation_errors = Column(Text)  # JSON list (legacy)
     pattern_analysis = Column(Text)  # JSON dict
+    session_id = Column(String(64))  # Practice session the utterance belongs to
+    user_id = Column(String(64))  # Optional, set when the client identifies the user
+    turn_index = Column(Integer)  # Position of the utterance within its session
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # selectin loading fetches the children of a whole batch in one query and works with yield_per.
+    grammar_error_rows = relationship('GrammarError', order_by='GrammarError.position',
+                                      cascade='all, delete-orphan', lazy='selectin')
+    pronunciation_error_rows = relationship('PronunciationError', order_by='PronunciationError.position',
+                                            cascade='all, delete-orphan', lazy='selectin')
+
+    # Summaries read one session in turn order straight off this index.
+    __table_args__ = (
+        Index('ix_conversations_session_turn', 'session_id', 'turn_index'),
+        Index('ix_conversations_user_created', 'user_id', 'created_at'),
+    )
 
     def set_grammar_errors(self, errors):
-        self.grammar_errors = json.dumps(errors)
+        self.grammar_errors = None
+        self.grammar_error_rows = [GrammarError.from_dict(i, err) for i, err in enumerate(errors)]
 
     def get_grammar_errors(self):
-        return json.loads(self.grammar_errors) if self.grammar_errors else []
+        if self.grammar_errors:
+            return loads(self.grammar_errors)
+        return [row.to_dict() for row in self.grammar_error_rows]
 
     def set_pronunciation_errors(self, errors):
-        self.pronunciation_errors = json.dumps(errors)
+        self.pronunciation_errors = None
+        self.pronunciation_error_rows = [PronunciationError.from_dict(i, err) for i, err in enumerate(errors)]
 
     def get_pronunciation_errors(self):
-        return json.loads(self.pronunciation_errors) if self.pronunciation_errors else []
+        if self.pronunciation_errors:
+            return loads(self.pronunciation_errors)
+        return [row.to_dict() for row in self.pronunciation_error_rows]
 
     def set_pattern_analysis(self, analysis):
-        self.pattern_analysis = json.dumps(analysis)
+        self.pattern_analysis = dumps(analysis)
 
     def get_pattern_analysis(self):
-        return json.loads(self.pattern_analysis) if self.pattern_analysis else {}
+        return loads(self.pattern_analysis) if self.pattern_analysis else {}
+
+class GrammarError(Base):
+    __tablename__ = 'grammar_errors'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    conversation_id = Column(Integer, ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False, index=True)
+    position = Column(Integer, nullable=False)  # Order within the utterance
+    original_sentence = Column(String)
+    error_word = Column(String)
+    suggestion = Column(String)
+    explanation = Column(String)
+    rule_id = Column(String(128), index=True)  # LanguageTool rule, e.g. "HE_VERB_AGR"
+    category = Column(String(64), index=True)  # LanguageTool category, e.g. "GRAMMAR"
+
+    @classmethod
+    def from_dict(cls, position, err):
+        return cls(position=position, original_sentence=err["original_sentence"], error_word=err["error_word"],
+                   suggestion=err["suggestion"], explanation=err["explanation"],
+                   rule_id=err.get("rule_id"), category=err.get("category"))
+
+    def to_dict(self):
+        return {
+            "original_sentence": self.original_sentence,
+            "error_word": self.error_word,
+            "suggestion": self.suggestion,
+            "explanation": self.explanation,
+            "rule_id": self.rule_id,
+            "category": self.category,
+        }
+
+class PronunciationError(Base):
+    __tablename__ = 'pronunciation_errors'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    conversation_id = Column(Integer, ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False, index=True)
+    position = Column(Integer, nullable=False)  # Order within the utterance
+    word = Column(String(64), index=True)
+    # Phoneme sequences, space separated (neither ARPAbet nor IPA symbols contain spaces)
+    user_phonemes = Column(String)
+    correct_phonemes = Column(String)
+    user_ipa = Column(String)
+    correct_ipa = Column(String)
+    difference_note = Column(String)
+
+    mismatches = relationship('PhonemeMismatch', order_by='PhonemeMismatch.sequence',
+                              cascade='all, delete-orphan', lazy='selectin')
+
+    @classmethod
+    def from_dict(cls, position, err):
+        alignment = err.get("alignment")
+        if alignment is None:
+            # Errors stored before alignments were recorded (legacy JSON) are aligned here.
+            alignment = align_phonemes(err["user_phonemes"], err["correct_phonemes"])
+        return cls(position=position, word=err["word"],
+                   user_phonemes=" ".join(err["user_phonemes"]), correct_phonemes=" ".join(err["correct_phonemes"]),
+                   user_ipa=" ".join(err["user_ipa"]), correct_ipa=" ".join(err["correct_ipa"]),
+                   difference_note=err["difference_note"],
+                   mismatches=[PhonemeMismatch.from_dict(i, op) for i, op in enumerate(alignment)])
+
+    def to_dict(self):
+        return {
+            "word": self.word,
+            "user_phonemes": split_phonemes(self.user_phonemes),
+            "correct_phonemes": split_phonemes(self.correct_phonemes),
+            "user_ipa": split_phonemes(self.user_ipa),
+            "correct_ipa": split_phonemes(self.correct_ipa),
+            "alignment": [m.to_dict() for m in self.mismatches],
+            "difference_note": self.difference_note,
+        }
+
+class PhonemeMismatch(Base):
+    # One substitution, insertion or deletion from the alignment of a mispronounced word.
+    __tablename__ = 'phoneme_mismatches'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    pronunciation_error_id = Column(Integer, ForeignKey('pronunciation_errors.id', ondelete='CASCADE'),
+                                    nullable=False, index=True)
+    sequence = Column(Integer, nullable=False)  # Order within the alignment
+    op = Column(String(16), nullable=False)
+    position = Column(Integer)  # Index into the correct phonemes
+    user_phoneme = Column(String(8))
+    correct_phoneme = Column(String(8))
+
+    __table_args__ = (
+        Index('ix_phoneme_mismatches_correct_op', 'correct_phoneme', 'op'),
+    )
+
+    @classmethod
+    def from_dict(cls, sequence, op):
+        return cls(sequence=sequence, op=op["op"], position=op["position"],
+                   user_phoneme=op.get("user_phoneme"), correct_phoneme=op.get("correct_phoneme"))
+
+    def to_dict(self):
+        return {
+            "op": self.op,
+            "position": self.position,
+            "user_phoneme": self.user_phoneme,
+            "correct_phoneme": self.correct_phoneme,
+        }
+
+def session_turns(db, session_id, yield_per=100):
+    """(user_text, grammar_errors, pronunciation_errors, pattern_analysis) per turn of a session, in turn order.
+
+    Reads plain column tuples instead of ORM objects: one query per table for the whole
+    session, so a rebuild does not pay for building an object for every child row.
+    """
+    in_session = Conversation.session_id == session_id
+    grammar, pron, mismatches = {}, {}, {}
+    rows = (db.query(GrammarError.conversation_id, GrammarError.original_sentence, GrammarError.error_word,
+                     GrammarError.suggestion, GrammarError.explanation, GrammarError.rule_id, GrammarError.category)
+            .join(Conversation).filter(in_session).order_by(GrammarError.conversation_id, GrammarError.position))
+    for convo_id, original, error_word, suggestion, explanation, rule_id, category in rows:
+        grammar.setdefault(convo_id, []).append({
+            "original_sentence": original, "error_word": error_word, "suggestion": suggestion,
+            "explanation": explanation, "rule_id": rule_id, "category": category,
+        })
+    rows = (db.query(PhonemeMismatch.pronunciation_error_id, PhonemeMismatch.op, PhonemeMismatch.position,
+                     PhonemeMismatch.user_phoneme, PhonemeMismatch.correct_phoneme)
+            .join(PronunciationError).join(Conversation).filter(in_session)
+            .order_by(PhonemeMismatch.pronunciation_error_id, PhonemeMismatch.sequence))
+    for error_id, op, position, user_phoneme, correct_phoneme in rows:
+        mismatches.setdefault(error_id, []).append(
+            {"op": op, "position": position, "user_phoneme": user_phoneme, "correct_phoneme": correct_phoneme})
+    rows = (db.query(PronunciationError.id, PronunciationError.conversation_id, PronunciationError.word,
+                     PronunciationError.user_phonemes, PronunciationError.correct_phonemes,
+                     PronunciationError.user_ipa, PronunciationError.correct_ipa, PronunciationError.difference_note)
+            .join(Conversation).filter(in_session)
+            .order_by(PronunciationError.conversation_id, PronunciationError.position))
+    for error_id, convo_id, word, user_phonemes, correct_phonemes, user_ipa, correct_ipa, note in rows:
+        pron.setdefault(convo_id, []).append({
+            "word": word,
+            "user_phonemes": split_phonemes(user_phonemes),
+            "correct_phonemes": split_phonemes(correct_phonemes),
+            "user_ipa": split_phonemes(user_ipa),
+            "correct_ipa": split_phonemes(correct_ipa),
+            "alignment": mismatches.get(error_id, []),
+            "difference_note": note,
+        })
+    rows = (db.query(Conversation.id, Conversation.user_text, Conversation.grammar_errors,
+                     Conversation.pronunciation_errors, Conversation.pattern_analysis)
+            .filter(in_session).order_by(Conversation.turn_index, Conversation.id).yield_per(yield_per))
+    for convo_id, user_text, legacy_grammar, legacy_pron, pattern in rows:
+        # Legacy rows keep their errors as JSON, like Conversation.get_grammar_errors.
+        yield (user_text,
+               loads(legacy_grammar) if legacy_grammar else grammar.get(convo_id, []),
+               loads(legacy_pron) if legacy_pron else pron.get(convo_id, []),
+               loads(pattern) if pattern else {})
@@ -0,0 +1,92 @@
+import spacy
+
+from config import Config
+
+# Components of the en_core_web_* pipelines and what each one needs to run.
+PIPELINE_COMPONENTS = ["tok2vec", "tagger", "parser", "senter", "attribute_ruler", "lemmatizer", "ner"]
+COMPONENT_DEPENDENCIES = {
+    "tagger": {"tok2vec"},
+    "parser": {"tok2vec"},
+    "senter": {"tok2vec"},
+    "attribute_ruler": {"tagger"},
+    "lemmatizer": {"tagger", "attribute_ruler"},
+}
+
+def required_components(components):
+    # The given components plus everything they depend on.
+    needed = set()
+    pending = list(components)
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(COMPONENT_DEPENDENCIES.get(name, ()))
+    return needed
+
+def load_nlp(model=None, components=None):
+    """Loads the spaCy pipeline shared by NLU and pattern recognition.
+
+    Only the listed components (and their dependencies) are loaded. Filler matching
+    and intent rules only need the tokenizer, and entity extraction needs "ner",
+    so the tagger, parser and lemmatizer are not run on every utterance.
+    """
+    model = model or Config.SPACY_MODEL
+    if components is None:
+        components = [c.strip() for c in Config.NLP_COMPONENTS.split(",") if c.strip()]
+    needed = required_components(components)
+    return spacy.load(model, exclude=[c for c in PIPELINE_COMPONENTS if c not in needed])
+
+def analyze_texts(texts, nlu, pattern_recognizer, batch_size=None, n_process=1):
+    # Bulk analysis with nlp.pipe: yields {"intent", "intent_confidence", "entities", "pattern_analysis"}
+    # per text, in order. Intents are predicted a batch at a time.
+    batch_size = batch_size or Config.NLP_BATCH_SIZE
+    batch = []
+    for doc in nlu.nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+        batch.append(doc)
+        if len(batch) == batch_size:
+            yield from _analyze_docs(batch, nlu, pattern_recognizer)
+            batch = []
+    yield from _analyze_docs(batch, nlu, pattern_recognizer)
+
+def _analyze_docs(docs, nlu, pattern_recognizer):
+    for doc, (intent, entities, confidence) in zip(docs, nlu.process_docs(docs)):
+        yield {"intent": intent, "intent_confidence": confidence, "entities": entities,
+               "pattern_analysis": pattern_recognizer.analyze_doc(doc)}
+
+def reanalyze_conversations(session_factory, nlu, pattern_recognizer, batch_size=None):
+    # Recomputes the stored pattern analysis of every conversation, e.g. after the filler rules change.
+    from modules.models import Conversation
+    batch_size = batch_size or Config.NLP_BATCH_SIZE
+    updated = 0
+    last_id = 0
+    while True:
+        db = session_factory()
+        try:
+            rows = (db.query(Conversation).filter(Conversation.id > last_id)
+                    .order_by(Conversation.id).limit(batch_size).all())
+            if not rows:
+                return updated
+            texts = [row.user_text or "" for row in rows]
+            for row, result in zip(rows, analyze_texts(texts, nlu, pattern_recognizer, batch_size)):
+                row.set_pattern_analysis(result["pattern_analysis"])
+            db.commit()
+            updated += len(rows)
+            last_id = rows[-1].id
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    import argparse
+    import logging
+
+    from modules.database import Session
+    from modules.nlu import NLUProcessor
+    from modules.pattern_recognizer import PatternRecognizer
+
+    parser = argparse.ArgumentParser(description="Re-run pattern analysis over all stored conversations.")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    nlp = load_nlp()
+    count = reanalyze_conversations(Session, NLUProcessor(nlp), PatternRecognizer(nlp), args.batch_size)
+    logging.info("Re-analyzed %d conversations", count)
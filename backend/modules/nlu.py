@@ -1,9 +1,30 @@
+from modules.entity_extractor import EntityExtractor
 from modules.intent_classifier import IntentClassifier
 
 class NLUProcessor:
-    def __init__(self):
+    def __init__(self, nlp=None):
+        # The spaCy pipeline is shared with PatternRecognizer, so each utterance is parsed once.
+        if nlp is None:
+            from modules.nlp import load_nlp
+            nlp = load_nlp()
+        self.nlp = nlp
         self.intent_classifier = IntentClassifier()
+        self.entity_extractor = EntityExtractor()
+
+    def parse(self, text):
+        return self.nlp(text)
 
     def process(self, text):
-        intent = self.intent_classifier.predict(text)
-        return intent, []
+        return self.process_doc(self.parse(text))
+
+    def process_doc(self, doc):
+        # Returns (intent, entities, intent confidence).
+        intent, confidence = self.intent_classifier.predict_doc(doc)
+        entities = self.entity_extractor.extract(doc)
+        return intent, entities, confidence
+
+    def process_docs(self, docs):
+        # Same as process_doc for many Docs, with one vectorized intent prediction.
+        predictions = self.intent_classifier.predict_batch([doc.text for doc in docs])
+        return [(intent, self.entity_extractor.extract(doc), confidence)
+                for doc, (intent, confidence) in zip(docs, predictions)]
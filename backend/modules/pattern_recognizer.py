@@ -1,9 +1,11 @@
-import spacy
 from spacy.matcher import Matcher
 
+from modules.nlp import load_nlp
+
 class PatternRecognizer:
-    def __init__(self):
-        self.nlp = spacy.load("en_core_web_sm")
+    def __init__(self, nlp=None):
+        # Only the tokenizer is needed for filler matching; the pipeline is normally the one shared with NLU.
+        self.nlp = nlp if nlp is not None else load_nlp()
         self.matcher = Matcher(self.nlp.vocab)
 
         # Add a pattern for filler words (um, uh, like)
@@ -11,7 +13,10 @@ class PatternRecognizer:
         self.matcher.add("FILLER_WORDS", [filler_pattern])
 
     def analyze_utterance(self, text):
-        doc = self.nlp(text)
+        return self.analyze_doc(self.nlp(text))
+
+    def analyze_doc(self, doc):
+        text = doc.text
         matches = self.matcher(doc)
         filler_count = len(matches)
 
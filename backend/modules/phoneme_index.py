@@ -0,0 +1,112 @@
+from array import array
+import threading
+
+
+class PhonemeInventory:
+    """Compact ARPAbet inventory: integer ids per symbol and precomputed IPA strings.
+
+    Symbols outside the table get an id on first sight and map to themselves in IPA,
+    matching the previous `arpabet_to_ipa.get(p, p)` behaviour.
+    """
+
+    def __init__(self, ipa_table):
+        self.symbols = list(ipa_table)
+        self.ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.ipa = [ipa_table[symbol] for symbol in self.symbols]
+        self._ipa_by_symbol = dict(ipa_table)
+        self._lock = threading.Lock()
+
+    def id_of(self, symbol):
+        phoneme_id = self.ids.get(symbol)
+        if phoneme_id is None:
+            with self._lock:
+                phoneme_id = self.ids.get(symbol)
+                if phoneme_id is None:
+                    phoneme_id = len(self.symbols)
+                    self.symbols.append(symbol)
+                    self.ipa.append(symbol)
+                    self.ids[symbol] = phoneme_id
+        return phoneme_id
+
+    def encode(self, phonemes):
+        return array('H', [self.id_of(p) for p in phonemes])
+
+    def to_ipa(self, phonemes):
+        ipa = self._ipa_by_symbol
+        return [ipa.get(p, p) for p in phonemes]
+
+    def ipa_for_ids(self, phoneme_ids):
+        ipa = self.ipa
+        return [ipa[i] for i in phoneme_ids]
+
+
+def align_ids(user_ids, ref_ids):
+    """Levenshtein alignment of two id sequences.
+
+    Returns (op, user_index, ref_index) tuples for every edit, in reference order:
+    "substitution" and "deletion" (a reference phoneme the user left out) point at
+    a reference position; "insertion" (an extra user phoneme) is placed before ref_index.
+    """
+    # Matching prefixes and suffixes never contain edits; only align the differing middle.
+    start = 0
+    limit = min(len(user_ids), len(ref_ids))
+    while start < limit and user_ids[start] == ref_ids[start]:
+        start += 1
+    end = 0
+    while end < limit - start and user_ids[-1 - end] == ref_ids[-1 - end]:
+        end += 1
+    user_ids = user_ids[start:len(user_ids) - end]
+    ref_ids = ref_ids[start:len(ref_ids) - end]
+
+    n, m = len(user_ids), len(ref_ids)
+    width = m + 1
+    cost = array('H', range(width))
+    cost.extend(array('H', [0]) * (n * width))
+    for i in range(1, n + 1):
+        row = i * width
+        prev = row - width
+        cost[row] = i
+        u = user_ids[i - 1]
+        for j in range(1, width):
+            best = cost[prev + j - 1] + (u != ref_ids[j - 1])
+            extra = cost[prev + j] + 1
+            if extra < best:
+                best = extra
+            missing = cost[row + j - 1] + 1
+            if missing < best:
+                best = missing
+            cost[row + j] = best
+
+    ops = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        here = cost[i * width + j]
+        if i > 0 and j > 0 and here == cost[(i - 1) * width + j - 1] + (user_ids[i - 1] != ref_ids[j - 1]):
+            if user_ids[i - 1] != ref_ids[j - 1]:
+                ops.append(("substitution", start + i - 1, start + j - 1))
+            i -= 1
+            j -= 1
+        elif j > 0 and here == cost[i * width + j - 1] + 1:
+            ops.append(("deletion", None, start + j - 1))
+            j -= 1
+        else:
+            ops.append(("insertion", start + i - 1, start + j))
+            i -= 1
+    ops.reverse()
+    return ops
+
+
+def align(inventory, user_phonemes, ref_phonemes):
+    # Aligns two ARPAbet sequences and returns every substitution, insertion and deletion.
+    if list(user_phonemes) == list(ref_phonemes):
+        return []
+    ops = align_ids(inventory.encode(user_phonemes), inventory.encode(ref_phonemes))
+    return [
+        {
+            "op": op,
+            "position": ref_index,
+            "user_phoneme": user_phonemes[user_index] if user_index is not None else None,
+            "correct_phoneme": ref_phonemes[ref_index] if op != "insertion" else None,
+        }
+        for op, user_index, ref_index in ops
+    ]
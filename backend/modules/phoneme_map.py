@@ -1,5 +1,7 @@
 # backend/modules/phoneme_map.py
 
+from modules.phoneme_index import PhonemeInventory, align
+
 # This dictionary maps ARPAbet phonemes to IPA symbols approximately.
 # Add more phonemes as necessary.
 arpabet_to_ipa = {
@@ -101,5 +103,12 @@ arpabet_to_ipa = {
     # ... Add all relevant phonemes you use
 }
 
+# Integer ids and precomputed IPA strings for every phoneme in the table above.
+inventory = PhonemeInventory(arpabet_to_ipa)
+
 def convert_arpabet_to_ipa(phoneme_list):
-    return [arpabet_to_ipa.get(p, p) for p in phoneme_list]
+    return inventory.to_ipa(phoneme_list)
+
+def align_phonemes(user_phonemes, ref_phonemes):
+    # All substitutions, insertions and deletions between what the user said and the reference.
+    return align(inventory, user_phonemes, ref_phonemes)
@@ -1,57 +1,141 @@
 import pronouncing
 from g2p_en import G2p
-from modules.phoneme_map import convert_arpabet_to_ipa
+from config import Config
+from modules.cache import LRUCache
+from modules.phoneme_map import convert_arpabet_to_ipa, align_phonemes
 
 class PronunciationAnalyzer:
-    def __init__(self):
+    def __init__(self, cache_size=None):
         self.g2p = G2p()
+        # word -> (g2p phonemes, CMU reference phonemes or None, g2p IPA, reference IPA,
+        #          phoneme alignment, difference note)
+        self.word_cache = LRUCache(maxsize=Config.PRONUNCIATION_CACHE_SIZE if cache_size is None else cache_size)
 
     def analyze(self, text):
-        words = text.split()
-        errors = []
-        for w in words:
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts):
+        # Analyzes several utterances, running G2P once over all words not seen before.
+        word_lists = [self.clean_words(text) for text in texts]
+        entries = self.lookup_words({w for words in word_lists for w in words})
+        return [self.errors_for_words(words, entries) for words in word_lists]
+
+    def clean_words(self, text):
+        words = []
+        for w in text.split():
             clean_w = "".join([c for c in w.lower() if c.isalpha()])
-            if not clean_w:
-                continue
-            user_phonemes = self.get_phonemes(clean_w)
+            if clean_w:
+                words.append(clean_w)
+        return words
 
-            ref_phonemes_list = pronouncing.phones_for_word(clean_w)
-            if not ref_phonemes_list:
+    def errors_for_words(self, words, entries):
+        errors = []
+        for clean_w in words:
+            user_phonemes, ref_phonemes, user_ipa, correct_ipa, alignment, difference_note = entries[clean_w]
+            if ref_phonemes is None:
                 continue
-            ref_phonemes = ref_phonemes_list[0].split()
 
             if not self.phoneme_match(user_phonemes, ref_phonemes):
-                difference_note = self.phoneme_difference_explanation(user_phonemes, ref_phonemes)
                 errors.append({
                     "word": clean_w,
-                    "user_phonemes": user_phonemes,
-                    "correct_phonemes": ref_phonemes,
+                    "user_phonemes": list(user_phonemes),
+                    "correct_phonemes": list(ref_phonemes),
                     # Add IPA forms
-                    "user_ipa": convert_arpabet_to_ipa(user_phonemes),
-                    "correct_ipa": convert_arpabet_to_ipa(ref_phonemes),
+                    "user_ipa": list(user_ipa),
+                    "correct_ipa": list(correct_ipa),
+                    # Every substitution, insertion and deletion, positioned on the correct phonemes
+                    "alignment": [dict(op) for op in alignment],
                     "difference_note": difference_note
                 })
         return errors
 
+    def lookup_words(self, words):
+        # Returns word -> cache entry for every word, computing and caching the misses.
+        entries = {}
+        missing = []
+        for w in words:
+            entry = self.word_cache.get(w)
+            if entry is None:
+                missing.append(w)
+            else:
+                entries[w] = entry
+        for w, user_phonemes in self.get_phonemes_batch(missing).items():
+            ref_phonemes_list = pronouncing.phones_for_word(w)
+            ref_phonemes = tuple(ref_phonemes_list[0].split()) if ref_phonemes_list else None
+            alignment, difference_note = (), None
+            if ref_phonemes is not None and not self.phoneme_match(tuple(user_phonemes), ref_phonemes):
+                alignment = tuple(align_phonemes(user_phonemes, ref_phonemes))
+                difference_note = self.phoneme_difference_explanation(user_phonemes, ref_phonemes, alignment)
+            entry = (
+                tuple(user_phonemes),
+                ref_phonemes,
+                tuple(convert_arpabet_to_ipa(user_phonemes)),
+                tuple(convert_arpabet_to_ipa(ref_phonemes)) if ref_phonemes else None,
+                alignment,
+                difference_note,
+            )
+            self.word_cache.put(w, entry)
+            entries[w] = entry
+        return entries
+
     def get_phonemes(self, word):
         phonemes = [p for p in self.g2p(word) if p.strip()]
         return phonemes
 
+    def get_phonemes_batch(self, words):
+        # Runs G2P once over all words instead of once per word. Homographs depend on the
+        # part of speech of their neighbours, so they are still converted on their own to
+        # keep the cached result context-free.
+        result = {}
+        batch = []
+        for w in words:
+            if w in self.g2p.homograph2features:
+                result[w] = self.get_phonemes(w)
+            else:
+                batch.append(w)
+        if not batch:
+            return result
+
+        groups = [[]]
+        for p in self.g2p(" ".join(batch)):
+            if p == " ":
+                groups.append([])
+            elif p.strip():
+                groups[-1].append(p)
+        if len(groups) == len(batch):
+            result.update(zip(batch, groups))
+        else:
+            # The tokenizer split a word (e.g. "cannot"), so groups no longer line up with words.
+            for w in batch:
+                result[w] = self.get_phonemes(w)
+        return result
+
+    def cache_stats(self):
+        return self.word_cache.stats()
+
     def phoneme_match(self, user_phonemes, ref_phonemes):
         return user_phonemes == ref_phonemes
 
-    def phoneme_difference_explanation(self, user_phonemes, ref_phonemes):
-        # Find first differing phoneme
-        min_len = min(len(user_phonemes), len(ref_phonemes))
-        for i in range(min_len):
-            if user_phonemes[i] != ref_phonemes[i]:
-                return f"You pronounced the phoneme '{user_phonemes[i]}' but it should be '{ref_phonemes[i]}'. Try adjusting your vowel or consonant sound for that phoneme."
-        if len(user_phonemes) < len(ref_phonemes):
-            return f"You omitted a phoneme. The correct pronunciation has additional sounds at the end."
-        if len(user_phonemes) > len(ref_phonemes):
-            return f"You added extra sounds. Try removing extra phonemes."
-
-        return "Try pronouncing the word more clearly."
+    def phoneme_difference_explanation(self, user_phonemes, ref_phonemes, alignment=None):
+        # Describe every substitution, omission and addition, not just the first differing position
+        if alignment is None:
+            alignment = align_phonemes(user_phonemes, ref_phonemes)
+        notes = []
+        for op in alignment:
+            if op["op"] == "substitution":
+                notes.append(f"You pronounced the phoneme '{op['user_phoneme']}' but it should be '{op['correct_phoneme']}'.")
+            elif op["op"] == "deletion":
+                notes.append(f"You omitted the phoneme '{op['correct_phoneme']}'.")
+            else:
+                notes.append(f"You added an extra phoneme '{op['user_phoneme']}'.")
+        if not notes:
+            return "Try pronouncing the word more clearly."
+        substitutions = sum(1 for op in alignment if op["op"] == "substitution")
+        if substitutions == 1:
+            notes.append("Try adjusting your vowel or consonant sound for that phoneme.")
+        elif substitutions > 1:
+            notes.append("Try adjusting your vowel or consonant sounds for those phonemes.")
+        return " ".join(notes)
 
     def get_correction_suggestions(self, errors):
         suggestions = []
@@ -0,0 +1,85 @@
+import gc
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Lazily builds heavy components (models, NLP pipelines) on first use.
+
+    Each entry is constructed at most once per process, under its own lock, so
+    concurrent first requests wait for a single load instead of racing.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._instances = {}
+        self._lock = threading.Lock()
+        self.load_times = {}
+
+    def register(self, name, factory, warmup=None, fork_safe=True):
+        # fork_safe=False keeps an entry out of preload(), e.g. when it owns a subprocess or socket.
+        self._entries[name] = {
+            "factory": factory,
+            "warmup": warmup,
+            "fork_safe": fork_safe,
+            "lock": threading.Lock(),
+        }
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        entry = self._entries[name]
+        with entry["lock"]:
+            instance = self._instances.get(name)
+            if instance is None:
+                start = time.perf_counter()
+                instance = entry["factory"]()
+                self.load_times[name] = time.perf_counter() - start
+                logger.info("Loaded %s in %.1fs", name, self.load_times[name])
+                with self._lock:
+                    self._instances[name] = instance
+        return instance
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def names(self):
+        return list(self._entries)
+
+    def preload(self, names=None, fork_safe_only=False):
+        # Eagerly builds entries, e.g. in the gunicorn master before workers are forked.
+        for name in names or self.names():
+            if fork_safe_only and not self._entries[name]["fork_safe"]:
+                continue
+            self.get(name)
+        # Move everything loaded so far out of the collector's generations, so that
+        # collections in forked workers do not touch (and copy) the shared pages.
+        if hasattr(gc, "freeze"):
+            gc.collect()
+            gc.freeze()
+
+    def warm_up(self, names=None):
+        # Runs each entry's warm-up hook once (loading it first if needed).
+        for name in names or self.names():
+            warmup = self._entries[name]["warmup"]
+            instance = self.get(name)
+            if warmup is not None:
+                start = time.perf_counter()
+                try:
+                    warmup(instance)
+                except Exception:
+                    logger.exception("Warm-up of %s failed", name)
+                    continue
+                logger.info("Warmed up %s in %.1fs", name, time.perf_counter() - start)
+
+    def warm_up_in_background(self, names=None):
+        thread = threading.Thread(target=self.warm_up, args=(names,), name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+registry = ModelRegistry()
@@ -0,0 +1,211 @@
+from collections import Counter, OrderedDict
+import threading
+
+from config import Config
+from modules.phoneme_map import align_phonemes
+
+SUMMARY_HEADER = "<h2>Detailed Summary of Your Session:</h2>"
+SUMMARY_CLOSING = "<p>Thank you for practicing! Goodbye.</p>"
+NO_GRAMMAR_ISSUES = "<p>No significant grammar issues detected.</p>"
+NO_PRONUNCIATION_ISSUES = "<p>No significant pronunciation issues detected.</p>"
+TOP_N = 5  # Entries per counter reported by snapshot()
+
+def render_turn(user_text, grammar_errors, pron_errors, pattern_analysis):
+    # HTML fragments describing one utterance and its analysis results.
+    parts = []
+    ge, pe, pa = grammar_errors, pron_errors, pattern_analysis
+
+    if ge or pe or pa:
+        # Add the user's utterance if there are any related analyses.
+        parts.append(f"<h4>Your utterance: '{user_text}'</h4>")
+
+    if pa:
+        # Include pattern analysis details such as filler words and category.
+        filler_count = pa.get("filler_count", 0)
+        category = pa.get("category", "statement")
+        if filler_count > 0:
+            parts.append(f"<p>This was categorized as a {category} and contained {filler_count} filler words.</p>")
+        else:
+            parts.append(f"<p>This was categorized as a {category} with no filler words detected.</p>")
+
+    # Process grammar errors, if any.
+    for err in ge:
+        original = err["original_sentence"]
+        error_word = err["error_word"]
+        suggestion = err["suggestion"]
+        explanation = err["explanation"]
+        parts.append(
+            f"<p><strong>Grammar Issue:</strong> In '{original}', '{error_word}' should be '{suggestion}'. {explanation}</p>"
+        )
+
+    # Process pronunciation errors, if any.
+    for err in pe:
+        w = err["word"]
+        user_ph = " ".join(err['user_phonemes'])
+        user_ipa = " ".join(err['user_ipa'])
+        diff_note = err["difference_note"]
+        mismatchIndexes = {op['position'] for op in alignment_for(err) if op['op'] != 'insertion'}
+
+        # Build HTML for correct phonemes with a button to hear the phoneme.
+        correctPhHTML = ""
+        for i, ph in enumerate(err['correct_phonemes']):
+            if i in mismatchIndexes:
+                correctPhHTML += f'<span style="color:red;">{ph}</span> <button class="btn btn-sm btn-info" onclick="playPhoneme(\'{ph}\')">Hear</button> '
+            else:
+                correctPhHTML += ph + " "
+
+        # Build HTML for correct IPA with highlighted mismatched phoneme.
+        correctIpaHTML = ""
+        for i, ph in enumerate(err['correct_ipa']):
+            if i in mismatchIndexes:
+                correctIpaHTML += f'<span style="color:red;">{ph}</span> '
+            else:
+                correctIpaHTML += ph + " "
+
+        parts.append(
+            f"<div class='card card-body bg-light mb-3'>"
+            f"<strong>Pronunciation Issue:</strong> The word '{w}' was mispronounced.<br>"
+            f"You said (ARPAbet): [{user_ph}]<br>"
+            f"You said (IPA): [{user_ipa}]<br>"
+            f"Try (ARPAbet): [{correctPhHTML}]<br>"
+            f"Try (IPA): [{correctIpaHTML}]<br>"
+            f"{diff_note}"
+            f"</div>"
+        )
+    return parts
+
+def alignment_for(err):
+    # Rows stored before alignments were recorded are aligned here.
+    alignment = err.get('alignment')
+    if alignment is None:
+        alignment = align_phonemes(err['user_phonemes'], err['correct_phonemes'])
+    return alignment
+
+class SessionSummary:
+    """Running summary of one practice session.
+
+    Each turn is rendered and counted once, when its analysis arrives, so the
+    final summary only joins fragments that already exist.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.turns = 0
+        self.fragments = []
+        self.filler_words = 0
+        self.grammar_issues = 0
+        self.pronunciation_issues = 0
+        self.grammar_categories = Counter()
+        self.grammar_rules = Counter()
+        self.missed_phonemes = Counter()
+        self.phoneme_confusions = Counter()  # (expected, said) -> count
+        self.mispronounced_words = Counter()
+
+    @classmethod
+    def from_rows(cls, convos):
+        # Rebuilds a summary from stored Conversation rows, in the order given.
+        return cls.from_turns((c.user_text, c.get_grammar_errors(), c.get_pronunciation_errors(),
+                               c.get_pattern_analysis()) for c in convos)
+
+    @classmethod
+    def from_turns(cls, turns):
+        # Rebuilds a summary from (user_text, grammar_errors, pron_errors, pattern_analysis) tuples,
+        # as modules.models.session_turns returns them.
+        summary = cls()
+        for turn in turns:
+            summary.add_turn(*turn)
+        return summary
+
+    def add_turn(self, user_text, grammar_errors, pron_errors, pattern_analysis):
+        fragments = render_turn(user_text, grammar_errors, pron_errors, pattern_analysis)
+        with self.lock:
+            self.turns += 1
+            self.fragments.extend(fragments)
+            self.filler_words += (pattern_analysis or {}).get("filler_count", 0)
+            self.grammar_issues += len(grammar_errors)
+            self.pronunciation_issues += len(pron_errors)
+            for err in grammar_errors:
+                self.grammar_categories[err.get("category") or "UNKNOWN"] += 1
+                if err.get("rule_id"):
+                    self.grammar_rules[err["rule_id"]] += 1
+            for err in pron_errors:
+                self.mispronounced_words[err["word"]] += 1
+                for op in alignment_for(err):
+                    if op["op"] != "insertion":
+                        self.missed_phonemes[op["correct_phoneme"]] += 1
+                    if op["op"] == "substitution":
+                        self.phoneme_confusions[(op["correct_phoneme"], op["user_phoneme"])] += 1
+
+    def render(self):
+        # HTML-formatted summary of the session, including grammar and pronunciation analysis.
+        with self.lock:
+            parts = [SUMMARY_HEADER] + self.fragments
+            if not self.grammar_issues:
+                parts.append(NO_GRAMMAR_ISSUES)
+            if not self.pronunciation_issues:
+                parts.append(NO_PRONUNCIATION_ISSUES)
+        parts.append(SUMMARY_CLOSING)
+        return "\n".join(parts)
+
+    def snapshot(self):
+        # Counters only, cheap enough to poll mid-session.
+        with self.lock:
+            return {
+                "turns": self.turns,
+                "filler_words": self.filler_words,
+                "grammar_issues": self.grammar_issues,
+                "pronunciation_issues": self.pronunciation_issues,
+                "grammar_categories": dict(self.grammar_categories),
+                "top_grammar_rules": self.grammar_rules.most_common(TOP_N),
+                "top_missed_phonemes": self.missed_phonemes.most_common(TOP_N),
+                "top_phoneme_confusions": [
+                    {"expected": expected, "said": said, "count": count}
+                    for (expected, said), count in self.phoneme_confusions.most_common(TOP_N)
+                ],
+                "top_mispronounced_words": self.mispronounced_words.most_common(TOP_N),
+            }
+
+class SessionSummaryStore:
+    """Per-session running summaries, least recently used sessions dropped first.
+
+    Summaries live in the worker's memory. When a session's summary is missing
+    or behind (its turns were served by another worker, or it was evicted),
+    `get` rebuilds it from the turns `loader(session_id)` returns.
+    """
+
+    def __init__(self, max_sessions=None):
+        self.max_sessions = max_sessions or Config.MAX_CONVERSATION_SESSIONS
+        self.summaries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add_turn(self, session_id, turn_index, user_text, grammar_errors, pron_errors, pattern_analysis):
+        with self.lock:
+            summary = self.summaries.pop(session_id, None)
+            if summary is None and turn_index == 0:
+                summary = SessionSummary()
+            if summary is not None:
+                self.summaries[session_id] = summary
+                self._evict()
+        # A session first seen mid-way is left to `get` to rebuild, so no turn is missed.
+        if summary is not None:
+            summary.add_turn(user_text, grammar_errors, pron_errors, pattern_analysis)
+
+    def get(self, session_id, expected_turns, loader):
+        with self.lock:
+            summary = self.summaries.get(session_id)
+            if summary is not None:
+                self.summaries.move_to_end(session_id)
+        if summary is None or summary.turns < expected_turns:
+            summary = SessionSummary.from_turns(loader(session_id))
+            with self.lock:
+                self.summaries[session_id] = summary
+                self._evict()
+        return summary
+
+    def reset(self, session_id):
+        with self.lock:
+            self.summaries.pop(session_id, None)
+
+    def _evict(self):
+        while len(self.summaries) > self.max_sessions:
+            self.summaries.popitem(last=False)
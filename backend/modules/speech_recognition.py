@@ -1,38 +1,78 @@
 import speech_recognition as sr
-import tempfile
-import subprocess
-import os
+
+from config import Config
+from modules.asr_engines import EngineChain, build_engine
+from modules.audio_decoder import DecoderPool, SAMPLE_RATE, SAMPLE_WIDTH
+from modules.audio_processing import preprocess_audio
+from modules.tracing import span
 
 class SpeechRecognizer:
-    def __init__(self):
-        self.recognizer = sr.Recognizer()
+    def __init__(self, engines=None):
+        self.decoder = DecoderPool(workers=Config.AUDIO_DECODER_WORKERS, backend=Config.AUDIO_DECODER)
+        # Engines are tried in order (e.g. Google, then offline Sphinx) with timeouts and circuit breakers.
+        if engines is None:
+            engines = [build_engine(name.strip(), Config.ASR_FAKE_TRANSCRIPT, Config.ASR_TIMEOUT)
+                       for name in Config.ASR_ENGINES.split(",") if name.strip()]
+        self.engines = EngineChain(
+            engines,
+            timeout=Config.ASR_TIMEOUT,
+            failure_threshold=Config.ASR_BREAKER_THRESHOLD,
+            reset_timeout=Config.ASR_BREAKER_RESET,
+        )
+        # Live partial transcripts use the same engines with breakers of their own, so failing
+        # partials never push the final transcript onto a fallback engine.
+        self.partial_engines = EngineChain(
+            engines,
+            timeout=Config.ASR_TIMEOUT,
+            failure_threshold=Config.ASR_BREAKER_THRESHOLD,
+            reset_timeout=Config.ASR_BREAKER_RESET,
+        )
 
     def recognize(self, audio_file):
-        # Save the uploaded file (webm/opus) to a temporary file
-        with tempfile.NamedTemporaryFile(suffix=".webm", delete=False) as tmp_webm:
-            audio_data = audio_file.read()
-            tmp_webm.write(audio_data)
-            tmp_webm_path = tmp_webm.name
+        # Decode the uploaded file (webm/opus) to 16kHz mono PCM in memory, without temp files
+        return self.transcribe_pcm(self.decoder.decode(audio_file.read()))
+
+    def recognize_chunks(self, chunks):
+        # Decodes the upload while it is still arriving, then transcribes it.
+        stream = self.open_stream()
+        try:
+            for chunk in chunks:
+                stream.feed(chunk)
+        except Exception:
+            stream.abort()
+            raise
+        return stream.finish()
 
-        # Convert from webm to wav using ffmpeg
-        tmp_wav = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-        tmp_wav_path = tmp_wav.name
-        tmp_wav.close()
+    def open_stream(self):
+        return RecognitionStream(self, self.decoder.open_stream())
 
-        # Run ffmpeg: convert to WAV, 16kHz, mono
-        subprocess.run(["ffmpeg", "-y", "-i", tmp_webm_path, "-ar", "16000", "-ac", "1", tmp_wav_path], check=True)
+    def transcribe_pcm(self, pcm, partial=False):
+        # Silence is trimmed and long pauses shortened before ASR; audio without speech never reaches an engine.
+        with span("audio_preprocess"):
+            speech = preprocess_audio(pcm)
+        if not speech:
+            return ""
+        engines = self.partial_engines if partial else self.engines
+        with span("asr_partial" if partial else "asr"):
+            return engines.transcribe(sr.AudioData(speech, SAMPLE_RATE, SAMPLE_WIDTH))
 
-        # Now read the WAV file with SpeechRecognition
-        with sr.AudioFile(tmp_wav_path) as source:
-            audio = self.recognizer.record(source)
 
-        # Optionally, clean up temporary files
-        os.remove(tmp_webm_path)
-        os.remove(tmp_wav_path)
+class RecognitionStream:
+    """One utterance fed to the recognizer chunk by chunk."""
 
-        try:
-            text = self.recognizer.recognize_google(audio)
-        except sr.UnknownValueError:
-            text = ""
+    def __init__(self, recognizer, decode):
+        self.recognizer = recognizer
+        self.decode = decode
+
+    def feed(self, chunk):
+        self.decode.feed(chunk)
+
+    def pcm(self):
+        # PCM decoded so far.
+        return self.decode.pcm()
+
+    def finish(self):
+        return self.recognizer.transcribe_pcm(self.decode.finish())
 
-        return text
+    def abort(self):
+        self.decode.abort()
@@ -0,0 +1,226 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+import contextvars
+import sys
+import threading
+import time
+import uuid
+
+# Histogram bucket upper bounds in seconds, from sub-millisecond spaCy calls to slow generations.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set, as Prometheus expects them."""
+
+    def __init__(self, name, help_text, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}  # sorted label items -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{self.name}_bucket{_labels(key, le=_number(bound))} {count}")
+            lines.append(f"{self.name}_bucket{_labels(key, le='+Inf')} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(key)} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(key)} {values[-1]}")
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+        self._values = Counter()
+
+    def inc(self, amount=1, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(key)} {value}")
+        return lines
+
+
+def _number(value):
+    return repr(float(value))
+
+
+def _labels(key, **extra):
+    items = list(key) + list(extra.items())
+    if not items:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in items)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(items, escaped)) + "}"
+
+
+class Metrics:
+    """In-process metrics of this worker, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def histogram(self, name, help_text):
+        return self._get(name, lambda: Histogram(name, help_text))
+
+    def counter(self, name, help_text):
+        return self._get(name, lambda: CounterMetric(name, help_text))
+
+    def _get(self, name, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in sorted(metrics, key=lambda m: m.name):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+stage_seconds = metrics.histogram("stage_duration_seconds", "Time spent per processing stage.")
+
+
+class Trace:
+    """The spans recorded while serving one request, from any thread it hands work to."""
+
+    def __init__(self, name, trace_id=None):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.started_at = time.perf_counter()
+        self.spans = []  # (name, start ms from trace start, duration ms)
+        self._lock = threading.Lock()
+
+    def add(self, name, start, duration_ms):
+        with self._lock:
+            self.spans.append((name, (start - self.started_at) * 1000, duration_ms))
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def totals(self):
+        # Total milliseconds per span name, in order of first appearance.
+        totals = {}
+        with self._lock:
+            for name, _, duration_ms in self.spans:
+                totals[name] = totals.get(name, 0.0) + duration_ms
+        return totals
+
+    def server_timing(self):
+        # Value of a Server-Timing header: one entry per span name plus the request so far.
+        entries = [f"{_metric_token(name)};dur={ms:.1f}" for name, ms in self.totals().items()]
+        entries.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(entries)
+
+
+def _metric_token(name):
+    return "".join(c if c.isalnum() or c in "-_" else "-" for c in name)
+
+
+def start_trace(name, trace_id=None):
+    # Makes a new trace current in this context.
+    trace = Trace(name, trace_id)
+    _current_trace.set(trace)
+    return trace
+
+
+def end_trace():
+    _current_trace.set(None)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name):
+    """Times the block: always into the stage histogram, and into the current trace if there is one.
+
+    Work handed to other threads keeps the trace as long as the context is copied,
+    which BoundedExecutor and AnalysisPipeline do.
+    """
+    trace = _current_trace.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        stage_seconds.observe(duration, stage=name)
+        if trace is not None:
+            trace.add(name, start, duration * 1000)
+
+
+class SamplingProfiler:
+    """Samples the stacks of all other threads every `interval_ms` while running.
+
+    Meant for one request at a time: start it when the request comes in and stop it
+    when the response is closed. `folded()` returns the samples in the collapsed
+    format of flamegraph.pl and speedscope ("frame;frame;frame count" per line).
+    """
+
+    def __init__(self, interval_ms=5, max_depth=64):
+        self.interval = interval_ms / 1000.0
+        self.max_depth = max_depth
+        self.samples = defaultdict(int)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
@@ -0,0 +1,154 @@
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import threading
+
+from modules.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class TTSCache:
+    """Content-addressed store of synthesized speech.
+
+    Each (text, lang) pair is synthesized once and stored as `<sha256>.mp3`, so the
+    same text always maps to the same file and URL. Files are evicted least recently
+    used first once their total size exceeds `max_bytes`. The directory is the source
+    of truth: files written by other worker processes are picked up on lookup.
+
+    A file can be evicted at any time, so callers that need the audio use `read` or
+    `get_bytes`, which read it in one go, rather than opening `path_for` themselves.
+    """
+
+    def __init__(self, directory, engine, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.engine = engine
+        self.max_bytes = max_bytes
+        self._index = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        # Rebuild LRU order from modification times, which are bumped on every hit.
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".mp3"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total += size
+
+    @staticmethod
+    def key(text, lang="en"):
+        return hashlib.sha256(f"{lang}\0{text}".encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get_or_synthesize(self, text, lang="en"):
+        # Returns the cache key for the audio, synthesizing it only if no file exists yet.
+        key = self.key(text, lang)
+        if not self._touch(key):
+            self._synthesize(key, text, lang)
+        return key
+
+    def get_bytes(self, text, lang="en"):
+        # If the file is evicted between lookup and read, the audio is synthesized again.
+        key = self.key(text, lang)
+        audio = self.read(key)
+        if audio is None:
+            audio = self._synthesize(key, text, lang)
+        return audio
+
+    def read(self, key):
+        # The audio stored under `key`, or None if it is not (or no longer) cached.
+        path = self.path_for(key)
+        try:
+            # Once open, the file stays readable even if it is evicted meanwhile.
+            with open(path, "rb") as f:
+                audio = f.read()
+        except OSError:
+            self._forget(key)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            return audio  # evicted right after the read
+        self._mark_used(key, len(audio))
+        return audio
+
+    def _synthesize(self, key, text, lang):
+        # Concurrent requests for the same text wait for a single synthesis. Returns the audio.
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                audio = self.read(key)
+                if audio is None:
+                    with span("tts"):
+                        audio = self.engine.synthesize(text, lang)
+                    self._store(key, audio)
+                return audio
+        finally:
+            with self._lock:
+                self._key_locks.pop(key, None)
+
+    def _touch(self, key):
+        path = self.path_for(key)
+        try:
+            size = os.path.getsize(path)
+            os.utime(path)
+        except OSError:
+            self._forget(key)
+            return False
+        self._mark_used(key, size)
+        return True
+
+    def _mark_used(self, key, size):
+        with self._lock:
+            if key not in self._index:
+                # Written by another worker process.
+                self._index[key] = size
+                self._total += size
+            self._index.move_to_end(key)
+
+    def _forget(self, key):
+        with self._lock:
+            if key in self._index:
+                self._total -= self._index.pop(key)
+
+    def _store(self, key, data):
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            # A key stored again (e.g. after its file vanished) replaces its old size.
+            self._total += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def prewarm(self, texts, lang="en"):
+        for text in texts:
+            try:
+                self.get_or_synthesize(text, lang)
+            except Exception:
+                logger.exception("Could not pre-warm TTS for %r", text)
+
+    def stats(self):
+        return {"files": len(self._index), "bytes": self._total, "max_bytes": self.max_bytes}
@@ -0,0 +1,41 @@
+import io
+
+from gtts import gTTS
+
+# One silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, mono, 1152 samples (~26 ms).
+# An all-zero side info section decodes to silence in every mp3 decoder.
+SILENT_MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0xC0]) + bytes(417 - 4)
+SILENT_FRAME_SECONDS = 1152 / 44100
+
+
+class GTTSEngine:
+    """Google Translate text-to-speech (network)."""
+
+    name = "gtts"
+
+    def synthesize(self, text, lang="en"):
+        # Returns the mp3 bytes for the text.
+        buf = io.BytesIO()
+        gTTS(text=text, lang=lang).write_to_fp(buf)
+        return buf.getvalue()
+
+
+class SilentEngine:
+    """Offline stand-in for tests: deterministic silent mp3, about 0.3 s per word."""
+
+    name = "silent"
+
+    def __init__(self, seconds_per_word=0.3):
+        self.seconds_per_word = seconds_per_word
+
+    def synthesize(self, text, lang="en"):
+        seconds = max(1, len(text.split())) * self.seconds_per_word
+        return SILENT_MP3_FRAME * max(1, int(seconds / SILENT_FRAME_SECONDS))
+
+
+def build_tts_engine(name):
+    if name == "gtts":
+        return GTTSEngine()
+    if name == "silent":
+        return SilentEngine()
+    raise ValueError(f"Unknown TTS engine: {name}")
@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+import re
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def split_sentences(text):
+    return [s.strip() for s in SENTENCE_END_RE.split(text) if s.strip()]
+
+
+class SpeechStreamer:
+    """Streams the speech for a text sentence by sentence.
+
+    The first sentence is sent as soon as it is synthesized, while the next
+    `lookahead` sentences are already being synthesized in the background. Each
+    sentence goes through the TTS cache, so recurring sentences cost nothing.
+    """
+
+    def __init__(self, tts_cache, workers=4, lookahead=2):
+        self.tts_cache = tts_cache
+        self.lookahead = lookahead
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-stream")
+
+    def stream(self, text, lang="en"):
+        # Yields mp3 bytes; concatenated mp3 frames from consecutive sentences play as one stream.
+        sentences = split_sentences(text) or [text]
+        pending = []
+        next_index = 0
+        while next_index < len(sentences) or pending:
+            while next_index < len(sentences) and len(pending) <= self.lookahead:
+                pending.append(self.executor.submit(self.tts_cache.get_bytes, sentences[next_index], lang))
+                next_index += 1
+            data = pending.pop(0).result()
+            for i in range(0, len(data), STREAM_CHUNK_SIZE):
+                yield data[i:i + STREAM_CHUNK_SIZE]
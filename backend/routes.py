@@ -1,123 +1,582 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, current_app, request, jsonify, send_file, session, stream_with_context
+from flask_sock import Sock
 from modules.speech_recognition import SpeechRecognizer
+from modules.nlp import load_nlp
 from modules.nlu import NLUProcessor
-from modules.conversation_manager import ConversationManager
+from modules.conversation_manager import ConversationManager, ReplyClaim
 from modules.pronunciation_analyzer import PronunciationAnalyzer
 from modules.grammar_checker import GrammarChecker
-from modules.database import db_session
-from modules.models import Conversation
-from modules.phoneme_audio import get_example_word
-from gtts import gTTS
+from modules.database import db_session, save_conversation, flush_writes
+from modules.models import Conversation, session_turns
+from modules.phoneme_audio import get_example_word, phoneme_examples
+from modules.registry import registry
+from modules.analysis_pipeline import AnalysisPipeline
+from modules.executors import cpu_executor, io_executor
+from modules.response_generator import ResponseGenerator
+from modules.dialogue_policies import DialoguePolicy
+from modules.tts_cache import TTSCache
+from modules.tts_engines import build_tts_engine
+from modules.tts_stream import SpeechStreamer
+from modules.session_summary import SessionSummaryStore
+from modules.live_transcription import LiveUtterance
+from modules.tracing import metrics, span
+from config import Config
+import base64
+import io
+import json
+import logging
 import os
+import re
 import time
+import uuid
 
 from modules.pattern_recognizer import PatternRecognizer
 
 api = Blueprint('api', __name__)
+sock = Sock()
+logger = logging.getLogger(__name__)
 
-speech_recognizer = SpeechRecognizer()
-nlu_processor = NLUProcessor()
-conv_manager = ConversationManager()
-pron_analyzer = PronunciationAnalyzer()
-grammar_checker = GrammarChecker()
-pattern_recognizer = PatternRecognizer()
+# Heavy components are built on first use (or preloaded, see gunicorn.conf.py) rather than at import time.
+def _warm_up_conversation(manager):
+    manager.handle_input("general", "Hello!", "warmup")
+    manager.reset_session("warmup")
 
-TTS_FILE_PATH = "/app/backend/response.mp3"
+registry.register("speech_recognizer", SpeechRecognizer)
+# One spaCy pipeline shared by NLU and pattern recognition, so each utterance is parsed once.
+registry.register("nlp", load_nlp)
+registry.register("nlu_processor", lambda: NLUProcessor(registry.get("nlp")))
+registry.register("conv_manager", ConversationManager, warmup=_warm_up_conversation)
+registry.register("pron_analyzer", PronunciationAnalyzer, warmup=lambda analyzer: analyzer.analyze("hello world"))
+# A local LanguageTool starts a Java server owned by the process that created it, so it is only
+# preloaded before a fork when a shared server is configured.
+registry.register("grammar_checker", GrammarChecker, warmup=lambda checker: checker.check("This are a test."),
+                  fork_safe=bool(Config.LANGUAGETOOL_URL))
+registry.register("pattern_recognizer", lambda: PatternRecognizer(registry.get("nlp")), warmup=lambda recognizer: recognizer.analyze_utterance("um hello"))
+
+def _build_tts_cache():
+    return TTSCache(Config.TTS_CACHE_DIR, build_tts_engine(Config.TTS_ENGINE), max_bytes=Config.TTS_CACHE_MAX_BYTES)
+
+# Synthesizing every phoneme example word up front makes "Hear" buttons instant.
+registry.register("tts_cache", _build_tts_cache, warmup=lambda cache: cache.prewarm(sorted(set(phoneme_examples.values()))))
+registry.register("speech_streamer", lambda: SpeechStreamer(registry.get("tts_cache"), lookahead=Config.TTS_STREAM_LOOKAHEAD))
+response_generator = ResponseGenerator()
+# Template, topic, cached or generated reply per turn (see modules/dialogue_policies.py).
+registry.register("dialogue_policy", lambda: DialoguePolicy(registry.get("conv_manager"), response_generator))
+
+def respond(ctx):
+    # The claim lets only one of this reply and a timeout fallback enter the session history.
+    claim = ctx.setdefault("reply_claim", ReplyClaim())
+    if claim.claimed:
+        return None  # the fallback already answered before this stage got a worker
+    ctx["response_started"] = True
+    reply, ctx["response_path"] = registry.get("dialogue_policy").respond(
+        ctx["intent"], ctx["entities"], ctx["user_text"], ctx["session_id"], claim=claim)
+    return reply
+
+def respond_fallback(ctx):
+    # A canned reply rather than leaving the user without an answer. It goes into the history in
+    # place of the model's reply, which is cancelled or dropped if it still arrives.
+    reply = response_generator.generate(ctx["intent"], ctx["entities"], ctx["user_text"])
+    claim = ctx.setdefault("reply_claim", ReplyClaim())
+    # A skipped stage never added the user turn, so there is nothing to answer in the history.
+    if claim.claim() and ctx.get("response_started"):
+        registry.get("conv_manager").append_turn(ctx["session_id"], "System", reply)
+    return reply
+# Running summary per practice session, updated as each turn's analysis arrives.
+session_summaries = SessionSummaryStore()
+
+# Independent per-utterance analyses run concurrently; a stage that is too slow is replaced by its fallback.
+# spaCy and g2p stages share the bounded CPU pool; LanguageTool calls and the response (which waits
+# on the generation batch) run on the I/O pool, the pipeline's default.
+analysis_pipeline = AnalysisPipeline(io_executor)
+analysis_pipeline.add_stage(
+    "pattern",
+    lambda ctx: registry.get("pattern_recognizer").analyze_doc(ctx["doc"]),
+    timeout=Config.ANALYSIS_STAGE_TIMEOUTS["pattern"],
+    executor=cpu_executor,
+    fallback=lambda ctx: {"filler_count": 0, "category": "statement"},
+)
+analysis_pipeline.add_stage(
+    "grammar",
+    lambda ctx: registry.get("grammar_checker").check(ctx["user_text"]),
+    timeout=Config.ANALYSIS_STAGE_TIMEOUTS["grammar"],
+    fallback=lambda ctx: [],
+)
+analysis_pipeline.add_stage(
+    "pronunciation",
+    lambda ctx: registry.get("pron_analyzer").analyze(ctx["user_text"]),
+    timeout=Config.ANALYSIS_STAGE_TIMEOUTS["pronunciation"],
+    executor=cpu_executor,
+    fallback=lambda ctx: [],
+)
+analysis_pipeline.add_stage(
+    "response",
+    respond,
+    timeout=Config.ANALYSIS_STAGE_TIMEOUTS["response"],
+    fallback=respond_fallback,
+)
+
+ANALYSIS_STAGES = ("pattern", "grammar", "pronunciation")
+UPLOAD_CHUNK_SIZE = 16 * 1024
+WS_POLL_INTERVAL = 0.1  # seconds between checks for partial results and end of speech
+AUDIO_FILENAME_RE = re.compile(r'^([0-9a-f]{64})\.mp3$')
+AUDIO_MAX_AGE = 365 * 24 * 3600
+
+def get_session_id():
+    # Each browser session gets its own conversation history, keyed by an id in the signed session cookie.
+    if 'session_id' not in session:
+        session['session_id'] = uuid.uuid4().hex
+    return session['session_id']
+
+def next_turn_index():
+    # Turn numbers live in the session cookie, so they stay ordered whichever worker serves the request.
+    turn_index = session.get('turn_index', 0)
+    session['turn_index'] = turn_index + 1
+    return turn_index
+
+def load_session_turns(session_id):
+    # A session's turns in order (served by the session/turn index); queued writes are flushed first.
+    flush_writes()
+    return session_turns(db_session, session_id, Config.SUMMARY_YIELD_PER)
+
+def start_new_session():
+    # After a summary the next utterance belongs to a new practice session.
+    session['session_id'] = uuid.uuid4().hex
+    session['turn_index'] = 0
 
 @api.route('/recognize_speech', methods=['POST'])
-def recognize_speech():
+async def recognize_speech():
+    speech_recognizer = registry.get("speech_recognizer")
+    if request.mimetype.startswith('audio/') or request.mimetype == 'application/octet-stream':
+        # Raw (possibly chunked) upload body: decoding starts while the upload is still arriving
+        stream = request.stream
+        chunks = iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b"")
+        transcription = await io_executor.run(speech_recognizer.recognize_chunks, chunks)
+        return jsonify({"transcription": transcription})
     if 'audio' not in request.files:
         return jsonify({"error": "No audio file"}), 400
     audio_file = request.files['audio']
-    transcription = speech_recognizer.recognize(audio_file)
+    transcription = await io_executor.run(speech_recognizer.recognize, audio_file)
     return jsonify({"transcription": transcription})
 
+def record_turn(session_id, user_id, turn_index, user_text, system_response, grammar_errors, pron_errors, pattern_result):
+    # Create a Conversation record with the user's input, the system's response and the analysis
+    convo = Conversation(user_text=user_text, system_response=system_response,
+                         session_id=session_id, user_id=user_id, turn_index=turn_index)
+    convo.set_grammar_errors(grammar_errors)
+    convo.set_pronunciation_errors(pron_errors)  # Stores user IPA and correct IPA
+    convo.set_pattern_analysis(pattern_result)
+
+    # Save the Conversation record to the database and add the turn to the running summary
+    save_conversation(convo)
+    session_summaries.add_turn(session_id, turn_index, user_text, grammar_errors, pron_errors, pattern_result)
+
+def finish_session(session_id, turn_index):
+    # The running summary already holds every earlier turn; it is only rebuilt from the
+    # database when this worker has not seen the whole session.
+    with span("summary"):
+        summary = session_summaries.get(session_id, turn_index + 1, load_session_turns).render()
+    # The practice session is over; the next utterance starts a fresh conversation.
+    registry.get("conv_manager").reset_session(session_id)
+    session_summaries.reset(session_id)
+    start_new_session()
+    return summary
+
+def understand(user_text):
+    # Parses the utterance once; the Doc goes into the pipeline context for the pattern stage.
+    nlu = registry.get("nlu_processor")
+    with span("nlu"):
+        doc = nlu.parse(user_text)
+        intent, entities, confidence = nlu.process_doc(doc)
+    return {"user_text": user_text, "doc": doc, "intent": intent, "intent_confidence": confidence,
+            "entities": entities}
+
+def run_timings(run):
+    timings = {"stages_ms": run.timings, "stage_status": run.status, "total_ms": run.total_ms()}
+    if run.status.get("response") == "ok":
+        timings["response_path"] = run.context.get("response_path")
+    elif run.status.get("response") in ("timeout", "error"):
+        timings["response_path"] = "fallback"
+    return timings
+
 @api.route('/process_input', methods=['POST'])
-def process_input():
+async def process_input():
     data = request.get_json()
     user_text = data.get('text', '').strip()
+    session_id = get_session_id()
+    turn_index = next_turn_index()
+    user_id = data.get('user_id')
 
-    # Analyze user input for patterns and intent
-    pattern_result = pattern_recognizer.analyze_utterance(user_text)
-    intent, entities = nlu_processor.process(user_text)
-    response = conv_manager.handle_input(intent, user_text)
+    # Intent is cheap and decides which stages run, so it is resolved before the fan-out.
+    context = await cpu_executor.run(understand, user_text)
+    context["session_id"] = session_id
+    intent = context["intent"]
 
-    # Perform grammar and pronunciation analysis
-    grammar_errors = grammar_checker.check(user_text)
-    pron_errors = pron_analyzer.analyze(user_text)
-    pron_suggestions = pron_analyzer.get_correction_suggestions(pron_errors)
+    # Run pattern, grammar, pronunciation analysis and response generation concurrently
+    skip = ("response",) if intent == "goodbye" else ()
+    run = analysis_pipeline.submit(context, skip=skip)
+    await run.wait()
+    pattern_result = run.result("pattern")
+    grammar_errors = run.result("grammar")
+    pron_errors = run.result("pronunciation")
+    response = run.result("response")
+    pron_suggestions = registry.get("pron_analyzer").get_correction_suggestions(pron_errors)
+    timings = run_timings(run)
 
     # Check if the intent is 'goodbye' to generate a final summary
+    is_summary = intent == "goodbye"
+    if is_summary:
+        record_turn(session_id, user_id, turn_index, user_text, "(summary pending)",
+                    grammar_errors, pron_errors, pattern_result)
+        response = finish_session(session_id, turn_index)
+    else:
+        record_turn(session_id, user_id, turn_index, user_text, response,
+                    grammar_errors, pron_errors, pattern_result)
+
+    # Return the system's response (or the summary) along with analysis and the is_summary flag
+    return jsonify({
+        "response": response,
+        "grammar_errors": grammar_errors,
+        "pronunciation_errors": pron_errors,
+        "pronunciation_suggestions": pron_suggestions,
+        "timings": timings,
+        "is_summary": is_summary
+    })
+
+def turn_event(event, **fields):
+    return {"event": event, **fields}
+
+def analysis_event(run):
+    pron_errors = run.result("pronunciation")
+    return turn_event(
+        "analysis",
+        grammar_errors=run.result("grammar"),
+        pronunciation_errors=pron_errors,
+        pronunciation_suggestions=registry.get("pron_analyzer").get_correction_suggestions(pron_errors),
+        pattern_analysis=run.result("pattern"),
+    )
+
+def start_voice_turn(user_text, user_id=None):
+    """Starts a spoken turn whose transcript is known and returns its events (dicts).
+
+    Events are "transcription", "reply", "audio" (mp3 bytes, in order), "analysis"
+    (as soon as it is ready, possibly between audio chunks) and "done". Session
+    bookkeeping, the intent and the analysis fan-out happen here, before any event
+    is produced, since an HTTP response sends the session cookie with its first byte.
+    """
+    session_id = get_session_id()
+    turn_index = next_turn_index()
+    context = understand(user_text)
+    context["session_id"] = session_id
+    intent = context["intent"]
+
     if intent == "goodbye":
-        # Create a Conversation record with the user's input and a placeholder response
-        convo = Conversation(user_text=user_text, system_response="(summary pending)")
-        convo.set_grammar_errors(grammar_errors)
-        convo.set_pronunciation_errors(pron_errors)  # Stores user IPA and correct IPA
-        convo.set_pattern_analysis(pattern_result)
-        
-        # Add and commit the Conversation record to the database
-        db_session.add(convo)
-        db_session.commit()
-
-        # Retrieve all Conversation records to generate a comprehensive summary
-        convos = db_session.query(Conversation).all()
-        summary = conv_manager.generate_summary(convos)
-        response = summary
-
-        # Return the summary along with analysis and set is_summary flag to True
-        return jsonify({
-            "response": response,
-            "grammar_errors": grammar_errors,
-            "pronunciation_errors": pron_errors,
-            "pronunciation_suggestions": pron_suggestions,
-            "is_summary": True
-        })
+        # The summary is not spoken, so there is nothing to stream: build everything now.
+        run = analysis_pipeline.run(context, skip=("response",))
+        record_turn(session_id, user_id, turn_index, user_text, "(summary pending)",
+                    run.result("grammar"), run.result("pronunciation"), run.result("pattern"))
+        summary = finish_session(session_id, turn_index)
+        return [
+            turn_event("transcription", text=user_text, intent=intent),
+            analysis_event(run),
+            turn_event("reply", text=summary, is_summary=True),
+            turn_event("done", timings=run_timings(run)),
+        ]
+    run = analysis_pipeline.submit(context)
+    return voice_turn_events(run, session_id, user_id, turn_index, user_text, intent)
+
+def voice_turn_events(run, session_id, user_id, turn_index, user_text, intent):
+    yield turn_event("transcription", text=user_text, intent=intent)
+
+    # Speech starts as soon as the reply text exists; the analysis stages keep running meanwhile.
+    response = run.result("response")
+    try:
+        yield turn_event("reply", text=response, is_summary=False)
+        analysis_sent = False
+        for chunk in registry.get("speech_streamer").stream(response, 'en'):
+            yield turn_event("audio", data=chunk)
+            if not analysis_sent and all(run.ready(name) for name in ANALYSIS_STAGES):
+                analysis_sent = True
+                yield analysis_event(run)
+        if not analysis_sent:
+            yield analysis_event(run)
+    finally:
+        # The turn is kept even if the client disconnects (the generator is closed) or TTS fails mid-stream.
+        record_turn(session_id, user_id, turn_index, user_text, response,
+                    run.result("grammar"), run.result("pronunciation"), run.result("pattern"))
+    yield turn_event("done", timings=run_timings(run))
+
+def ndjson_lines(events):
+    for event in events:
+        if event["event"] == "audio":
+            event = dict(event, data=base64.b64encode(event["data"]).decode("ascii"))
+        yield json.dumps(event) + "\n"
+
+@api.route('/voice_turn', methods=['POST'])
+def voice_turn():
+    """One round trip per spoken turn: recognize, analyse, reply and speak.
+
+    Accepts the same uploads as /recognize_speech and answers with the events of
+    `start_voice_turn` as NDJSON, audio chunks base64-encoded.
+    """
+    speech_recognizer = registry.get("speech_recognizer")
+    if request.mimetype.startswith('audio/') or request.mimetype == 'application/octet-stream':
+        chunks = iter(lambda: request.stream.read(UPLOAD_CHUNK_SIZE), b"")
+        user_text = speech_recognizer.recognize_chunks(chunks)
+        user_id = request.args.get('user_id')
+    elif 'audio' in request.files:
+        user_text = speech_recognizer.recognize(request.files['audio'])
+        user_id = request.form.get('user_id')
     else:
-        # For non-'goodbye' intents, handle normal response flow
-
-        # Create a Conversation record with user's input and system's response
-        convo = Conversation(user_text=user_text, system_response=response)
-        convo.set_grammar_errors(grammar_errors)
-        convo.set_pronunciation_errors(pron_errors)  # Stores user IPA and correct IPA
-        convo.set_pattern_analysis(pattern_result)
-
-        # Add and commit the Conversation record to the database
-        db_session.add(convo)
-        db_session.commit()
-
-        # Return the system's response along with analysis and set is_summary flag to False
-        return jsonify({
-            "response": response,
-            "grammar_errors": grammar_errors,
-            "pronunciation_errors": pron_errors,
-            "pronunciation_suggestions": pron_suggestions,
-            "is_summary": False
-        })
+        return jsonify({"error": "No audio file"}), 400
+
+    events = start_voice_turn((user_text or "").strip(), user_id)
+    return Response(stream_with_context(ndjson_lines(events)), mimetype='application/x-ndjson',
+                    headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"})
+
+def start_streamed_turn(user_text, user_id=None):
+    """Starts a typed turn whose reply is streamed as it is generated; returns its events (dicts).
+
+    Events are "token" (reply text pieces, in order), "reply" (the whole reply),
+    "analysis" and "done". As in `start_voice_turn`, all session bookkeeping happens
+    before the first event.
+    """
+    session_id = get_session_id()
+    turn_index = next_turn_index()
+    context = understand(user_text)
+    context["session_id"] = session_id
+    if context["intent"] == "goodbye":
+        run = analysis_pipeline.run(context, skip=("response",))
+        record_turn(session_id, user_id, turn_index, user_text, "(summary pending)",
+                    run.result("grammar"), run.result("pronunciation"), run.result("pattern"))
+        summary = finish_session(session_id, turn_index)
+        return [
+            turn_event("reply", text=summary, is_summary=True),
+            analysis_event(run),
+            turn_event("done", timings=run_timings(run)),
+        ]
+    # The analysis stages run meanwhile; the reply is produced here instead of by the pipeline.
+    run = analysis_pipeline.submit(context, skip=("response",))
+    path, pieces = registry.get("dialogue_policy").respond_stream(
+        context["intent"], context["entities"], user_text, session_id)
+    return streamed_turn_events(run, pieces, path, session_id, user_id, turn_index, user_text)
+
+def streamed_turn_events(run, pieces, path, session_id, user_id, turn_index, user_text):
+    started = time.perf_counter()
+    first_token_ms = None
+    reply = []
+    for piece in pieces:
+        if first_token_ms is None:
+            first_token_ms = (time.perf_counter() - started) * 1000
+        reply.append(piece)
+        yield turn_event("token", text=piece)
+    response = "".join(reply).strip()
+    reply_ms = (time.perf_counter() - started) * 1000
+    yield turn_event("reply", text=response, is_summary=False)
+    yield analysis_event(run)
+
+    record_turn(session_id, user_id, turn_index, user_text, response,
+                run.result("grammar"), run.result("pronunciation"), run.result("pattern"))
+    timings = run_timings(run)
+    timings.update(response_path=path, first_token_ms=first_token_ms, reply_ms=reply_ms)
+    yield turn_event("done", timings=timings)
+
+def sse_lines(events):
+    for event in events:
+        fields = {key: value for key, value in event.items() if key != "event"}
+        yield f"event: {event['event']}\ndata: {json.dumps(fields)}\n\n"
+
+@api.route('/stream_reply', methods=['GET', 'POST'])
+def stream_reply():
+    """/process_input with the reply streamed as server-sent events while it is decoded.
+
+    POST takes the same JSON as /process_input; GET takes `text` (and `user_id`) as
+    query parameters, for EventSource. Events are those of `start_streamed_turn`.
+    """
+    data = (request.get_json() or {}) if request.method == 'POST' else request.args
+    user_text = data.get('text', '').strip()
+    events = start_streamed_turn(user_text, data.get('user_id'))
+    return Response(stream_with_context(sse_lines(events)), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"})
+
+def send_turn_events(ws, events, end_of_speech):
+    # Audio goes out as binary messages, everything else as JSON text messages.
+    latency = {}
+    try:
+        for event in events:
+            if event["event"] == "audio":
+                latency.setdefault("end_of_speech_to_first_audio_ms", (time.perf_counter() - end_of_speech) * 1000)
+                ws.send(event["data"])
+                continue
+            if event["event"] == "transcription":
+                latency["end_of_speech_to_transcript_ms"] = (time.perf_counter() - end_of_speech) * 1000
+            elif event["event"] == "reply":
+                latency["end_of_speech_to_reply_ms"] = (time.perf_counter() - end_of_speech) * 1000
+            elif event["event"] == "done":
+                event = dict(event, timings=dict(event["timings"], **latency))
+            ws.send(json.dumps(event))
+    finally:
+        # A failed send (client gone) closes the turn's generator here, so it records the turn right away.
+        if hasattr(events, "close"):
+            events.close()
+
+def session_serializer():
+    return current_app.session_interface.get_signing_serializer(current_app)
+
+@sock.route('/voice_stream', bp=api)
+def voice_stream(ws):
+    """Live voice turns over a WebSocket.
+
+    For each utterance the client sends {"type": "start"}, then the recording as
+    binary messages while the user speaks (e.g. MediaRecorder webm/opus chunks),
+    then {"type": "end"}. Meanwhile the server sends "partial" events (the transcript
+    so far, or with "tail": true of its last WS_PARTIAL_WINDOW_MS only, with its
+    filler analysis). It may also end the utterance itself after WS_END_SILENCE_MS
+    of silence, announced with an "end_of_speech" event. After the end, the events
+    of `start_voice_turn` follow, with the reply audio as binary messages.
+
+    Each connection holds a server thread, so clients connect for one recording and
+    close after "done"; a connection idle for WS_IDLE_TIMEOUT_S is closed here. The
+    cookie cannot be updated after the upgrade, so each turn also sends a "session"
+    event whose signed token the client posts to /session_sync.
+    """
+    speech_recognizer = registry.get("speech_recognizer")
+    pattern_recognizer = registry.get("pattern_recognizer")
+    user_id = request.args.get('user_id')
+    utterance = None
+    last_message = time.monotonic()
+    try:
+        while True:
+            message = ws.receive(timeout=WS_POLL_INTERVAL)
+            ended = False
+            if message is None:
+                if utterance is None and time.monotonic() - last_message >= Config.WS_IDLE_TIMEOUT_S:
+                    return
+            else:
+                last_message = time.monotonic()
+            if isinstance(message, bytes):
+                if utterance is not None:
+                    utterance.feed(message)
+            elif message is not None:
+                try:
+                    command = json.loads(message).get("type")
+                except (ValueError, AttributeError):
+                    # Not a JSON object; the connection and any utterance in progress carry on.
+                    ws.send(json.dumps({"event": "error", "message": "Malformed control message"}))
+                    continue
+                if command == "start":
+                    if utterance is not None:
+                        utterance.abort()
+                    utterance = LiveUtterance(speech_recognizer, io_executor, pattern_recognizer.analyze_utterance,
+                                              partial_interval_ms=Config.WS_PARTIAL_INTERVAL_MS,
+                                              end_silence_ms=Config.WS_END_SILENCE_MS,
+                                              partial_window_ms=Config.WS_PARTIAL_WINDOW_MS)
+                elif command == "end":
+                    ended = utterance is not None
+                elif command == "cancel" and utterance is not None:
+                    utterance.abort()
+                    utterance = None
+            if utterance is None:
+                continue
+
+            for event in utterance.poll():
+                ws.send(json.dumps(event))
+            if not ended and (utterance.speech_ended() or utterance.duration_ms() >= Config.WS_MAX_UTTERANCE_MS):
+                ws.send(json.dumps({"event": "end_of_speech"}))
+                ended = True
+            if not ended:
+                continue
+
+            end_of_speech = time.perf_counter()
+            current, utterance = utterance, None
+            try:
+                user_text = current.finish()
+            except Exception:
+                logger.exception("Live transcription failed")
+                ws.send(json.dumps({"event": "error", "message": "Speech could not be recognized"}))
+                continue
+            events = start_voice_turn(user_text, user_id)
+            # Session bookkeeping is done by now; the client stores it through /session_sync.
+            ws.send(json.dumps({"event": "session", "token": session_serializer().dumps(dict(session))}))
+            send_turn_events(ws, events, end_of_speech)
+    finally:
+        if utterance is not None:
+            utterance.abort()
+
+@api.route('/session_sync', methods=['POST'])
+def session_sync():
+    # Stores the session of a WebSocket turn (its "session" event token) in the cookie.
+    token = (request.get_json(silent=True) or {}).get('token')
+    try:
+        data = session_serializer().loads(token, max_age=current_app.permanent_session_lifetime.total_seconds())
+    except Exception:
+        return jsonify({"error": "Invalid session token"}), 400
+    session.clear()
+    session.update(data)
+    return jsonify({"status": "ok"})
+
+@api.route('/session_summary', methods=['GET'])
+def session_summary():
+    # Counters for the current practice session so far; ?html=1 adds the rendered summary.
+    session_id = get_session_id()
+    summary = session_summaries.get(session_id, session.get('turn_index', 0), load_session_turns)
+    result = summary.snapshot()
+    if request.args.get('html') == '1':
+        result["html"] = summary.render()
+    return jsonify(result)
+
+@api.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Stage and request latency histograms and counters of this worker process, for Prometheus to scrape.
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/debug/profile/<trace_id>', methods=['GET'])
+def profile_file(trace_id):
+    # Folded stacks recorded for a request sent with X-Profile; needs the same token.
+    if not Config.PROFILE_TOKEN or request.headers.get('X-Profile') != Config.PROFILE_TOKEN:
+        return jsonify({"error": "Profiling is not enabled"}), 403
+    if not re.fullmatch(r"[0-9a-f]{16}", trace_id):
+        return jsonify({"error": "Invalid trace id"}), 400
+    path = os.path.join(Config.PROFILE_DIR, f"{trace_id}.folded")
+    if not os.path.exists(path):
+        return jsonify({"error": "No such profile"}), 404
+    return send_file(path, mimetype='text/plain')
+
+@api.route('/dialogue_stats', methods=['GET'])
+def dialogue_stats():
+    # Per-worker counts: turns and mean latency per reply path, and the response cache hit rate.
+    return jsonify(registry.get("dialogue_policy").stats())
 
 @api.route('/get_audio_response', methods=['POST'])
-def get_audio_response():
+async def get_audio_response():
     data = request.get_json()
     response_text = data.get("response_text", "I have nothing to say.")
 
-    # Generate a unique filename based on the current timestamp
-    timestamp = int(time.time() * 1000)
-    tts_filename = f"response_{timestamp}.mp3"
-    tts_filepath = f"/app/backend/tmp/{tts_filename}"
-
-    # Convert text response to speech and save the audio file
-    tts = gTTS(text=response_text, lang='en')
-    tts.save(tts_filepath)
+    # Synthesize the response once; identical text reuses the cached file
+    key = await io_executor.run(registry.get("tts_cache").get_or_synthesize, response_text, 'en')
 
     # Return the URL to access the generated audio file
-    return jsonify({"audio_url": f"/audio_response/{tts_filename}"})
+    return jsonify({"audio_url": f"/audio_response/{key}.mp3"})
+
+@api.route('/stream_audio_response', methods=['GET', 'POST'])
+def stream_audio_response():
+    # Single request: speech is streamed sentence by sentence while later sentences are still being synthesized.
+    # GET lets an <audio> element play the stream progressively; POST accepts the same JSON as /get_audio_response.
+    if request.method == 'POST':
+        response_text = (request.get_json() or {}).get("response_text", "I have nothing to say.")
+    else:
+        response_text = request.args.get("text", "I have nothing to say.")
+    audio = registry.get("speech_streamer").stream(response_text, 'en')
+    return Response(stream_with_context(audio), mimetype='audio/mpeg',
+                    headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"})
 
 @api.route('/audio_response/<filename>', methods=['GET'])
 def audio_response_file(filename):
     # Serve the generated audio file with the appropriate MIME type
-    return send_file(f"/app/backend/tmp/{filename}", mimetype='audio/mpeg')
+    return send_cached_audio(filename)
 
 @api.route('/get_phoneme_audio', methods=['POST'])
-def get_phoneme_audio():
+async def get_phoneme_audio():
     data = request.get_json()
     phoneme = data.get("phoneme", "")
     if not phoneme:
@@ -125,18 +584,28 @@ def get_phoneme_audio():
 
     # Retrieve an example word for the given phoneme
     example_word = get_example_word(phoneme)
-    timestamp = int(time.time() * 1000)
-    phoneme_filename = f"phoneme_{timestamp}.mp3"
-    phoneme_filepath = f"/app/backend/tmp/{phoneme_filename}"
-
-    # Convert the example word to speech and save the audio file
-    tts = gTTS(text=example_word, lang='en')
-    tts.save(phoneme_filepath)
-    
+
+    # Example words are pre-warmed at startup, so this is normally a cache hit
+    key = await io_executor.run(registry.get("tts_cache").get_or_synthesize, example_word, 'en')
+
     # Return the URL to access the phoneme audio file
-    return jsonify({"audio_url": f"/phoneme_audio_file/{phoneme_filename}"})
+    return jsonify({"audio_url": f"/phoneme_audio_file/{key}.mp3"})
 
 @api.route('/phoneme_audio_file/<filename>', methods=['GET'])
 def phoneme_audio_dynamic(filename):
     # Serve the phoneme audio file with the appropriate MIME type
-    return send_file(f"/app/backend/tmp/{filename}", mimetype='audio/mpeg')
+    return send_cached_audio(filename)
+
+def send_cached_audio(filename):
+    # File names are content hashes, so the content behind a URL never changes and can be cached for good.
+    match = AUDIO_FILENAME_RE.match(filename)
+    if not match:
+        return jsonify({"error": "Unknown audio file"}), 404
+    # Read in one go: the file may be evicted by a concurrent synthesis at any moment.
+    audio = registry.get("tts_cache").read(match.group(1))
+    if audio is None:
+        return jsonify({"error": "Audio file expired"}), 404
+    response = send_file(io.BytesIO(audio), mimetype='audio/mpeg', etag=match.group(1), max_age=AUDIO_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,58 @@
+import re
+from types import SimpleNamespace
+
+from modules.cache import LRUCache
+from modules.grammar_checker import PARAGRAPH_SEPARATOR, GrammarChecker
+
+
+class FakeTool:
+    """Stands in for LanguageTool with one rule per kind of match check_batch has to handle:
+    a sentence-level rule, a rule that compares neighbouring paragraphs, and matches that
+    cross a paragraph boundary."""
+
+    def __init__(self):
+        self.requests = []
+
+    def check(self, text):
+        self.requests.append(text)
+        matches = []
+        for m in re.finditer(r"\ba (?=[aeiou])", text):
+            matches.append(match(m.start(), 1, "an", "EN_A_VS_AN", "MISC", "Use 'an' before a vowel."))
+        previous = None
+        pos = 0
+        for paragraph in text.split(PARAGRAPH_SEPARATOR):
+            first = paragraph.split(" ")[0]
+            if previous is not None and first == previous:
+                matches.append(match(pos, len(first), "Also", "ENGLISH_WORD_REPEAT_BEGINNING_RULE", "STYLE",
+                                     "Three successive sentences begin with the same word."))
+            previous = first
+            pos += len(paragraph) + len(PARAGRAPH_SEPARATOR)
+        for m in re.finditer(r"\bthe\s+the\b", text):
+            matches.append(match(m.start(), m.end() - m.start(), "the", "ENGLISH_WORD_REPEAT_RULE", "MISC",
+                                 "Possible typo: you repeated a word."))
+        return matches
+
+
+def match(offset, length, replacement, rule_id, category, message):
+    return SimpleNamespace(offset=offset, errorLength=length, replacements=[replacement], ruleId=rule_id,
+                           category=category, message=message)
+
+
+def make_checker():
+    checker = GrammarChecker.__new__(GrammarChecker)
+    checker.tool = FakeTool()
+    checker.cache = LRUCache(maxsize=100, ttl=None)
+    return checker
+
+
+def test_check_batch_matches_per_text_check_on_adjacent_texts():
+    texts = ["I ate a apple", "I like the", "the dog likes a orange", "I ate a apple", "We went home"]
+    batched = make_checker()
+    results = batched.check_batch(texts)
+    assert len(batched.tool.requests) == 1
+
+    expected = [make_checker().check(text) for text in texts]
+    assert results == expected
+    # Results cached from the joined request are the same as single-text checks.
+    assert [batched.check(text) for text in texts] == expected
+    assert len(batched.tool.requests) == 1
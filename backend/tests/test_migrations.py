@@ -0,0 +1,34 @@
+import json
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from modules import aggregates
+from modules.migrations import backfill, upgrade
+from modules.models import Conversation, session_turns
+from modules.session_summary import SessionSummary
+
+
+def legacy_error(user_phonemes):
+    # A pronunciation error as stored before alignments were recorded.
+    return {"word": "cat", "user_phonemes": user_phonemes, "correct_phonemes": ["K", "AE1", "T"],
+            "user_ipa": user_phonemes, "correct_ipa": ["k", "æ", "t"], "difference_note": "Try again."}
+
+
+def test_backfill_aligns_legacy_pronunciation_errors(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    upgrade(engine)
+    with Session(engine) as db:
+        for i, user_phonemes in enumerate((["K", "AH1", "T"], ["K", "EH1", "T"])):
+            db.add(Conversation(user_text="cat", session_id="legacy", turn_index=i,
+                                grammar_errors=json.dumps([]),
+                                pronunciation_errors=json.dumps([legacy_error(user_phonemes)])))
+        db.commit()
+
+    assert backfill(engine) == 2
+    with Session(engine) as db:
+        assert db.query(Conversation).filter(Conversation.pronunciation_errors.isnot(None)).count() == 0
+        assert aggregates.most_missed_phonemes(db) == [("AE1", 2)]
+        assert sorted(aggregates.most_common_substitutions(db)) == [("AE1", "AH1", 1), ("AE1", "EH1", 1)]
+        summary = SessionSummary.from_turns(session_turns(db, "legacy")).snapshot()
+    assert summary["top_missed_phonemes"] == [("AE1", 2)]
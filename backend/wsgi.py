@@ -1,4 +1,7 @@
 from app import app
 
 if __name__ == "__main__":
+    from modules.database import engine
+    from modules.migrations import upgrade
+    upgrade(engine)
     app.run()
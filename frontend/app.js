@@ -3,9 +3,11 @@
  * 
  * Handles frontend logic for the English Conversational Practice Application.
  * - Starts/stops audio recording
- * - Sends audio for speech recognition
- * - Processes input and displays system response, grammar/phoneme feedback
- * - Plays TTS audio for responses, except final summaries
+ * - Streams the recording over a /voice_stream WebSocket opened for that recording
+ *   (live transcript and filler hints), or uploads it to /voice_turn when no
+ *   socket can be opened; both return the transcript, the system response, its
+ *   speech and the grammar/phoneme feedback
+ * - Plays the response audio as it arrives, except for final summaries
  * - Allows user to hear phoneme examples from /get_phoneme_audio endpoint
  */
 
@@ -33,153 +35,362 @@ function hideLoading() {
   loadingEl.style.display = 'none';
 }
 
+const LIVE_CHUNK_MS = 250; // MediaRecorder timeslice when streaming over the WebSocket
+const LIVE_CONNECT_TIMEOUT_MS = 2000; // Upload instead when the WebSocket takes longer to open
+const LIVE_RETRY_MS = 60000; // After a failed connection, upload recordings for this long
+let liveUnavailableUntil = 0;
+let turnPlayer = null;
+
+/**
+ * Handles one event of a voice turn, from /voice_turn or the /voice_stream WebSocket.
+ */
+function handleTurnEvent(event) {
+  if (event.event === 'partial') {
+    // Live transcript while the user is still speaking
+    // A partial of a long utterance covers only its last few seconds
+    let partialHTML = `<em>${event.tail ? '…' : ''}${event.text}…</em>`;
+    if (event.pattern_analysis && event.pattern_analysis.filler_count > 0) {
+      partialHTML += ` <span class="badge bg-warning text-dark">${event.pattern_analysis.filler_count} filler words</span>`;
+    }
+    userTranscriptEl.innerHTML = partialHTML;
+  } else if (event.event === 'end_of_speech') {
+    // The server heard the user stop talking
+    if (mediaRecorder && mediaRecorder.state === 'recording') {
+      stopRecording();
+    }
+  } else if (event.event === 'transcription') {
+    userTranscriptEl.textContent = event.text;
+  } else if (event.event === 'reply') {
+    hideLoading();
+    if (event.is_summary) {
+      // Final summary should go in feedback, not in system response (and is not spoken)
+      feedbackEl.innerHTML = event.text;
+      systemResponseEl.innerHTML = "";
+      turnPlayer = null;
+    } else {
+      systemResponseEl.innerHTML = event.text;
+      turnPlayer = new StreamedAudioPlayer();
+    }
+  } else if (event.event === 'audio' && turnPlayer) {
+    turnPlayer.append(base64ToBytes(event.data));
+  } else if (event.event === 'analysis') {
+    // On goodbye this arrives before the summary, which then replaces it.
+    feedbackEl.innerHTML = renderFeedback(event);
+  } else if (event.event === 'done') {
+    if (turnPlayer) {
+      turnPlayer.end();
+    }
+    hideLoading();
+  } else if (event.event === 'error') {
+    hideLoading();
+    feedbackEl.innerHTML = `<p class='text-danger'>${event.message}. Please try again.</p>`;
+  }
+}
+
+/**
+ * Opens a /voice_stream WebSocket for one recording. Resolves to the open socket, or
+ * to null when it cannot be opened in time, in which case the recording is uploaded
+ * to /voice_turn instead. The socket closes itself once the turn is done, so an idle
+ * tab holds no server thread.
+ */
+function openLiveSocket() {
+  if (Date.now() < liveUnavailableUntil) {
+    return Promise.resolve(null);
+  }
+  return new Promise(resolve => {
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(`${protocol}//${window.location.host}/voice_stream`);
+    socket.binaryType = 'arraybuffer';
+    let opened = false;
+    let finished = false;
+    const timer = setTimeout(() => {
+      if (!opened) {
+        socket.close();
+      }
+    }, LIVE_CONNECT_TIMEOUT_MS);
+    socket.onopen = () => {
+      opened = true;
+      clearTimeout(timer);
+      resolve(socket);
+    };
+    socket.onmessage = message => {
+      if (message.data instanceof ArrayBuffer) {
+        // Reply audio
+        if (turnPlayer) {
+          turnPlayer.append(new Uint8Array(message.data));
+        }
+        return;
+      }
+      const event = JSON.parse(message.data);
+      if (event.event === 'session') {
+        // The cookie cannot change over the socket, so it is stored with a regular request.
+        syncSession(event.token);
+        return;
+      }
+      handleTurnEvent(event);
+      if (event.event === 'done' || (event.event === 'error' && !isRecording())) {
+        finished = true;
+        socket.close();
+      }
+    };
+    socket.onclose = () => {
+      clearTimeout(timer);
+      if (!opened) {
+        // Skip the socket for a while rather than delaying every recording.
+        liveUnavailableUntil = Date.now() + LIVE_RETRY_MS;
+        resolve(null);
+      } else if (!finished) {
+        hideLoading();
+        if (isRecording()) {
+          stopRecording();
+        }
+      }
+    };
+  });
+}
+
+function isRecording() {
+  return mediaRecorder && mediaRecorder.state === 'recording';
+}
+
+async function syncSession(token) {
+  try {
+    await fetch('/session_sync', {
+      method: 'POST',
+      headers: {'Content-Type': 'application/json'},
+      body: JSON.stringify({token: token})
+    });
+  } catch (error) {
+    console.error("Error storing the session:", error);
+  }
+}
+
 async function startRecording() {
   if (currentAudio && !currentAudio.paused) {
     currentAudio.pause();
     currentAudio.currentTime = 0;
   }
 
-  const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+  startBtn.disabled = true;
+  const [stream, socket] = await Promise.all([
+    navigator.mediaDevices.getUserMedia({ audio: true }),
+    openLiveSocket()
+  ]).catch(error => {
+    startBtn.disabled = false;
+    throw error;
+  });
   mediaRecorder = new MediaRecorder(stream);
   audioChunks = [];
 
-  mediaRecorder.ondataavailable = event => {
-    audioChunks.push(event.data);
-  };
+  if (socket) {
+    // Live mode: every chunk is sent as soon as it is recorded
+    socket.send(JSON.stringify({ type: 'start' }));
+    mediaRecorder.ondataavailable = event => {
+      if (event.data.size > 0 && socket.readyState === WebSocket.OPEN) {
+        socket.send(event.data);
+      }
+    };
+    mediaRecorder.onstop = () => {
+      stream.getTracks().forEach(track => track.stop());
+      if (socket.readyState === WebSocket.OPEN) {
+        showLoading();
+        socket.send(JSON.stringify({ type: 'end' }));
+      }
+    };
+    mediaRecorder.start(LIVE_CHUNK_MS);
+  } else {
+    mediaRecorder.ondataavailable = event => {
+      audioChunks.push(event.data);
+    };
+    mediaRecorder.onstop = async () => {
+      showLoading(); // Show processing spinner
+      stream.getTracks().forEach(track => track.stop());
 
-  mediaRecorder.onstop = async () => {
-    showLoading(); // Show processing spinner
+      try {
+        const audioBlob = new Blob(audioChunks, { type: 'audio/webm' });
+        const formData = new FormData();
+        formData.append('audio', audioBlob, 'user_audio.webm');
 
-    try {
-      const audioBlob = new Blob(audioChunks, { type: 'audio/webm' });
-      const formData = new FormData();
-      formData.append('audio', audioBlob, 'user_audio.webm');
+        // One request per turn: transcription, reply, reply audio and analysis arrive as NDJSON events
+        const res = await fetch('/voice_turn', {
+          method: 'POST',
+          body: formData
+        });
+        if (!res.ok) {
+          throw new Error(`voice_turn failed with status ${res.status}`);
+        }
+        for await (const event of readEvents(res)) {
+          handleTurnEvent(event);
+        }
+      } catch (error) {
+        console.error("Error during processing:", error);
+        // Optionally, display an error message to the user
+        feedbackEl.innerHTML = "<p class='text-danger'>An error occurred while processing your input. Please try again.</p>";
+      } finally {
+        hideLoading(); // Hide processing spinner
+      }
+    };
+    mediaRecorder.start();
+  }
+  startBtn.disabled = true;
+  stopBtn.disabled = false;
+}
 
-      // Send audio for speech recognition
-      const recognitionRes = await fetch('/recognize_speech', {
-        method: 'POST',
-        body: formData
-      });
-      const recognitionData = await recognitionRes.json();
-      const userText = recognitionData.transcription;
-      userTranscriptEl.textContent = userText;
-
-      // Process input and get response
-      const processRes = await fetch('/process_input', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ text: userText })
-      });
-      const processData = await processRes.json();
-      
-      const isSummary = processData.is_summary;
-
-      if (isSummary) {
-        // Final summary should go in feedback, not in system response
-        feedbackEl.innerHTML = processData.response;
-        systemResponseEl.innerHTML = ""; // Clear system response since final summary goes to feedback
-
-        // Do NOT call TTS for summary
-      } else {
-        // Normal response flow:
-        systemResponseEl.innerHTML = processData.response;
-
-        let feedbackHTML = "";
-        if (processData.grammar_errors && processData.grammar_errors.length > 0) {
-          feedbackHTML += "<h3>Grammar Issues:</h3>";
-          processData.grammar_errors.forEach(e => {
-            feedbackHTML += `<p>In "${e.original_sentence}", "${e.error_word}" should be "${e.suggestion}". ${e.explanation}</p>`;
-          });
+/**
+ * Builds the grammar and pronunciation feedback HTML for one turn.
+ */
+function renderFeedback(data) {
+  let feedbackHTML = "";
+  if (data.grammar_errors && data.grammar_errors.length > 0) {
+    feedbackHTML += "<h3>Grammar Issues:</h3>";
+    data.grammar_errors.forEach(e => {
+      feedbackHTML += `<p>In "${e.original_sentence}", "${e.error_word}" should be "${e.suggestion}". ${e.explanation}</p>`;
+    });
+  } else {
+    feedbackHTML += "<p>No significant grammar issues.</p>";
+  }
+
+  if (data.pronunciation_errors && data.pronunciation_errors.length > 0) {
+    feedbackHTML += "<h3>Pronunciation Issues:</h3>";
+    data.pronunciation_errors.forEach(err => {
+      const userPh = err.user_phonemes.join(" ");
+      const userIpa = err.user_ipa.join(" ");
+
+      // Highlight every substituted or omitted phoneme reported by the alignment.
+      const mismatchIndexes = new Set(
+        (err.alignment || []).filter(op => op.op !== 'insertion').map(op => op.position)
+      );
+
+      let correctPhHTML = "";
+      for (let i = 0; i < err.correct_phonemes.length; i++) {
+        let ph = err.correct_phonemes[i];
+        if (mismatchIndexes.has(i)) {
+          correctPhHTML += `<span style="color:red;">${ph}</span> <button class="btn btn-sm btn-info" onclick="playPhoneme('${ph}')">Hear</button> `;
         } else {
-          feedbackHTML += "<p>No significant grammar issues.</p>";
+          correctPhHTML += ph + " ";
         }
+      }
 
-        if (processData.pronunciation_errors && processData.pronunciation_errors.length > 0) {
-          feedbackHTML += "<h3>Pronunciation Issues:</h3>";
-          processData.pronunciation_errors.forEach(err => {
-            const userPh = err.user_phonemes.join(" ");
-            const correctPh = err.correct_phonemes.join(" ");
-            const userIpa = err.user_ipa.join(" ");
-            const correctIpa = err.correct_ipa.join(" ");
-
-            let mismatchIndex = -1;
-            for (let i = 0; i < Math.min(err.user_phonemes.length, err.correct_phonemes.length); i++) {
-              if (err.user_phonemes[i] !== err.correct_phonemes[i]) {
-                mismatchIndex = i;
-                break;
-              }
-            }
-
-            let correctPhHTML = "";
-            for (let i = 0; i < err.correct_phonemes.length; i++) {
-              let ph = err.correct_phonemes[i];
-              if (i === mismatchIndex) {
-                correctPhHTML += `<span style="color:red;">${ph}</span> <button class="btn btn-sm btn-info" onclick="playPhoneme('${ph}')">Hear</button> `;
-              } else {
-                correctPhHTML += ph + " ";
-              }
-            }
-
-            // Also show IPA with highlight:
-            let correctIpaHTML = "";
-            for (let i = 0; i < err.correct_ipa.length; i++) {
-              let ph = err.correct_ipa[i];
-              if (i === mismatchIndex) {
-                correctIpaHTML += `<span style="color:red;">${ph}</span> `;
-              } else {
-                correctIpaHTML += ph + " ";
-              }
-            }
-
-            feedbackHTML += `
-              <p>
-              Word: '${err.word}' mispronounced.<br>
-              You said (ARPAbet): [${userPh}]<br>
-              You said (IPA): [${userIpa}]<br>
-              Try (ARPAbet): [${correctPhHTML}]<br>
-              Try (IPA): [${correctIpaHTML}]<br>
-              ${err.difference_note}
-              </p>
-            `;
-          });
-          if (processData.pronunciation_suggestions && processData.pronunciation_suggestions.length > 0) {
-            feedbackHTML += "<p>Suggestions:<br>" + processData.pronunciation_suggestions.join("<br>") + "</p>";
-          }
+      // Also show IPA with highlight:
+      let correctIpaHTML = "";
+      for (let i = 0; i < err.correct_ipa.length; i++) {
+        let ph = err.correct_ipa[i];
+        if (mismatchIndexes.has(i)) {
+          correctIpaHTML += `<span style="color:red;">${ph}</span> `;
         } else {
-          feedbackHTML += "<p>No significant pronunciation issues.</p>";
+          correctIpaHTML += ph + " ";
         }
+      }
 
-        feedbackEl.innerHTML = feedbackHTML;
-
-        // Proceed with TTS
-        console.log("Response before TTS:", processData.response);
-        const audioRes = await fetch('/get_audio_response', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ response_text: processData.response })
-        });
-        const audioData = await audioRes.json();
-        const audioUrl = audioData.audio_url;
+      feedbackHTML += `
+        <p>
+        Word: '${err.word}' mispronounced.<br>
+        You said (ARPAbet): [${userPh}]<br>
+        You said (IPA): [${userIpa}]<br>
+        Try (ARPAbet): [${correctPhHTML}]<br>
+        Try (IPA): [${correctIpaHTML}]<br>
+        ${err.difference_note}
+        </p>
+      `;
+    });
+    if (data.pronunciation_suggestions && data.pronunciation_suggestions.length > 0) {
+      feedbackHTML += "<p>Suggestions:<br>" + data.pronunciation_suggestions.join("<br>") + "</p>";
+    }
+  } else {
+    feedbackHTML += "<p>No significant pronunciation issues.</p>";
+  }
+  return feedbackHTML;
+}
 
-        if (currentAudio && !currentAudio.paused) {
-          currentAudio.pause();
-          currentAudio.currentTime = 0;
-        }
-        currentAudio = new Audio(audioUrl);
-        currentAudio.play();
+/**
+ * Yields the JSON objects of an NDJSON response as the lines arrive.
+ */
+async function* readEvents(response) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) {
+      break;
+    }
+    buffered += decoder.decode(value, { stream: true });
+    let newline;
+    while ((newline = buffered.indexOf("\n")) >= 0) {
+      const line = buffered.slice(0, newline).trim();
+      buffered = buffered.slice(newline + 1);
+      if (line) {
+        yield JSON.parse(line);
       }
-    } catch (error) {
-      console.error("Error during processing:", error);
-      // Optionally, display an error message to the user
-      feedbackEl.innerHTML = "<p class='text-danger'>An error occurred while processing your input. Please try again.</p>";
-    } finally {
-      hideLoading(); // Hide processing spinner
     }
-  };
+  }
+  if (buffered.trim()) {
+    yield JSON.parse(buffered);
+  }
+}
 
-  mediaRecorder.start();
-  startBtn.disabled = true;
-  stopBtn.disabled = false;
+function base64ToBytes(data) {
+  const binary = atob(data);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes;
+}
+
+/**
+ * Plays mp3 chunks as they arrive. With Media Source Extensions playback starts
+ * on the first chunk; otherwise the chunks are collected and played at the end.
+ */
+class StreamedAudioPlayer {
+  constructor() {
+    if (currentAudio && !currentAudio.paused) {
+      currentAudio.pause();
+      currentAudio.currentTime = 0;
+    }
+    this.chunks = [];
+    this.ended = false;
+    currentAudio = new Audio();
+    if (window.MediaSource && MediaSource.isTypeSupported('audio/mpeg')) {
+      this.mediaSource = new MediaSource();
+      this.mediaSource.addEventListener('sourceopen', () => {
+        this.sourceBuffer = this.mediaSource.addSourceBuffer('audio/mpeg');
+        this.sourceBuffer.addEventListener('updateend', () => this.flush());
+        this.flush();
+      });
+      currentAudio.src = URL.createObjectURL(this.mediaSource);
+      currentAudio.play().catch(error => console.error("Error playing response audio:", error));
+    }
+  }
+
+  append(bytes) {
+    this.chunks.push(bytes);
+    if (this.mediaSource) {
+      this.flush();
+    }
+  }
+
+  flush() {
+    // A SourceBuffer takes one append at a time; the rest wait for 'updateend'.
+    if (!this.sourceBuffer || this.sourceBuffer.updating) {
+      return;
+    }
+    if (this.chunks.length > 0) {
+      this.sourceBuffer.appendBuffer(this.chunks.shift());
+    } else if (this.ended && this.mediaSource.readyState === 'open') {
+      this.mediaSource.endOfStream();
+    }
+  }
+
+  end() {
+    this.ended = true;
+    if (this.mediaSource) {
+      this.flush();
+    } else {
+      currentAudio.src = URL.createObjectURL(new Blob(this.chunks, { type: 'audio/mpeg' }));
+      currentAudio.play().catch(error => console.error("Error playing response audio:", error));
+    }
+  }
 }
 
 function stopRecording() {